@@ -6,22 +6,28 @@
 # @Last modified time: 02-May-2021 20:05:68:688  GMT-0600
 # @License: [Private IP]
 
+# Annotations aren't evaluated, so selenium (only needed by the selenium backend) can be imported lazily
+from __future__ import annotations
+
 import ast
+import functools
 import os
 import pickle
+import random
+import tempfile
+import threading
 import time
+from contextlib import contextmanager
 from io import StringIO
+from typing import Callable, Tuple, Type
+from urllib.parse import urljoin, urlparse
 
+import lxml.html
 import pandas as pd
-# Scraping Libraries
-import selenium
-from colorama import Fore, Style
-from selenium import webdriver
-from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
-from webdriver_manager.chrome import ChromeDriverManager
+import requests
+from requests.adapters import HTTPAdapter
+
+import _references._metrics as _metrics
 
 _ = """
 #######################################################################################################################
@@ -29,7 +35,19 @@ _ = """
 #######################################################################################################################
 """
 TIMEOUT_THRESH = 10
-GRACE = 2
+# Extra seconds to wait after a page is loaded/validated. Waits are condition-based, so this is normally unnecessary
+GRACE = 0
+# Retry/backoff: attempts per call, exponential backoff bounds (seconds) and total retries allowed per url per run
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30
+RETRY_BUDGET_PER_URL = 8
+# Circuit breaker: consecutive failures against a host before it's left alone, and for how long (seconds)
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 60
+# Number of keep-alive connections each HTTP session holds per host
+HTTP_POOL_SIZE = 4
+HTTP_HEADERS = {'User-Agent': 'JasperStitch/1.0 (Stanford DAMS; Jasper Ridge aerial imagery)'}
 
 _ = """
 #######################################################################################################################
@@ -91,16 +109,46 @@ def util_validate(driver: selenium.webdriver.chrome.webdriver.WebDriver, xpath:
 
     Returns
     -------
-    None
-        Nothing is returned, although a string is printed for tracking purposes.
+    bool
+        Whether the element appeared before the timeout. A string is printed if it didn't.
 
     """
+    WebDriverWait, EC, By, TimeoutException = _selenium()
     try:
         WebDriverWait(driver, TIMEOUT_THRESH).until(EC.presence_of_element_located((By.XPATH, xpath)))
+        return True
     except TimeoutException:
         _print('Page timed out after ' + str(TIMEOUT_THRESH) + ' seconds during validation.', color='LIGHTRED_EX')
+        return False
+
+
+def wait_for_ready(driver: selenium.webdriver.chrome.webdriver.WebDriver,
+                   TIMEOUT_THRESH: int = TIMEOUT_THRESH) -> bool:
+    """Holds control until the loaded page reports `document.readyState == "complete"` – until timeout.
+
+    Parameters
+    ----------
+    driver : selenium.webdriver.chrome.webdriver.WebDriver
+        The selenium webdriver programmatically created and used in the main script.
+    TIMEOUT_THRESH : int
+        How many seconds control should be held at most.
+
+    Returns
+    -------
+    bool
+        Whether the page finished loading before the timeout.
+
+    """
+    WebDriverWait, _, _, TimeoutException = _selenium()
+    try:
+        WebDriverWait(driver, TIMEOUT_THRESH).until(
+            lambda d: d.execute_script('return document.readyState') == 'complete')
+        return True
+    except TimeoutException:
+        return False
 
 
+@_metrics.timed('selenium.load', key='url')
 def load(driver: selenium.webdriver.chrome.webdriver.WebDriver, url: str, val_xpath: str = None,
          TIMEOUT_THRESH: int = TIMEOUT_THRESH, GRACE: int = GRACE) -> None:
     """Load an url on the supplied driver and check if it's loaded properly.
@@ -113,6 +161,7 @@ def load(driver: selenium.webdriver.chrome.webdriver.WebDriver, url: str, val_xp
         The url which should be loaded.
     val_xpath : str
         The xpath of the element which should appear once the page is properly loaded.
+        If not supplied, control is held until the document itself has finished loading.
     TIMEOUT_THRESH : int
         How many seconds control should be held before an exception is raised.
     GRACE : int
@@ -123,14 +172,24 @@ def load(driver: selenium.webdriver.chrome.webdriver.WebDriver, url: str, val_xp
     None
         Nothing is returned, although a string is printed for tracking purposes.
 
+    Raises
+    ------
+    TimeoutException
+        If the page [or `val_xpath`] didn't load before `TIMEOUT_THRESH`, so that the caller may retry.
+
     """
     driver.get(url)
-    if(val_xpath is not None):
-        util_validate(driver, val_xpath)
-    time.sleep(GRACE)
+    loaded = util_validate(driver, val_xpath, TIMEOUT_THRESH) if val_xpath is not None \
+        else wait_for_ready(driver, TIMEOUT_THRESH)
+    if not loaded:
+        TimeoutException = _selenium()[3]
+        raise TimeoutException(f'"{url}" did not load within {TIMEOUT_THRESH} seconds.')
+    if GRACE:
+        time.sleep(GRACE)
     # _print(f'"{url}" loaded...', color='CYAN')
 
 
+@_metrics.timed('selenium.click', key='xpath')
 def click(driver: selenium.webdriver.chrome.webdriver.WebDriver, xpath: str = None, val_xpath: str = None,
           TIMEOUT_THRESH: int = TIMEOUT_THRESH) -> None:
     """Click an element given it's xpath.
@@ -159,8 +218,9 @@ def click(driver: selenium.webdriver.chrome.webdriver.WebDriver, xpath: str = No
     # _print(f'Element clicked at "{xpath}"', color='CYAN')
 
 
+@_metrics.timed('selenium.type', key='xpath')
 def sel_type(driver: selenium.webdriver.chrome.webdriver.WebDriver, content: str, xpath: str,
-             GRACE: int = GRACE) -> None:
+             TIMEOUT_THRESH: int = TIMEOUT_THRESH, GRACE: int = GRACE) -> None:
     """Type something.
 
     Parameters
@@ -171,6 +231,8 @@ def sel_type(driver: selenium.webdriver.chrome.webdriver.WebDriver, content: str
         What should be typed.
     xpath : str
         The xpath of the element where `content` should be typed.
+    TIMEOUT_THRESH : int
+        How many seconds control should be held, at most, until the element holds `content`.
     GRACE : int
         How many seconds control should wait even after the content is typed.
 
@@ -183,7 +245,13 @@ def sel_type(driver: selenium.webdriver.chrome.webdriver.WebDriver, content: str
     elem = driver.find_element_by_xpath(xpath)
     elem.click()
     elem.send_keys(content)
-    time.sleep(GRACE)
+    WebDriverWait, _, _, TimeoutException = _selenium()
+    try:
+        WebDriverWait(driver, TIMEOUT_THRESH).until(lambda d: content in (elem.get_attribute('value') or ''))
+    except TimeoutException:
+        _print(f'"{content}" did not appear in "{xpath}" after {TIMEOUT_THRESH} seconds.', color='LIGHTRED_EX')
+    if GRACE:
+        time.sleep(GRACE)
     # _print(f'"{content}" typed in "{xpath}"', color='CYAN')
 
 
@@ -202,11 +270,440 @@ def init_driver(options:
         The selenium webdriver programmatically created and to be used in the main script.
 
     """
-    driver = webdriver.Chrome(ChromeDriverManager().install(), options=options)
+    from selenium import webdriver
+
+    driver = webdriver.Chrome(_chromedriver_path(), options=options)
     # _print('Driver initialized', color='CYAN')
     return driver
 
 
+def headless_options() -> selenium.webdriver.chrome.options.Options:
+    """Chrome options for a headless driver, as used by the pooled scrape engine.
+
+    Returns
+    -------
+    selenium.webdriver.chrome.options.Options
+        The chrome options which should be passed to `init_driver`.
+
+    """
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--window-size=1920,1080')
+    return options
+
+
+@functools.lru_cache(maxsize=None)
+def _chromedriver_path() -> str:
+    """Install (or locate) the chromedriver binary once per process, rather than once per driver."""
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    return ChromeDriverManager().install()
+
+
+def _selenium() -> tuple:
+    """The selenium names the waits need, `(WebDriverWait, expected_conditions, By, TimeoutException)`.
+
+    Imported on first use rather than with this module: callers that only read/write data or scrape over HTTP never
+    pay for importing selenium.
+    """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    return WebDriverWait, EC, By, TimeoutException
+
+
+_ = """
+#######################################################################################################################
+##############################################   WAIT + RETRY UTILITY   ###############################################
+#######################################################################################################################
+"""
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of making a request to a host whose circuit breaker is open."""
+
+
+class RetryPolicy:
+    """Exponential backoff with (full) jitter, bounded per call and per url.
+
+    Parameters
+    ----------
+    max_attempts : int
+        The maximum number of attempts of a single call (the first attempt included).
+    base : float
+        The backoff ceiling, in seconds, before the first retry. It doubles with every retry.
+    cap : float
+        The largest backoff ceiling, in seconds.
+    budget_per_url : int
+        The total number of retries any single url may consume over the lifetime of the policy.
+
+    """
+
+    def __init__(self, max_attempts: int = MAX_ATTEMPTS, base: float = BACKOFF_BASE, cap: float = BACKOFF_MAX,
+                 budget_per_url: int = RETRY_BUDGET_PER_URL) -> None:
+        self.max_attempts = max_attempts
+        self.base = base
+        self.cap = cap
+        self.budget_per_url = budget_per_url
+        self._spent = {}
+        self._lock = threading.Lock()
+
+    def backoff(self, retry: int) -> float:
+        """Seconds to wait before the `retry`-th retry (0-indexed), drawn uniformly up to the exponential ceiling."""
+        return random.uniform(0, min(self.cap, self.base * 2 ** retry))
+
+    def consume(self, url: str) -> bool:
+        """Spend one retry of `url`'s budget, returning False (and spending nothing) if it's exhausted."""
+        with self._lock:
+            if self._spent.get(url, 0) >= self.budget_per_url:
+                return False
+            self._spent[url] = self._spent.get(url, 0) + 1
+            return True
+
+
+class CircuitBreaker:
+    """Stops requests to a host after consecutive failures, then lets a single trial request through after a cooldown.
+
+    Parameters
+    ----------
+    threshold : int
+        The number of consecutive failures against a host which opens its circuit.
+    cooldown : float
+        How many seconds an open circuit stays open before a trial request is allowed (half-open).
+
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = {}
+        self._opened_at = {}
+        self._trial = set()
+        self._lock = threading.Lock()
+
+    def allow(self, url: str) -> bool:
+        """Whether a request to the host of `url` may be made right now."""
+        host = urlparse(url).netloc
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return True
+            if time.monotonic() - opened_at >= self.cooldown and host not in self._trial:
+                self._trial.add(host)
+                return True
+            return False
+
+    def record(self, url: str, success: bool) -> None:
+        """Record the outcome of a request to the host of `url`."""
+        host = urlparse(url).netloc
+        with self._lock:
+            self._trial.discard(host)
+            if success:
+                self._failures[host] = 0
+                self._opened_at.pop(host, None)
+                return
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if self._failures[host] >= self.threshold:
+                if host not in self._opened_at:
+                    _print(f'Circuit opened for "{host}" after {self._failures[host]} consecutive failures.',
+                           color='LIGHTRED_EX')
+                self._opened_at[host] = time.monotonic()
+
+
+class LatencyStats:
+    """Thread-safe record of every request attempt's latency and outcome."""
+
+    def __init__(self) -> None:
+        self._records = []
+        self._lock = threading.Lock()
+
+    def record(self, url: str, seconds: float, success: bool) -> None:
+        """Record a single attempt against `url`."""
+        with self._lock:
+            self._records.append((urlparse(url).netloc, url, seconds, success))
+
+    def drain(self) -> list:
+        """Every attempt recorded so far, which are then forgotten (e.g. to hand them to the parent process)."""
+        with self._lock:
+            records, self._records = self._records, []
+        return records
+
+    def extend(self, records: list) -> None:
+        """Add attempts recorded elsewhere, e.g. by a worker process (see `drain`)."""
+        with self._lock:
+            self._records.extend(records)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Every recorded attempt, one row each."""
+        with self._lock:
+            records = pd.DataFrame(self._records, columns=['host', 'url', 'seconds', 'success'])
+        # Typed even without records (e.g. when every county was already scraped), so that `summary` still works
+        return records.astype({'seconds': 'float64', 'success': 'bool'})
+
+    def summary(self, by: str = 'host') -> pd.DataFrame:
+        """Attempt count, failure count and latency percentiles, grouped `by` "host" or "url"."""
+        records = self.to_frame()
+        grouped = records.groupby(by)['seconds']
+        summary = pd.DataFrame({'attempts': grouped.size(),
+                                'failures': (~records['success']).groupby(records[by]).sum(),
+                                'mean': grouped.mean(),
+                                'p50': grouped.quantile(0.5),
+                                'p95': grouped.quantile(0.95),
+                                'max': grouped.max()})
+        return summary
+
+
+# Failures of a plain HTTP request which are worth retrying (HTTP errors only with `RETRYABLE_STATUSES`)
+RETRYABLE_HTTP_ERRORS = (requests.ConnectionError, requests.Timeout, requests.HTTPError)
+# Server errors and "Too Many Requests" may succeed later; any other error status (e.g. 404) won't
+RETRYABLE_STATUSES = frozenset(range(500, 600)) | {429}
+# Shared by every caller in the process, so that all workers see the same budgets and breaker state
+RETRY_POLICY = RetryPolicy()
+CIRCUIT_BREAKER = CircuitBreaker()
+LATENCY_STATS = LatencyStats()
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a failure is worth retrying: anything but an HTTP error status outside `RETRYABLE_STATUSES`."""
+    response = getattr(error, 'response', None)
+    if isinstance(error, requests.HTTPError) and response is not None:
+        return response.status_code in RETRYABLE_STATUSES
+    return True
+
+
+def retry_call(fn: Callable, url: str, policy: RetryPolicy = None, breaker: CircuitBreaker = None,
+               stats: LatencyStats = None, on_retry: Callable[[], None] = None,
+               retry_on: Tuple[Type[BaseException], ...] = (Exception,)):
+    """Call `fn()` (which requests `url`), retrying failures with backoff until the attempts or budget run out.
+
+    Parameters
+    ----------
+    fn : Callable
+        Zero-argument callable which makes the request and returns its result.
+    url : str
+        The url `fn` requests. Keys the retry budget, circuit breaker and latency stats.
+    policy : RetryPolicy
+        The backoff and budget policy. Defaults to the shared `RETRY_POLICY`.
+    breaker : CircuitBreaker
+        The circuit breaker. Defaults to the shared `CIRCUIT_BREAKER`.
+    stats : LatencyStats
+        Where attempt latencies are recorded. Defaults to the shared `LATENCY_STATS`.
+    on_retry : Callable[[], None]
+        Called after backing off and before every retry (e.g. `driver.refresh`).
+    retry_on : Tuple[Type[BaseException], ...]
+        The exceptions that are retried; anything else is raised immediately. HTTP errors are only retried for the
+        `RETRYABLE_STATUSES` (see `is_retryable`).
+
+    Returns
+    -------
+    Any
+        Whatever `fn` returns.
+
+    Raises
+    ------
+    CircuitOpenError
+        If the circuit of `url`'s host is open.
+
+    """
+    policy = policy or RETRY_POLICY
+    breaker = breaker or CIRCUIT_BREAKER
+    stats = stats or LATENCY_STATS
+
+    for attempt in range(policy.max_attempts):
+        if not breaker.allow(url):
+            raise CircuitOpenError(f'Circuit is open for "{urlparse(url).netloc}", not requesting "{url}".')
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except retry_on as e:
+            stats.record(url, time.perf_counter() - start, success=False)
+            if not is_retryable(e):
+                # The host did answer (e.g. "404 Not Found"), so this doesn't count against its circuit
+                breaker.record(url, success=True)
+                raise
+            breaker.record(url, success=False)
+            if attempt + 1 >= policy.max_attempts or not policy.consume(url):
+                raise
+            _print(f'Attempt {attempt + 1} at "{url}" failed ({str(e)[:100]}), retrying...', color='LIGHTRED_EX')
+            time.sleep(policy.backoff(attempt))
+            if on_retry is not None:
+                on_retry()
+        else:
+            stats.record(url, time.perf_counter() - start, success=True)
+            breaker.record(url, success=True)
+            return result
+
+
+_ = """
+#######################################################################################################################
+#######################################   DRIVER-FREE (HTTP) SCRAPING UTILITY   #######################################
+#######################################################################################################################
+"""
+
+
+def init_session(pool_size: int = HTTP_POOL_SIZE, headers: dict = None) -> requests.Session:
+    """Initialize a keep-alive HTTP session with a pooled connection adapter.
+
+    Parameters
+    ----------
+    pool_size : int
+        The number of connections kept alive (and therefore reused) per host.
+    headers : dict
+        Headers sent with every request. Defaults to `HTTP_HEADERS`.
+
+    Returns
+    -------
+    requests.Session
+        The session to be passed to `fetch_html`.
+
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(HTTP_HEADERS if headers is None else headers)
+    return session
+
+
+@_metrics.timed('http.fetch', key='url')
+def fetch_page(session: requests.Session, url: str, headers: dict = None,
+               TIMEOUT_THRESH: int = TIMEOUT_THRESH, cache=None) -> requests.Response:
+    """Fetch an url over HTTP (no browser), optionally through the on-disk content cache.
+
+    Parameters
+    ----------
+    session : requests.Session
+        The pooled session created by `init_session`.
+    url : str
+        The url which should be fetched.
+    headers : dict
+        Extra headers for this request only (e.g. `If-None-Match` for a conditional request).
+    TIMEOUT_THRESH : int
+        How many seconds to wait for the server before an exception is raised.
+    cache : _cache.ContentCache
+        If supplied, fresh cached content is returned without a request and stale content is revalidated with the
+        server (costing a `304 Not Modified` rather than the whole page if it hasn't changed). Fetched content is
+        added to the cache.
+
+    Returns
+    -------
+    requests.Response
+        The response. Error statuses raise, but `304 Not Modified` (in reply to the caller's own conditional
+        `headers`) is returned as-is. Responses served from the cache have `from_cache = True`.
+
+    """
+    entry = cache.lookup(url) if cache is not None else None
+    if entry is not None and cache.is_fresh(entry):
+        cache.hit(entry)
+        return _cached_response(url, cache.read(entry), entry)
+
+    conditional = headers is not None and ('If-None-Match' in headers or 'If-Modified-Since' in headers)
+    if entry is not None and not conditional:
+        headers = dict(headers or {}, **cache.validators(entry))
+    response = session.get(url, headers=headers, timeout=TIMEOUT_THRESH)
+    response.from_cache = False
+    if response.status_code == 304:
+        if entry is not None and not conditional:
+            cache.hit(entry, revalidated=True)
+            return _cached_response(url, cache.read(entry), entry)
+        return response
+    response.raise_for_status()
+    if cache is not None:
+        cache.miss()
+        cache.put(url, response.content, etag=response.headers.get('ETag'),
+                  last_modified=response.headers.get('Last-Modified'))
+    return response
+
+
+def _cached_response(url: str, content: bytes, entry: dict) -> requests.Response:
+    """A `200 OK` response built from cached content, so callers can't tell it apart from a fetched one."""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = content
+    if entry.get('etag'):
+        response.headers['ETag'] = entry['etag']
+    if entry.get('last_modified'):
+        response.headers['Last-Modified'] = entry['last_modified']
+    response.from_cache = True
+    return response
+
+
+def parse_html(content: bytes, base_url: str = None) -> lxml.html.HtmlElement:
+    """Parse raw page content into an lxml tree, resolving relative links against `base_url`."""
+    return lxml.html.fromstring(content, base_url=base_url)
+
+
+def fetch_html(session: requests.Session, url: str,
+               TIMEOUT_THRESH: int = TIMEOUT_THRESH, cache=None) -> lxml.html.HtmlElement:
+    """Fetch an url over HTTP (no browser) and parse it into an lxml tree.
+
+    Parameters
+    ----------
+    session : requests.Session
+        The pooled session created by `init_session`.
+    url : str
+        The url which should be fetched.
+    TIMEOUT_THRESH : int
+        How many seconds to wait for the server before an exception is raised.
+    cache : _cache.ContentCache
+        If supplied, the page is fetched through this cache (see `fetch_page`).
+
+    Returns
+    -------
+    lxml.html.HtmlElement
+        The root of the parsed page. Relative links are resolved against the final (redirected) url.
+
+    """
+    response = fetch_page(session, url, TIMEOUT_THRESH=TIMEOUT_THRESH, cache=cache)
+    return parse_html(response.content, base_url=response.url)
+
+
+def find_html_element(tree: lxml.html.HtmlElement, xpath: str) -> lxml.html.HtmlElement:
+    """Find an element by the same xpath that would be used with selenium.
+
+    Browsers insert `<tbody>` into tables that don't declare one, so xpaths copied from the browser may not match the
+    raw HTML. If the xpath doesn't match as-is, it is retried without any `tbody` steps.
+
+    Parameters
+    ----------
+    tree : lxml.html.HtmlElement
+        The parsed page returned by `fetch_html`.
+    xpath : str
+        The (browser) xpath of the element.
+
+    Returns
+    -------
+    lxml.html.HtmlElement
+        The first element matching the xpath.
+
+    """
+    found = tree.xpath(xpath)
+    if not found and '/tbody' in xpath:
+        found = tree.xpath(xpath.replace('/tbody', ''))
+    if not found:
+        raise LookupError(f'No element found at "{xpath}".')
+    return found[0]
+
+
+def html_outer(element: lxml.html.HtmlElement) -> str:
+    """The `outerHTML` of an lxml element (equivalent to selenium's `get_attribute('outerHTML')`)."""
+    return lxml.html.tostring(element, encoding='unicode')
+
+
+def html_attribute(element: lxml.html.HtmlElement, attribute: str) -> str:
+    """An attribute of an lxml element. Like selenium, `href` and `src` are returned as absolute urls."""
+    value = element.get(attribute)
+    if value is not None and attribute in ('href', 'src'):
+        value = urljoin(element.base_url or '', value)
+    return value
+
+
 _ = """
 #######################################################################################################################
 ############################################   FILE IO + DISPLAY UTILITY   ############################################
@@ -231,18 +728,12 @@ def _print(txt: str, color: str = 'LIGHTGREEN_EX') -> None:
         While nothing is returned, this function prints to the console.
 
     """
-    fcolor = color.upper()
-    if(type(txt) == str):
-        # Format the provided string
-        txt = txt.replace("'", "\\'").replace('"', '\\"')
-        output = f'print(Fore.{fcolor} + """{txt}""" + Style.RESET_ALL)'
-        # Print the specified string to the console
-    else:
-        output = f'print(Fore.{fcolor}, {txt}, Style.RESET_ALL)'
-    exec(output)
+    # Also kept as a structured record (with the current stage) for the run's metrics report
+    _metrics.log(txt, color=color)
 
 
-def retrieve_local_data_file(filedir, mode=1):
+@_metrics.timed('io.read', key='filedir')
+def retrieve_local_data_file(filedir, mode=1, **kwargs):
     data = None
     filename = filedir.split('/')[-1:][0]
     try:
@@ -261,8 +752,13 @@ def retrieve_local_data_file(filedir, mode=1):
                 with open(filedir, 'r') as file:
                     lines = file.readlines()
                     data = pd.read_csv(StringIO(''.join(lines)), delim_whitespace=True).infer_objects()
+        elif(filename.endswith('.parquet')):
+            # Typed and columnar: dtypes (categoricals, tz-aware dates, list columns) are stored with the data
+            data = pd.read_parquet(filedir, columns=kwargs.get('columns'))
         if(data is None):
             raise Exception
+        if(isinstance(data, pd.DataFrame)):
+            _metrics.count('io.rows_read', len(data), key=filedir)
         _print(f'> Imported "{filename}"...', color='GREEN')
     except Exception as e:
         _print('Unable to retrieve local data', color='RED')
@@ -270,17 +766,61 @@ def retrieve_local_data_file(filedir, mode=1):
     return data
 
 
+@_metrics.timed('io.save', key='filepath')
 def save_local_data_file(data, filepath, **kwargs):
-    auto_make_path(filepath)
+    if(filepath.endswith('.parquet')):
+        # Only the directory: an empty placeholder would be left behind (and look newer) if the write failed
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+    else:
+        auto_make_path(filepath)
     data = data.infer_objects()
     if(filepath.endswith('.csv')):
         data.to_csv(filepath, index=kwargs.get('index'))
+    elif(filepath.endswith('.parquet')):
+        with atomic_write(filepath, mode='wb') as file:
+            data.to_parquet(file, index=kwargs.get('index'), compression=kwargs.get('compression', 'snappy'))
     elif(filepath.endswith('.pkl')):
         with open(filepath, 'w') as file:
             file.write(data)
+    if(isinstance(data, pd.DataFrame)):
+        _metrics.count('io.rows_saved', len(data), key=filepath)
     _print(f'> Saved data to "{filepath}"', color='GREEN')
 
 
+@contextmanager
+def atomic_write(filepath: str, mode: str = 'wb'):
+    """Open a temporary file which atomically replaces `filepath` once the `with` block exits without error.
+
+    Readers therefore only ever see the old or the new file, never a partially written one.
+
+    Parameters
+    ----------
+    filepath : str
+        The final destination of the file.
+    mode : str
+        The mode the temporary file is opened in ("w" or "wb").
+
+    Yields
+    ------
+    file object
+        The open temporary file, which should be written to.
+
+    """
+    directory = os.path.dirname(filepath) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(filepath) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, filepath)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
 def auto_make_path(path: str, **kwargs: bool) -> None:
     """Create the specified directories and nested file. Custom actions based on **kwargs.
 
@@ -0,0 +1,253 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 12:10:33:330  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: _cache.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 12:10:33:330  GMT-0600
+# @License: [Private IP]
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+import _references._accessories as _accessories
+
+_ = """
+#######################################################################################################################
+###############################################   CACHE – HYPERPARAMETERS   ###########################################
+#######################################################################################################################
+"""
+CACHE_DIR = 'Data/cache/'
+# Total bytes of (distinct) cached content kept on disk before least-recently-used entries are evicted
+CACHE_BUDGET = 20 * 1024 ** 3
+# Seconds for which a cached entry is served without revalidating it with the server (None: always revalidate)
+CACHE_MAX_AGE = 24 * 60 * 60
+CHUNK_SIZE = 1 << 20
+
+_ = """
+#######################################################################################################################
+#############################################   CONTENT-ADDRESSED CACHE   #############################################
+#######################################################################################################################
+"""
+
+
+def cache_key(url: str, etag: str = None, last_modified: str = None) -> str:
+    """The key of a cache entry: the url plus the validators of the content stored under it."""
+    return hashlib.sha256('\n'.join([url, etag or '', last_modified or '']).encode('utf-8')).hexdigest()
+
+
+class ContentCache:
+    """On-disk cache of fetched pages and scans, shared by the scraping helpers and the scan downloader.
+
+    Content is stored once per distinct SHA-256 digest (so identical pages/scans under different urls share a blob),
+    and entries map `cache_key(url, etag, last_modified)` to a blob. When the distinct blobs exceed `max_bytes`, the
+    least recently used entries (and any blobs no longer referenced) are evicted.
+
+    Parameters
+    ----------
+    directory : str
+        Where the blobs and the (SQLite) index are stored.
+    max_bytes : int
+        The disk budget of the blobs.
+    max_age : float
+        Seconds for which an entry is considered fresh, i.e. served without asking the server. None to always
+        revalidate with the server (which still only costs a `304 Not Modified` if the content hasn't changed).
+
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_BUDGET,
+                 max_age: Optional[float] = CACHE_MAX_AGE) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, 'blobs'), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        self._db.execute('''CREATE TABLE IF NOT EXISTS entries (
+                                key TEXT PRIMARY KEY, url TEXT NOT NULL, digest TEXT NOT NULL, size INTEGER NOT NULL,
+                                etag TEXT, last_modified TEXT, stored_at REAL NOT NULL, last_access REAL NOT NULL)''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS entries_url ON entries (url, stored_at)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS entries_access ON entries (last_access)')
+        self._db.commit()
+
+    def blob_path(self, digest: str) -> str:
+        """The path of the blob with SHA-256 `digest`."""
+        return os.path.join(self.directory, 'blobs', digest[:2], digest)
+
+    def lookup(self, url: str, etag: str = None, last_modified: str = None) -> Optional[Dict[str, object]]:
+        """The most recent entry of `url` (restricted to the given validators, if any), or None.
+
+        Looking an entry up doesn't count as a hit or miss; see `hit`/`miss`.
+        """
+        with self._lock:
+            if etag is None and last_modified is None:
+                row = self._db.execute('SELECT key, digest, size, etag, last_modified, stored_at FROM entries '
+                                       'WHERE url = ? ORDER BY stored_at DESC LIMIT 1', (url,)).fetchone()
+            else:
+                row = self._db.execute('SELECT key, digest, size, etag, last_modified, stored_at FROM entries '
+                                       'WHERE key = ?', (cache_key(url, etag, last_modified),)).fetchone()
+        if row is None or not os.path.exists(self.blob_path(row[1])):
+            return None
+        return dict(zip(['key', 'digest', 'size', 'etag', 'last_modified', 'stored_at'], row), url=url)
+
+    def is_fresh(self, entry: Dict[str, object]) -> bool:
+        """Whether `entry` may be served without revalidating it with the server."""
+        return self.max_age is not None and time.time() - entry['stored_at'] < self.max_age
+
+    def validators(self, entry: Dict[str, object]) -> Dict[str, str]:
+        """Headers for a conditional request revalidating `entry`."""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def hit(self, entry: Dict[str, object], revalidated: bool = False) -> None:
+        """Record that `entry` was served (refreshing its LRU position, and its age if the server revalidated it)."""
+        now = time.time()
+        with self._lock:
+            self.hits += 1
+            if revalidated:
+                self._db.execute('UPDATE entries SET last_access = ?, stored_at = ? WHERE key = ?',
+                                 (now, now, entry['key']))
+            else:
+                self._db.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, entry['key']))
+            self._db.commit()
+
+    def miss(self) -> None:
+        """Record that a request couldn't be served from the cache."""
+        with self._lock:
+            self.misses += 1
+
+    def add_lookups(self, hits: int, misses: int) -> None:
+        """Count hits and misses served by another handle on this cache (e.g. a worker process')."""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def read(self, entry: Dict[str, object]) -> bytes:
+        """The content of `entry`."""
+        with open(self.blob_path(entry['digest']), 'rb') as file:
+            return file.read()
+
+    def copy_to(self, entry: Dict[str, object], path: str) -> None:
+        """Write the content of `entry` to `path` (hard-linked when possible, so it costs no extra disk)."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+        try:
+            os.link(self.blob_path(entry['digest']), path)
+        except OSError:
+            shutil.copyfile(self.blob_path(entry['digest']), path)
+
+    def put(self, url: str, content: bytes, etag: str = None, last_modified: str = None) -> Dict[str, object]:
+        """Cache `content` fetched from `url` with the given validators."""
+        digest = hashlib.sha256(content).hexdigest()
+        if not os.path.exists(self.blob_path(digest)):
+            with _accessories.atomic_write(self.blob_path(digest), mode='wb') as file:
+                file.write(content)
+        return self._add_entry(url, digest, len(content), etag, last_modified)
+
+    def put_file(self, url: str, path: str, etag: str = None, last_modified: str = None,
+                 digest: str = None) -> Dict[str, object]:
+        """Cache the (possibly very large) file at `path` fetched from `url`, without reading it into memory.
+
+        Parameters
+        ----------
+        url : str
+            The url the file was downloaded from.
+        path : str
+            The downloaded file. It's hard-linked into the cache when possible, copied otherwise.
+        etag, last_modified : str
+            The validators the server sent with the file, if any.
+        digest : str
+            The SHA-256 of the file, if it's already known (otherwise it's computed by streaming the file).
+
+        """
+        if digest is None:
+            sha256 = hashlib.sha256()
+            with open(path, 'rb') as file:
+                for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+                    sha256.update(chunk)
+            digest = sha256.hexdigest()
+        blob = self.blob_path(digest)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            try:
+                os.link(path, blob)
+            except OSError:
+                with _accessories.atomic_write(blob, mode='wb') as file, open(path, 'rb') as source:
+                    shutil.copyfileobj(source, file, CHUNK_SIZE)
+        return self._add_entry(url, digest, os.path.getsize(path), etag, last_modified)
+
+    def _add_entry(self, url: str, digest: str, size: int, etag: str, last_modified: str) -> Dict[str, object]:
+        now = time.time()
+        key = cache_key(url, etag, last_modified)
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                             (key, url, digest, size, etag, last_modified, now, now))
+            self._db.commit()
+        self.evict()
+        return {'key': key, 'url': url, 'digest': digest, 'size': size, 'etag': etag,
+                'last_modified': last_modified, 'stored_at': now}
+
+    def size(self) -> int:
+        """The total bytes of the distinct blobs currently referenced."""
+        with self._lock:
+            return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM '
+                                    '(SELECT DISTINCT digest, size FROM entries)').fetchone()[0]
+
+    def evict(self, max_bytes: int = None) -> int:
+        """Evict least recently used entries until the distinct blobs fit in `max_bytes` (default: the budget).
+
+        Returns
+        -------
+        int
+            The number of entries evicted.
+
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        evicted = 0
+        with self._lock:
+            total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM '
+                                     '(SELECT DISTINCT digest, size FROM entries)').fetchone()[0]
+            if total <= max_bytes:
+                return 0
+            for key, digest, size in self._db.execute('SELECT key, digest, size FROM entries '
+                                                      'ORDER BY last_access ASC').fetchall():
+                if total <= max_bytes:
+                    break
+                self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                evicted += 1
+                if self._db.execute('SELECT 1 FROM entries WHERE digest = ? LIMIT 1', (digest,)).fetchone() is None:
+                    if os.path.exists(self.blob_path(digest)):
+                        os.remove(self.blob_path(digest))
+                    total -= size
+            self._db.commit()
+        return evicted
+
+    def hit_rate(self) -> float:
+        """The fraction of requests served from the cache (NaN before any request)."""
+        requests_made = self.hits + self.misses
+        return self.hits / requests_made if requests_made else float('nan')
+
+    def stats(self) -> Dict[str, float]:
+        """Hits, misses, hit rate and the bytes currently used on disk."""
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate(), 'bytes': self.size()}
+
+    def close(self) -> None:
+        """Close the index."""
+        with self._lock:
+            self._db.close()
+
+
+# EOF
+
+# EOF
@@ -0,0 +1,249 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 15:10:03:030  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: _catalog_join.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 15:10:03:030  GMT-0600
+# @License: [Private IP]
+
+from collections import defaultdict
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+_ = """
+#######################################################################################################################
+#########################################   CATALOG JOIN – HYPERPARAMETERS   ##########################################
+#######################################################################################################################
+"""
+# Length of the n-grams used for fuzzy and substring lookups of flight ids
+NGRAM = 3
+# Left rows joined at a time by `iter_join` (bounds the size of each joined chunk)
+JOIN_CHUNKSIZE = 500_000
+
+_ = """
+#######################################################################################################################
+#############################################   FLIGHT ID NORMALIZATION   #############################################
+#######################################################################################################################
+"""
+
+
+def normalize_flight_ids(flight_ids: pd.Series, dtype: pd.CategoricalDtype = None) -> pd.Series:
+    """Normalize flight ids to their canonical key: upper case, no surrounding whitespace and "_" instead of "-".
+
+    Only the distinct ids (the categories) are normalized, not every row.
+
+    Parameters
+    ----------
+    flight_ids : pd.Series
+        The flight ids (strings or categorical).
+    dtype : pd.CategoricalDtype
+        The categories of the result (e.g. shared by both sides of a join). Defaults to the normalized ids themselves.
+
+    Returns
+    -------
+    pd.Series
+        The canonical, categorical keys (same index as `flight_ids`).
+
+    """
+    categorical = flight_ids.astype('category')
+    categories = categorical.cat.categories
+    normalized = pd.Index(categories.astype(str)).str.strip().str.upper().str.replace('-', '_', regex=False)
+    dtype = dtype or pd.CategoricalDtype(pd.Index(normalized).unique().dropna())
+    return pd.Series(pd.Categorical.from_codes(_recode(categorical.cat.codes.to_numpy(), normalized, dtype.categories),
+                                               dtype=dtype), index=flight_ids.index, name=flight_ids.name)
+
+
+def _recode(codes: np.ndarray, categories: pd.Index, target: pd.Index) -> np.ndarray:
+    """Codes into `categories` as codes into `target` (-1 if missing, or not in `target`), without hashing rows."""
+    # Missing ids have code -1, which picks the trailing -1
+    return np.append(target.get_indexer(categories), -1)[codes].astype('int64')
+
+
+def _ngrams(key: str, n: int = NGRAM) -> set:
+    padded = f'^{key}$'
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+_ = """
+#######################################################################################################################
+##################################################   CATALOG JOIN   ###################################################
+#######################################################################################################################
+"""
+
+
+class CatalogJoin:
+    """Joins the downloaded frames table (`raw_df`) to the scraped catalog (`surface_level_data`) on flight id.
+
+    Both sides are normalized once into a shared categorical key, so the join itself only compares integer codes:
+
+    - a hash index (rows of the right side grouped by key code) answers exact matches,
+    - a sorted key list answers prefix lookups, and
+    - an n-gram inverted index over the distinct keys answers substring and fuzzy (near-miss) lookups.
+
+    Parameters
+    ----------
+    left, right : pd.DataFrame
+        The tables to join (e.g. `raw_df` and `surface_level_data`).
+    left_on, right_on : str
+        Their flight id columns.
+
+    """
+
+    def __init__(self, left: pd.DataFrame, right: pd.DataFrame, left_on: str = 'flight_id',
+                 right_on: str = 'flight_id') -> None:
+        self.left, self.right = left, right
+        self.left_on, self.right_on = left_on, right_on
+
+        left_keys, right_keys = normalize_flight_ids(left[left_on]), normalize_flight_ids(right[right_on])
+        self.dtype = pd.CategoricalDtype(left_keys.cat.categories.union(right_keys.cat.categories))
+        self.keys = self.dtype.categories
+        self.left_codes = _recode(left_keys.cat.codes.to_numpy(), left_keys.cat.categories, self.keys)
+        self.right_codes = _recode(right_keys.cat.codes.to_numpy(), right_keys.cat.categories, self.keys)
+
+        # Hash index: the right rows of key code `c` are `right_order[right_starts[c]:right_starts[c + 1]]`
+        n_keys = len(self.keys)
+        valid = self.right_codes >= 0
+        self.right_order = np.flatnonzero(valid)[np.argsort(self.right_codes[valid], kind='stable')]
+        counts = np.bincount(self.right_codes[valid], minlength=n_keys)
+        self.right_starts = np.concatenate([[0], np.cumsum(counts)])
+        self.left_counts = np.bincount(self.left_codes[self.left_codes >= 0], minlength=n_keys)
+        self.right_counts = counts
+
+        # Sorted keys (for prefix lookups); the n-gram inverted index (for substring and fuzzy lookups) is only built
+        # by the first of them, since a plain join never needs it
+        self._sorted_keys = np.sort(self.keys.to_numpy(dtype=str))
+        self._ngrams = None
+
+    @property
+    def _ngram_index(self) -> dict:
+        if self._ngrams is None:
+            ngram_index = defaultdict(list)
+            for code, key in enumerate(self.keys):
+                for gram in _ngrams(key):
+                    ngram_index[gram].append(code)
+            self._ngrams = {gram: np.asarray(codes) for gram, codes in ngram_index.items()}
+        return self._ngrams
+
+    def code(self, flight_id: str) -> int:
+        """The key code of a (raw) flight id, or -1 if neither side has it."""
+        key = normalize_flight_ids(pd.Series([flight_id]), self.dtype).cat.codes.iloc[0]
+        return int(key)
+
+    def lookup(self, flight_id: str) -> pd.DataFrame:
+        """The right-side rows with exactly this flight id (after normalization)."""
+        code = self.code(flight_id)
+        if code < 0:
+            return self.right.iloc[[]]
+        return self.right.iloc[self.right_order[self.right_starts[code]:self.right_starts[code + 1]]]
+
+    def prefix(self, prefix: str) -> List[str]:
+        """Every (normalized) flight id starting with `prefix`."""
+        prefix = normalize_flight_ids(pd.Series([prefix])).iloc[0]
+        start = np.searchsorted(self._sorted_keys, prefix, side='left')
+        end = np.searchsorted(self._sorted_keys, prefix + '\U0010ffff', side='left')
+        return self._sorted_keys[start:end].tolist()
+
+    def contains(self, fragment: str) -> List[str]:
+        """Every (normalized) flight id containing `fragment` (e.g. "C_10800X"), found through the n-gram index."""
+        fragment = normalize_flight_ids(pd.Series([fragment])).iloc[0]
+        grams = [fragment[i:i + NGRAM] for i in range(len(fragment) - NGRAM + 1)]
+        if not grams:
+            return [key for key in self.keys if fragment in key]
+        candidates = None
+        for gram in grams:
+            codes = self._ngram_index.get(gram, np.empty(0, dtype='int64'))
+            candidates = codes if candidates is None else np.intersect1d(candidates, codes, assume_unique=True)
+        return sorted(key for key in self.keys[candidates] if fragment in key)
+
+    def suggest(self, flight_id: str, k: int = 5, side: str = 'right') -> List[Tuple[str, float]]:
+        """The `k` flight ids on `side` most similar to `flight_id` (Jaccard similarity of their n-grams).
+
+        Parameters
+        ----------
+        flight_id : str
+            The (raw) flight id to find near misses of.
+        k : int
+            The number of suggestions.
+        side : str
+            "right" or "left": only suggest ids present on this side of the join.
+
+        Returns
+        -------
+        List[Tuple[str, float]]
+            `(flight_id, similarity)` pairs, most similar first.
+
+        """
+        grams = _ngrams(normalize_flight_ids(pd.Series([flight_id])).iloc[0])
+        present = (self.right_counts if side == 'right' else self.left_counts) > 0
+        shared = defaultdict(int)
+        for gram in grams:
+            for code in self._ngram_index.get(gram, ()):
+                if present[code]:
+                    shared[code] += 1
+        scores = [(self.keys[code], count / (len(grams) + len(_ngrams(self.keys[code])) - count))
+                  for code, count in shared.items()]
+        return sorted(scores, key=lambda pair: (-pair[1], pair[0]))[:k]
+
+    def unmatched(self) -> pd.DataFrame:
+        """The keys present on only one side of the join, with their row counts on that side."""
+        left_only = (self.left_counts > 0) & (self.right_counts == 0)
+        right_only = (self.right_counts > 0) & (self.left_counts == 0)
+        return pd.concat([pd.DataFrame({'flight_id': self.keys[left_only], 'side': 'left',
+                                        'rows': self.left_counts[left_only]}),
+                          pd.DataFrame({'flight_id': self.keys[right_only], 'side': 'right',
+                                        'rows': self.right_counts[right_only]})], ignore_index=True)
+
+    def near_misses(self, k: int = 3, min_similarity: float = 0.5) -> pd.DataFrame:
+        """For every left-only key, the most similar right-only keys (the likely spelling mismatches to debug)."""
+        unmatched = self.unmatched()
+        records = [(key, suggestion, similarity)
+                   for key in unmatched.loc[unmatched['side'] == 'left', 'flight_id']
+                   for suggestion, similarity in self.suggest(key, k=k, side='right')
+                   if similarity >= min_similarity]
+        return pd.DataFrame(records, columns=['flight_id', 'suggestion', 'similarity'])
+
+    def _join_positions(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Matching (left, right) row positions for the left rows `start:stop`, in left order."""
+        codes = self.left_codes[start:stop]
+        counts = np.where(codes >= 0, self.right_counts[np.maximum(codes, 0)], 0)
+        left_positions = np.repeat(np.arange(start, stop), counts)
+        # For each output row, its offset within the matching right group
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        right_positions = self.right_order[np.repeat(self.right_starts[np.maximum(codes, 0)], counts) + offsets]
+        return left_positions, right_positions
+
+    def iter_join(self, chunksize: int = JOIN_CHUNKSIZE,
+                  suffixes: Tuple[str, str] = ('_x', '_y')) -> Iterator[pd.DataFrame]:
+        """Inner join, `chunksize` left rows at a time (so memory stays bounded however large the tables get).
+
+        Each chunk has the canonical, categorical `flight_id` key followed by the other columns of both sides;
+        overlapping column names get `suffixes`, like `pd.merge`.
+        """
+        left_columns = [c for c in self.left.columns if c != self.left_on]
+        right_columns = [c for c in self.right.columns if c != self.right_on]
+        overlap = set(left_columns) & set(right_columns)
+        # Both sides are subset (and renamed) once; each chunk only takes its rows from them
+        left = self.left[left_columns].set_axis([c + suffixes[0] if c in overlap else c for c in left_columns], axis=1)
+        right = self.right[right_columns].set_axis([c + suffixes[1] if c in overlap else c for c in right_columns],
+                                                   axis=1)
+
+        # An empty left side still yields one (empty) chunk, so that the columns are always known
+        for start in range(0, max(len(self.left), 1), chunksize):
+            left_positions, right_positions = self._join_positions(start, min(start + chunksize, len(self.left)))
+            key = pd.Categorical.from_codes(self.left_codes[left_positions], dtype=self.dtype)
+            yield pd.concat([pd.DataFrame({'flight_id': key}), left.take(left_positions).reset_index(drop=True),
+                             right.take(right_positions).reset_index(drop=True)], axis=1)
+
+    def join(self, suffixes: Tuple[str, str] = ('_x', '_y')) -> pd.DataFrame:
+        """Inner join of both sides on the canonical flight id (see `iter_join`).
+
+        The chunks are concatenated, so the whole result is in memory at once; only `iter_join` is memory-bounded.
+        """
+        return pd.concat(self.iter_join(suffixes=suffixes), ignore_index=True)
+
+
+# EOF
+
+# EOF
@@ -0,0 +1,149 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 10:10:41:410  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: _checkpoint.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 10:10:41:410  GMT-0600
+# @License: [Private IP]
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict
+
+import pandas as pd
+
+import _references._accessories as _accessories
+
+_ = """
+#######################################################################################################################
+##########################################   CHECKPOINT – HYPERPARAMETERS   ###########################################
+#######################################################################################################################
+"""
+CHECKPOINT_DIR = 'Data/checkpoints/surface_level/'
+INDEX_FILENAME = 'index.json'
+
+_ = """
+#######################################################################################################################
+################################################   CHECKPOINT STORE   #################################################
+#######################################################################################################################
+"""
+
+
+def content_hash(content: bytes) -> str:
+    """The SHA-256 hex digest of some page content, used when the server sends no usable validators."""
+    return hashlib.sha256(content).hexdigest()
+
+
+class CheckpointStore:
+    """Persists each scraped table as soon as it's available, keyed by the url it was scraped from.
+
+    Every table is written to its own pickle (which keeps list-valued cells such as `scale` intact) and the index of
+    validators (`ETag`, `Last-Modified`, content hash) is rewritten after every save. Both are replaced atomically, so
+    an interrupted run never leaves a partial checkpoint behind and simply resumes on the next run.
+
+    Parameters
+    ----------
+    directory : str
+        Where the checkpointed tables and their index are stored.
+
+    """
+
+    def __init__(self, directory: str = CHECKPOINT_DIR) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(directory, INDEX_FILENAME)
+        self._index = {}
+        if os.path.exists(self._index_path):
+            with open(self._index_path, 'r') as file:
+                self._index = json.load(file)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._index and os.path.exists(self._table_path(url))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _table_path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.pkl')
+
+    def _write_index(self) -> None:
+        with _accessories.atomic_write(self._index_path, mode='w') as file:
+            json.dump(self._index, file, indent=1, sort_keys=True)
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """Headers for a conditional request of `url`, based on the validators stored with its checkpoint.
+
+        Parameters
+        ----------
+        url : str
+            The url which is about to be requested.
+
+        Returns
+        -------
+        Dict[str, str]
+            `If-None-Match` and/or `If-Modified-Since` headers (empty if there's no checkpoint for `url`).
+
+        """
+        if url not in self:
+            return {}
+        entry = self._index[url]
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def is_unchanged(self, url: str, digest: str) -> bool:
+        """Whether the checkpoint of `url` was scraped from content with the same hash."""
+        return url in self and self._index[url].get('content_hash') == digest
+
+    def save(self, url: str, table: pd.DataFrame, etag: str = None, last_modified: str = None,
+             digest: str = None, **metadata: str) -> None:
+        """Atomically checkpoint the table scraped from `url`.
+
+        Parameters
+        ----------
+        url : str
+            The url the table was scraped from.
+        table : pd.DataFrame
+            The parsed table.
+        etag : str
+            The `ETag` header of the response, if any.
+        last_modified : str
+            The `Last-Modified` header of the response, if any.
+        digest : str
+            The `content_hash` of the page content, if available.
+        **metadata : str
+            Any other information worth keeping in the index (e.g. the county name).
+
+        """
+        with _accessories.atomic_write(self._table_path(url), mode='wb') as file:
+            table.to_pickle(file)
+        with self._lock:
+            self._index[url] = dict(metadata, etag=etag, last_modified=last_modified, content_hash=digest,
+                                    saved_at=time.time())
+            self._write_index()
+
+    def load(self, url: str) -> pd.DataFrame:
+        """Load the checkpointed table of `url`."""
+        return pd.read_pickle(self._table_path(url))
+
+    def move(self, url: str, other: 'CheckpointStore') -> None:
+        """Move the checkpoint of `url` (its table and validators) into the store `other` (on the same file system)."""
+        with self._lock:
+            entry = self._index.pop(url)
+            os.makedirs(other.directory, exist_ok=True)
+            os.replace(self._table_path(url), other._table_path(url))
+            with other._lock:
+                other._index[url] = entry
+                other._write_index()
+            self._write_index()
+
+
+# EOF
+
+# EOF
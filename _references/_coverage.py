@@ -0,0 +1,271 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 23:10:07:070  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: _coverage.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 23:10:07:070  GMT-0600
+# @License: [Private IP]
+
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+import _references._spatial as _spatial
+
+_ = """
+#######################################################################################################################
+###########################################   COVERAGE – HYPERPARAMETERS   ############################################
+#######################################################################################################################
+"""
+# The side of each cell of the space-time index, in degrees
+CELL_SIZE = _spatial.CELL_SIZE
+# Side (degrees) of the cells coverage is evaluated at; a cell is covered if a frame's footprint covers its centre
+COVERAGE_CELL = 0.005
+# Bits of the sort key holding the day of the frame (within its spatial cell); 2 ** 20 days is over 2,800 years
+TIME_BITS = 20
+
+_ = """
+#######################################################################################################################
+#####################################################   HELPERS   #####################################################
+#######################################################################################################################
+"""
+
+
+def year_start(year: int) -> np.datetime64:
+    """The first day of `year`."""
+    return np.datetime64(f'{int(year):04d}-01-01', 'D')
+
+
+def raster_shape(bbox: Tuple[float, float, float, float], resolution: float) -> Tuple[int, int]:
+    """The (rows, columns) of a raster of `resolution`-degree cells over `bbox` (row 0 is at `min_lat`)."""
+    min_long, min_lat, max_long, max_lat = bbox
+    return (max(int(np.ceil((max_lat - min_lat) / resolution)), 1),
+            max(int(np.ceil((max_long - min_long) / resolution)), 1))
+
+
+def cell_bboxes(cells: np.ndarray, bbox: Tuple[float, float, float, float], resolution: float) -> np.ndarray:
+    """The (min_long, min_lat, max_long, max_lat) of each `(row, column)` cell of a raster over `bbox`."""
+    cells = np.asarray(cells, dtype='int64').reshape(-1, 2)
+    min_long, min_lat = bbox[0] + cells[:, 1] * resolution, bbox[1] + cells[:, 0] * resolution
+    return np.column_stack([min_long, min_lat, min_long + resolution, min_lat + resolution])
+
+
+_ = """
+#######################################################################################################################
+################################################   SPACE-TIME INDEX   #################################################
+#######################################################################################################################
+"""
+
+
+class SpaceTimeIndex:
+    """Space-time index over frames (centroid `long`/`lat`, `date` and `scale`) for "which frames cover this area,
+    and when" queries.
+
+    Frames are bucketed into the same uniform grid as `_spatial.GridIndex`, and sorted by one int64 key: the cell in
+    the high bits and the day of the frame in the low `TIME_BITS`. The frames of one cell within a date range are
+    therefore contiguous, so every (cell, date range) of a query is two binary searches – for all the cells of a bbox
+    at once – instead of a filter over the whole table.
+
+    Each frame covers a square footprint around its centroid (see `_spatial.footprint_km`); frames without a scale
+    only cover their centroid. Queries return positional row indices (sorted, i.e. in table order) for use with
+    `.iloc`. Rows with missing coordinates or dates are never returned.
+
+    Parameters
+    ----------
+    long, lat : np.ndarray
+        The centroids, one per row of the indexed table.
+    dates : pd.Series
+        The date of each frame.
+    scale : np.ndarray
+        The scale denominator of each frame (see `_spatial.scale_denominators`).
+    cell_size : float
+        The side of each grid cell, in degrees.
+
+    """
+
+    def __init__(self, long: np.ndarray, lat: np.ndarray, dates: pd.Series, scale: np.ndarray,
+                 cell_size: float = CELL_SIZE) -> None:
+        long, lat = np.asarray(long, dtype='float64'), np.asarray(lat, dtype='float64')
+        days = pd.Series(dates).to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+        scale = np.asarray(scale, dtype='float64')
+        self.n_rows = len(long)
+        self.cell_size = cell_size
+
+        valid = np.flatnonzero(np.isfinite(long) & np.isfinite(lat) & ~np.isnat(days))
+        long, lat, days, scale = long[valid], lat[valid], days[valid], scale[valid]
+        self.origin = (long.min(), lat.min()) if len(valid) else (0.0, 0.0)
+        self.shape = ((int(np.floor((lat.max() - self.origin[1]) / cell_size)) + 1,
+                       int(np.floor((long.max() - self.origin[0]) / cell_size)) + 1) if len(valid) else (1, 1))
+        self.day0 = days.min() if len(valid) else np.datetime64('1900-01-01', 'D')
+
+        keys = (self._cells(long, lat) << TIME_BITS) + (days - self.day0).astype('int64')
+        order = np.argsort(keys, kind='stable')
+        self.positions, self.keys = valid[order], keys[order]
+        self.long, self.lat, self.scale = long[order], lat[order], scale[order]
+        self.years = days[order].astype('datetime64[Y]').astype('int64') + 1970
+
+        # Half the side of each footprint in degrees (NaN scales have none), and the largest, to pad queries with
+        self.half_lat = np.nan_to_num(_spatial.footprint_km(self.scale) / 2 / _spatial.KM_PER_DEGREE)
+        self.half_long = self.half_lat / np.cos(np.radians(self.lat))
+        self.max_half = (self.half_long.max(), self.half_lat.max()) if len(valid) else (0.0, 0.0)
+
+    @classmethod
+    def from_frames(cls, data: pd.DataFrame, cell_size: float = CELL_SIZE) -> 'SpaceTimeIndex':
+        """Index the frames of the flights table (its `long`, `lat`, `date` and `scale`)."""
+        return cls(data['long'], data['lat'], data['date'], _spatial.scale_denominators(data['scale']), cell_size)
+
+    def _cells(self, long: np.ndarray, lat: np.ndarray) -> np.ndarray:
+        # NOTE: Must be computed exactly as in `_cell_range` (see `_spatial.GridIndex._cells`)
+        ix = np.floor((long - self.origin[0]) / self.cell_size).astype('int64')
+        iy = np.floor((lat - self.origin[1]) / self.cell_size).astype('int64')
+        return iy * self.shape[1] + ix
+
+    def _cell_range(self, value: float, axis: int) -> int:
+        return int(np.clip(np.floor((value - self.origin[axis]) / self.cell_size), 0, self.shape[1 - axis] - 1))
+
+    def _day(self, year: int, default: int) -> int:
+        """The offset of the first day of `year` in the sort key (clipped to its range; `default` if None)."""
+        if year is None:
+            return default
+        return int(np.clip((year_start(year) - self.day0).astype('int64'), 0, 1 << TIME_BITS))
+
+    def _hits(self, bbox: Tuple[float, float, float, float], start: int = None, end: int = None) -> np.ndarray:
+        """Offsets (into the sorted arrays) of the frames from years [start, end) whose footprint overlaps `bbox`."""
+        min_long, min_lat, max_long, max_lat = bbox
+        if min_long > max_long or min_lat > max_lat or len(self.keys) == 0:
+            return np.empty(0, dtype='int64')
+        # Any frame whose footprint reaches the bbox has its centroid within the largest half footprint of it
+        ix0, ix1 = self._cell_range(min_long - self.max_half[0], 0), self._cell_range(max_long + self.max_half[0], 0)
+        iy0, iy1 = self._cell_range(min_lat - self.max_half[1], 1), self._cell_range(max_lat + self.max_half[1], 1)
+        cells = ((np.arange(iy0, iy1 + 1) * self.shape[1])[:, None] + np.arange(ix0, ix1 + 1)).ravel() << TIME_BITS
+        starts = np.searchsorted(self.keys, cells + self._day(start, 0), side='left')
+        ends = np.searchsorted(self.keys, cells + self._day(end, 1 << TIME_BITS), side='left')
+        # Concatenate the ranges [start, end) without a Python-level loop (as in `_spatial.GridIndex._candidates`)
+        lengths = np.maximum(ends - starts, 0)
+        offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        candidates = offsets + np.arange(lengths.sum())
+
+        long, lat = self.long[candidates], self.lat[candidates]
+        half_long, half_lat = self.half_long[candidates], self.half_lat[candidates]
+        return candidates[(long + half_long >= min_long) & (long - half_long <= max_long) &
+                          (lat + half_lat >= min_lat) & (lat - half_lat <= max_lat)]
+
+    def _windows(self, hits: np.ndarray, bbox: Tuple[float, float, float, float],
+                 resolution: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """The raster cells [row0, row1) x [col0, col1) whose centres each frame's footprint covers (always including
+        the cell of its centroid), clipped to a raster of `resolution`-degree cells over `bbox`."""
+        n_rows, n_cols = raster_shape(bbox, resolution)
+        windows = []
+        for centre, half, origin, size in ((self.lat[hits], self.half_lat[hits], bbox[1], n_rows),
+                                           (self.long[hits], self.half_long[hits], bbox[0], n_cols)):
+            own = np.floor((centre - origin) / resolution)
+            first = np.minimum(np.ceil((centre - half - origin) / resolution - 0.5), own)
+            last = np.maximum(np.floor((centre + half - origin) / resolution - 0.5), own) + 1
+            windows += [np.clip(first, 0, size).astype('int64'), np.clip(last, 0, size).astype('int64')]
+        return tuple(windows)
+
+    def _coverage(self, hits: np.ndarray, bbox: Tuple[float, float, float, float], resolution: float) -> np.ndarray:
+        """Boolean raster of the cells covered by any of the frames `hits` (summed with a 2D difference array)."""
+        n_rows, n_cols = raster_shape(bbox, resolution)
+        row0, row1, col0, col1 = self._windows(hits, bbox, resolution)
+        keep = (row0 < row1) & (col0 < col1)
+        row0, row1, col0, col1 = row0[keep], row1[keep], col0[keep], col1[keep]
+        difference = np.zeros((n_rows + 1, n_cols + 1), dtype='int64')
+        for rows, cols, sign in ((row0, col0, 1), (row0, col1, -1), (row1, col0, -1), (row1, col1, 1)):
+            np.add.at(difference, (rows, cols), sign)
+        return difference.cumsum(axis=0).cumsum(axis=1)[:n_rows, :n_cols] > 0
+
+    def frames(self, bbox: Tuple[float, float, float, float], start: int = None, end: int = None) -> np.ndarray:
+        """Rows whose footprint overlaps `bbox` (min_long, min_lat, max_long, max_lat), from years [start, end)."""
+        return np.sort(self.positions[self._hits(bbox, start, end)])
+
+    def best_frames(self, bbox: Tuple[float, float, float, float], year: int, max_years: int = None,
+                    resolution: float = COVERAGE_CELL) -> np.ndarray:
+        """The finest-scale frames closest to `year` at every spot of `bbox`.
+
+        Each `resolution`-degree cell of the bbox is assigned the frames covering it that were taken nearest to
+        `year` (the earlier year on ties) and, among those, at the finest scale (frames without a scale last). Every
+        frame taken in that year at that scale which covers the cell is kept, so whole frame sets are returned.
+
+        Parameters
+        ----------
+        bbox : Tuple[float, float, float, float]
+            The area, as (min_long, min_lat, max_long, max_lat).
+        year : int
+            The year the frames should be closest to.
+        max_years : int
+            If supplied, frames more than this many years from `year` are never picked (cells are left uncovered).
+        resolution : float
+            The side of the cells each pick is made for, in degrees.
+
+        Returns
+        -------
+        np.ndarray
+            The positional rows of the picked frames, sorted.
+
+        """
+        hits = self._hits(bbox, *((None, None) if max_years is None else (year - max_years, year + max_years + 1)))
+        if len(hits) == 0:
+            return np.empty(0, dtype='int64')
+        years, scale = self.years[hits], np.nan_to_num(self.scale[hits], nan=np.inf)
+        # Rank frames by (distance in years, year, scale); frames of the same year and scale share a rank
+        order = np.lexsort((scale, years, np.abs(years - year)))
+        ranked_years, ranked_scale = years[order], scale[order]
+        new_group = np.concatenate([[True], (ranked_years[1:] != ranked_years[:-1]) |
+                                     (ranked_scale[1:] != ranked_scale[:-1])])
+        ranks = np.empty(len(hits), dtype='int64')
+        ranks[order] = np.cumsum(new_group)
+
+        # Paint worst first, so every cell ends up with the best rank covering it; keep the frames that won a cell
+        row0, row1, col0, col1 = self._windows(hits, bbox, resolution)
+        best = np.full(raster_shape(bbox, resolution), ranks.max() + 1, dtype='int64')
+        for i in order[::-1]:
+            best[row0[i]:row1[i], col0[i]:col1[i]] = ranks[i]
+        picked = [i for i in range(len(hits)) if (best[row0[i]:row1[i], col0[i]:col1[i]] == ranks[i]).any()]
+        return np.sort(self.positions[hits[picked]])
+
+    def coverage(self, bbox: Tuple[float, float, float, float], start: int = None, end: int = None,
+                 resolution: float = COVERAGE_CELL) -> np.ndarray:
+        """Boolean raster (row 0 at `min_lat`) of the `resolution`-degree cells of `bbox` covered by a frame from
+        years [start, end)."""
+        return self._coverage(self._hits(bbox, start, end), bbox, resolution)
+
+    def coverage_gaps(self, bbox: Tuple[float, float, float, float], start: int, end: int, step: int = 10,
+                      resolution: float = COVERAGE_CELL) -> pd.DataFrame:
+        """The coverage of `bbox` in each `step`-year period from `start` to `end`, and where its gaps are.
+
+        Parameters
+        ----------
+        bbox : Tuple[float, float, float, float]
+            The area, as (min_long, min_lat, max_long, max_lat).
+        start, end : int
+            The first year, and the year after the last.
+        step : int
+            The years per period (e.g. 10 for decades).
+        resolution : float
+            The side of the cells coverage is evaluated at, in degrees.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per period, with its `start` and `end` years, the number of `frames` overlapping the bbox, the
+            fraction of the bbox covered (`coverage`), the number of uncovered cells (`gap_cells`) and their bboxes
+            (`gaps`, an array of (min_long, min_lat, max_long, max_lat) rows).
+
+        """
+        periods = []
+        for period_start in range(start, end, step):
+            period_end = min(period_start + step, end)
+            hits = self._hits(bbox, period_start, period_end)
+            covered = self._coverage(hits, bbox, resolution)
+            gaps = np.argwhere(~covered)
+            periods.append({'start': period_start, 'end': period_end, 'frames': len(hits),
+                            'coverage': covered.mean(), 'gap_cells': len(gaps),
+                            'gaps': cell_bboxes(gaps, bbox, resolution)})
+        return pd.DataFrame(periods, columns=['start', 'end', 'frames', 'coverage', 'gap_cells', 'gaps'])
+
+
+# EOF
+
+# EOF
@@ -0,0 +1,285 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 22:10:31:310  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: _deep_scrape.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 22:10:31:310  GMT-0600
+# @License: [Private IP]
+
+import glob
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+import _references._accessories as _accessories
+import _references._scrape_engine as _scrape_engine
+
+_ = """
+#######################################################################################################################
+#########################################   DEEPER SCRAPE – HYPERPARAMETERS   #########################################
+#######################################################################################################################
+"""
+FRAME_STORE_DIR = 'Data/frames/'
+# Log of the index pages whose frames are in the store (one url per line, appended after their part is written)
+DONE_FILENAME = 'done.txt'
+# Number of index pages fetched at once, and how many of those may hit the same host
+N_INDEX_WORKERS = 8
+PER_HOST_INDEX = 2
+# Frame records buffered in memory before they're written out as a new part of the store
+FLUSH_ROWS = 50_000
+
+# Links to these are frame-level records (scans, index sheets and other images of the flight)
+IMAGE_EXTENSIONS = ('.tif', '.tiff', '.jpg', '.jpeg', '.jp2', '.sid', '.png', '.pdf')
+# The frame is the last "_"-separated part of the file name (e.g. "c-10800_1-12.tif" -> "1-12")
+FRAME_PATTERN = r'_([^_/]+)\.[A-Za-z0-9]+$'
+# Every part of the store is written with these columns; categoricals are only applied when it's read
+FRAME_COLUMNS = {'flight_id': 'string', 'index_url': 'string', 'frame': 'string', 'frame_number': 'Int64',
+                 'kind': 'string', 'url': 'string', 'label': 'string', 'fetched_at': 'datetime64[ns, UTC]'}
+FRAME_CATEGORICALS = ['flight_id', 'index_url', 'kind']
+
+_ = """
+#######################################################################################################################
+###############################################   INDEX PAGE PARSING   ################################################
+#######################################################################################################################
+"""
+
+
+def unique_index_pages(surface_level: pd.DataFrame) -> pd.DataFrame:
+    """One row per distinct index page of the surface-level data (the same flight is listed under several counties).
+
+    Returns
+    -------
+    pd.DataFrame
+        The `index_url` and `flight_id` of each page (the first listing's), in first-listed order.
+
+    """
+    pages = pd.DataFrame({'index_url': surface_level['index_url'].astype('string').str.strip().str.rstrip('/'),
+                          'flight_id': surface_level['flight_id'].astype('string')})
+    return pages[pages['index_url'].notna() & (pages['index_url'] != '')].drop_duplicates('index_url') \
+        .reset_index(drop=True)
+
+
+def parse_index_page(content: bytes, index_url: str, flight_id: str) -> pd.DataFrame:
+    """Extract the frame-level records of one index page: every link on it to a scan, index sheet or other image.
+
+    Parameters
+    ----------
+    content : bytes
+        The page.
+    index_url : str
+        The page's url (relative links are resolved against it).
+    flight_id : str
+        The flight the page belongs to.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per distinct link, with `FRAME_COLUMNS` (`kind` is "scan" for TIFFs, "index" for index sheets and
+        "image" otherwise; index sheets have no `frame`, and `frame_number` is the trailing number of the frame, if it
+        has one).
+
+    """
+    tree = _accessories.parse_html(content, base_url=index_url)
+    links = {}
+    for anchor in tree.iter('a'):
+        href = anchor.get('href')
+        if href and href.split('?')[0].lower().endswith(IMAGE_EXTENSIONS):
+            links.setdefault(_accessories.html_attribute(anchor, 'href'), anchor.text_content().strip())
+
+    records = pd.DataFrame({'url': pd.array(list(links), dtype='string'),
+                            'label': pd.array(list(links.values()), dtype='string')})
+    path = records['url'].str.split('?').str[0].str.lower()
+    records['frame'] = records['url'].str.split('?').str[0].str.extract(FRAME_PATTERN, expand=False)
+    records['frame_number'] = pd.to_numeric(records['frame'].str.extract(r'(\d+)$', expand=False)).astype('Int64')
+    records['kind'] = np.where(path.str.endswith(('.tif', '.tiff')), 'scan',
+                               np.where(path.str.rsplit('/', n=1).str[-1].str.contains('index'), 'index', 'image'))
+    records['frame'] = records['frame'].mask(records['kind'] == 'index')
+    records['flight_id'], records['index_url'] = flight_id, index_url
+    records['fetched_at'] = pd.Timestamp.now(tz='UTC')
+    return records[list(FRAME_COLUMNS)].astype(FRAME_COLUMNS)
+
+
+_ = """
+#######################################################################################################################
+################################################   APPEND-ONLY STORE   ################################################
+#######################################################################################################################
+"""
+
+
+class FrameStore:
+    """Append-only, typed store of frame records, written as numbered Parquet parts as records arrive.
+
+    Records are buffered until `flush_rows` of them are waiting, then written as one new part (atomically; existing
+    parts are never rewritten). Only then are the index pages they came from appended to the log of done pages, so a
+    page is either fully in the store or re-scraped on the next run. (A crash between the two can leave a page's
+    records in the store twice, which `read` drops.)
+
+    Parameters
+    ----------
+    directory : str
+        Where the parts and the log of done pages are kept.
+    flush_rows : int
+        Records buffered before a part is written.
+
+    """
+
+    def __init__(self, directory: str = FRAME_STORE_DIR, flush_rows: int = FLUSH_ROWS) -> None:
+        self.directory = directory
+        self.flush_rows = flush_rows
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._done_path = os.path.join(directory, DONE_FILENAME)
+        self._done = set()
+        if os.path.exists(self._done_path):
+            with open(self._done_path, 'r') as file:
+                self._done = {line.strip() for line in file if line.strip()}
+        # Numbered after the highest existing part (not their count, which a removed part would make collide)
+        numbers = [int(re.search(r'part-(\d+)\.parquet$', path).group(1)) for path in self.parts()]
+        self._n_parts = max(numbers, default=-1) + 1
+        self._buffer, self._buffered_rows, self._pending = [], 0, []
+
+    def __contains__(self, index_url: str) -> bool:
+        return index_url in self._done or index_url in self._pending
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def parts(self) -> List[str]:
+        """The paths of every written part, oldest first."""
+        return sorted(glob.glob(os.path.join(self.directory, 'part-[0-9]*.parquet')))
+
+    def append(self, index_url: str, records: pd.DataFrame) -> None:
+        """Add the records of one index page (possibly none), writing a new part once enough are buffered."""
+        with self._lock:
+            if len(records):
+                self._buffer.append(records)
+                self._buffered_rows += len(records)
+            self._pending.append(index_url)
+            if self._buffered_rows >= self.flush_rows:
+                self._flush()
+
+    def flush(self) -> None:
+        """Write whatever is buffered as a new part."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        if self._buffer:
+            data = pd.concat(self._buffer, ignore_index=True).astype(FRAME_COLUMNS)
+            with _accessories.atomic_write(os.path.join(self.directory, f'part-{self._n_parts:06d}.parquet'),
+                                           mode='wb') as file:
+                data.to_parquet(file, index=False)
+            self._n_parts += 1
+        with open(self._done_path, 'a') as file:
+            file.write(''.join(url + '\n' for url in self._pending))
+            file.flush()
+            os.fsync(file.fileno())
+        self._done.update(self._pending)
+        self._buffer, self._buffered_rows, self._pending = [], 0, []
+
+    def read(self, columns: List[str] = None) -> pd.DataFrame:
+        """Every record in the store (parts are read one at a time, and only the `columns` asked for)."""
+        parts = [pd.read_parquet(path, columns=columns) for path in self.parts()]
+        data = pd.concat(parts, ignore_index=True) if parts else \
+            pd.DataFrame({c: pd.Series(dtype=t) for c, t in FRAME_COLUMNS.items() if columns is None or c in columns})
+        data = data.drop_duplicates(subset=[c for c in ('index_url', 'url') if c in data.columns] or None,
+                                    ignore_index=True)
+        for column in FRAME_CATEGORICALS:
+            if column in data.columns:
+                data[column] = data[column].astype('category')
+        return data
+
+    def __enter__(self) -> 'FrameStore':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+
+_ = """
+#######################################################################################################################
+##################################################   INDEX CRAWLER   ##################################################
+#######################################################################################################################
+"""
+
+
+def crawl_index_pages(surface_level: pd.DataFrame, store: FrameStore = None, n_workers: int = N_INDEX_WORKERS,
+                      per_host: int = PER_HOST_INDEX, cache=None) -> pd.DataFrame:
+    """Visit every distinct index page of the surface-level data concurrently, streaming its frames into `store`.
+
+    Each page is fetched once however many counties list its flight, and pages already in the store are skipped.
+    Records are handed to the store as each page arrives; only a one-row summary per page is kept in memory.
+
+    Parameters
+    ----------
+    surface_level : pd.DataFrame
+        The surface-level data (with `index_url` and `flight_id`).
+    store : FrameStore
+        Where the frame records are appended. Defaults to the one in `FRAME_STORE_DIR`.
+    n_workers : int
+        The number of pages fetched at once.
+    per_host : int
+        The maximum number of concurrent requests against a single host.
+    cache : _cache.ContentCache
+        If supplied, pages are fetched through this on-disk cache.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per distinct index page, with its `flight_id`, number of `frames` and `status` ("scraped", "stored"
+        or "failed").
+
+    """
+    store = FrameStore() if store is None else store
+    pages = unique_index_pages(surface_level)
+    pending = pages[[url not in store for url in pages['index_url']]]
+    _accessories._print(f'{len(surface_level)} surface-level rows list {len(pages)} distinct index pages; '
+                        f'{len(pages) - len(pending)} are already stored, fetching the remaining {len(pending)}...',
+                        color='GREEN')
+
+    limiter = _scrape_engine.HostLimiter(per_host)
+    results: Dict[str, dict] = {url: {'frames': None, 'status': 'stored'} for url in pages['index_url']
+                                if url in store}
+
+    def _worker(session_pool: _scrape_engine.ResourcePool, index_url: str, flight_id: str) -> int:
+        with session_pool.acquire() as session, limiter.limit(index_url):
+            response = _accessories.retry_call(lambda: _accessories.fetch_page(session, index_url, cache=cache),
+                                               index_url, retry_on=_accessories.RETRYABLE_HTTP_ERRORS)
+        # Links are resolved against the final url (index pages redirect to their directory), but kept by `index_url`
+        records = parse_index_page(response.content, response.url, flight_id).assign(index_url=index_url)
+        store.append(index_url, records)
+        return len(records)
+
+    start = time.perf_counter()
+    with store, _scrape_engine.ResourcePool(lambda: _accessories.init_session(pool_size=per_host), size=n_workers,
+                                            closer=lambda session: session.close()) as session_pool, \
+            ThreadPoolExecutor(max_workers=n_workers) as executor:
+        futures = {executor.submit(_worker, session_pool, url, flight_id): url
+                   for url, flight_id in zip(pending['index_url'], pending['flight_id'])}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                results[url] = {'frames': future.result(), 'status': 'scraped'}
+            except Exception as e:
+                _accessories._print(f'Could not scrape the index page "{url}"! {str(e)[:100]}\n Proceeding...',
+                                    color='LIGHTRED_EX')
+                results[url] = {'frames': None, 'status': 'failed'}
+    _accessories._print(f'Scraped {len(pending)} index pages in {time.perf_counter() - start:.1f} seconds.',
+                        color='GREEN')
+
+    return pd.DataFrame([dict(results[url], index_url=url, flight_id=flight_id)
+                         for url, flight_id in zip(pages['index_url'], pages['flight_id'])],
+                        columns=['index_url', 'flight_id', 'frames', 'status']).astype({'frames': 'Int64'})
+
+
+# EOF
+
+# EOF
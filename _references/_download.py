@@ -0,0 +1,302 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 11:10:07:070  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: _download.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 11:10:07:070  GMT-0600
+# @License: [Private IP]
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable
+from urllib.parse import urlparse
+
+import pandas as pd
+
+import _references._accessories as _accessories
+import _references._scrape_engine as _scrape_engine
+
+_ = """
+#######################################################################################################################
+###########################################   DOWNLOAD – HYPERPARAMETERS   ############################################
+#######################################################################################################################
+"""
+SCAN_DIR = 'Data/scans/'
+MANIFEST_FILENAME = 'manifest.json'
+# Number of scans downloaded at once, and how many of those may come from the same host
+N_DOWNLOAD_WORKERS = 8
+PER_HOST_DOWNLOADS = 2
+# Bytes read from the network (and written to disk) at a time; a scan is never held in memory as a whole
+CHUNK_SIZE = 1 << 20
+# Seconds to wait for the server to respond (or send the next chunk)
+DOWNLOAD_TIMEOUT = 60
+
+# Every valid TIFF (and BigTIFF) starts with one of these byte-order + version headers
+TIFF_MAGIC = (b'II*\x00', b'MM\x00*', b'II+\x00', b'MM\x00+')
+
+_ = """
+#######################################################################################################################
+################################################   DOWNLOAD MANIFEST   ################################################
+#######################################################################################################################
+"""
+
+
+class DownloadManifest:
+    """Records which scans are completely downloaded (and verified), along with their size and checksum.
+
+    Parameters
+    ----------
+    directory : str
+        The directory the scans are downloaded to; the manifest is kept alongside them.
+
+    """
+
+    def __init__(self, directory: str = SCAN_DIR) -> None:
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_FILENAME)
+        self._lock = threading.Lock()
+        self._entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as file:
+                self._entries = json.load(file)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, url: str) -> dict:
+        """The manifest entry of `url` (None if it isn't done)."""
+        return self._entries.get(url)
+
+    def is_done(self, url: str) -> bool:
+        """Whether `url` is recorded as done and its file is still on disk with the recorded size."""
+        entry = self._entries.get(url)
+        return entry is not None and os.path.exists(entry['path']) and os.path.getsize(entry['path']) == entry['size']
+
+    def mark_done(self, url: str, path: str, size: int, sha256: str) -> None:
+        """Record `url` as completely downloaded to `path` (atomically rewriting the manifest)."""
+        with self._lock:
+            self._entries[url] = {'path': path, 'size': size, 'sha256': sha256, 'completed_at': time.time()}
+            with _accessories.atomic_write(self.path, mode='w') as file:
+                json.dump(self._entries, file, indent=1, sort_keys=True)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Every completed download, one row each."""
+        with self._lock:
+            return pd.DataFrame.from_dict(self._entries, orient='index').rename_axis('url').reset_index()
+
+
+_ = """
+#######################################################################################################################
+#################################################   SCAN DOWNLOADER   #################################################
+#######################################################################################################################
+"""
+
+
+class ChecksumError(Exception):
+    """Raised when a downloaded file isn't a TIFF or doesn't match its expected checksum."""
+
+
+class IncompleteDownloadError(ChecksumError):
+    """Raised when a download ends before the server's advertised length (worth retrying, unlike `ChecksumError`)."""
+
+
+def scan_path(url: str, directory: str = SCAN_DIR) -> str:
+    """The local path a scan url is downloaded to, inside `directory`: its file name plus a hash of the whole url (so
+    same-named scans of different urls never overwrite each other), e.g. "c-10800_1-12_3f2a9c01d4.tif"."""
+    stem, extension = os.path.splitext(os.path.basename(urlparse(url).path))
+    return os.path.join(directory, f'{stem}_{hashlib.sha1(url.encode("utf-8")).hexdigest()[:10]}{extension}')
+
+
+def _content_range_start(response) -> int:
+    """The first byte of a `206 Partial Content` response, from its `Content-Range` (None if it has none)."""
+    found = re.match(r'bytes\s+(\d+)-', response.headers.get('Content-Range', ''))
+    return int(found.group(1)) if found else None
+
+
+def _hash_file(path: str, digest: 'hashlib._Hash', chunk_size: int = CHUNK_SIZE) -> 'hashlib._Hash':
+    """Stream the content of `path` into `digest`."""
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest
+
+
+def download_scan(session, url: str, path: str, expected_sha256: str = None,
+                  chunk_size: int = CHUNK_SIZE) -> Dict[str, object]:
+    """Download a single scan to `path`, resuming a partial download if one exists.
+
+    The response is streamed in `chunk_size` pieces into `<path>.part`, which only replaces `path` once it's complete
+    and verified. If `<path>.part` exists, only the remaining bytes are requested (HTTP Range); servers that ignore the
+    range simply send the whole file again. A partial response is only appended if its `Content-Range` starts where
+    the partial file ends.
+
+    Parameters
+    ----------
+    session : requests.Session
+        The (pooled) keep-alive session created by `_accessories.init_session`.
+    url : str
+        The url of the scan.
+    path : str
+        Where the scan should be saved.
+    expected_sha256 : str
+        The SHA-256 hex digest the file must have, if known.
+    chunk_size : int
+        Bytes read from the network at a time.
+
+    Returns
+    -------
+    Dict[str, object]
+        The `path`, `size` and `sha256` of the downloaded scan.
+
+    Raises
+    ------
+    IncompleteDownloadError
+        If the download ended early (the partial file is kept, so that the next attempt resumes it), or the server
+        answered with a different range (the partial file is removed).
+    ChecksumError
+        If the download isn't a TIFF or doesn't match `expected_sha256`. The partial file is removed, so that the
+        next attempt starts from scratch.
+
+    """
+    part_path = path + '.part'
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {'Range': f'bytes={offset}-'} if offset else None
+
+    digest = hashlib.sha256()
+    with session.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        if response.status_code == 416:
+            # The partial file already holds everything the server has; verify it below
+            _hash_file(part_path, digest, chunk_size)
+            total = offset
+        else:
+            response.raise_for_status()
+            if response.status_code == 206:
+                if _content_range_start(response) != offset:
+                    # The body isn't the rest of the partial file, so it can't be appended; start over next attempt
+                    os.remove(part_path)
+                    raise IncompleteDownloadError(f'"{url}" answered the range from byte {offset} with '
+                                                  f'"{response.headers.get("Content-Range")}".')
+                _hash_file(part_path, digest, chunk_size)
+                mode = 'ab'
+            else:
+                offset, mode = 0, 'wb'
+            length = response.headers.get('Content-Length')
+            total = offset + int(length) if length is not None else None
+            with open(part_path, mode) as file:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    file.write(chunk)
+                    digest.update(chunk)
+
+    size, sha256 = os.path.getsize(part_path), digest.hexdigest()
+    if total is not None and size != total:
+        # Keep the partial file, so the retry resumes from where this attempt stopped
+        raise IncompleteDownloadError(f'"{url}" is incomplete: expected {total} bytes but got {size}.')
+    with open(part_path, 'rb') as file:
+        header = file.read(4)
+    problem = None
+    if header not in TIFF_MAGIC:
+        problem = 'the file is not a TIFF'
+    elif expected_sha256 is not None and sha256 != expected_sha256.lower():
+        problem = f'checksum {sha256} does not match {expected_sha256}'
+    if problem is not None:
+        os.remove(part_path)
+        raise ChecksumError(f'"{url}" failed verification: {problem}.')
+
+    os.replace(part_path, path)
+    return {'path': path, 'size': size, 'sha256': sha256}
+
+
+def download_scans(urls: Iterable[str], directory: str = SCAN_DIR, checksums: Dict[str, str] = None,
+                   n_workers: int = N_DOWNLOAD_WORKERS, per_host: int = PER_HOST_DOWNLOADS,
+                   manifest: DownloadManifest = None, cache=None) -> pd.DataFrame:
+    """Download many scans concurrently, skipping those the manifest already records as done.
+
+    Parameters
+    ----------
+    urls : Iterable[str]
+        The scan urls (e.g. `raw_df['scan']`). Missing values and duplicates are ignored.
+    directory : str
+        Where the scans (and the manifest) are saved.
+    checksums : Dict[str, str]
+        Expected SHA-256 hex digests, keyed by url, for whichever urls they are known. Scans without one are only
+        checked to be complete TIFFs (by size and magic number).
+    n_workers : int
+        The number of scans downloaded at once.
+    per_host : int
+        The maximum number of concurrent downloads from a single host.
+    manifest : DownloadManifest
+        The manifest of completed downloads. Defaults to the one in `directory`.
+    cache : _cache.ContentCache
+        If supplied, scans already in this on-disk cache are copied (hard-linked) from it instead of downloaded, and
+        downloaded scans are added to it.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per url, with its `path`, `size`, `sha256` and `status` ("downloaded", "cached", "skipped" or
+        "failed").
+
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = DownloadManifest(directory) if manifest is None else manifest
+    checksums = checksums or {}
+    urls = list(dict.fromkeys(url for url in urls if isinstance(url, str) and url))
+    for url in urls:
+        entry = manifest.get(url)
+        if manifest.is_done(url) and entry['path'] != scan_path(url, directory):
+            # Downloaded under an older naming scheme; moved rather than downloaded again
+            os.replace(entry['path'], scan_path(url, directory))
+            manifest.mark_done(url, scan_path(url, directory), entry['size'], entry['sha256'])
+    pending = [url for url in urls if not manifest.is_done(url)]
+    _accessories._print(f'{len(urls) - len(pending)} of {len(urls)} scans already downloaded, '
+                        f'fetching the remaining {len(pending)}...', color='GREEN')
+
+    limiter = _scrape_engine.HostLimiter(per_host)
+    results = {url: dict(manifest.get(url), status='skipped') for url in urls if url not in pending}
+
+    def _worker(session_pool: _scrape_engine.ResourcePool, url: str) -> Dict[str, object]:
+        path = scan_path(url, directory)
+        entry = cache.lookup(url) if cache is not None else None
+        if entry is not None and checksums.get(url, entry['digest']).lower() == entry['digest']:
+            cache.hit(entry)
+            cache.copy_to(entry, path)
+            result, status = {'path': path, 'size': entry['size'], 'sha256': entry['digest']}, 'cached'
+        else:
+            with session_pool.acquire() as session, limiter.limit(url):
+                result = _accessories.retry_call(lambda: download_scan(session, url, path, checksums.get(url)), url,
+                                                 retry_on=_accessories.RETRYABLE_HTTP_ERRORS +
+                                                 (IncompleteDownloadError,))
+            status = 'downloaded'
+            if cache is not None:
+                cache.miss()
+                cache.put_file(url, path, digest=result['sha256'])
+        manifest.mark_done(url, **result)
+        return dict(result, status=status)
+
+    with _scrape_engine.ResourcePool(lambda: _accessories.init_session(pool_size=per_host), size=n_workers,
+                                     closer=lambda session: session.close()) as session_pool, \
+            ThreadPoolExecutor(max_workers=n_workers) as executor:
+        futures = {executor.submit(_worker, session_pool, url): url for url in pending}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                results[url] = future.result()
+            except Exception as e:
+                _accessories._print(f'Could not download "{url}"! {str(e)[:100]}\n Proceeding...', color='LIGHTRED_EX')
+                results[url] = {'path': scan_path(url, directory), 'size': None, 'sha256': None, 'status': 'failed'}
+
+    return pd.DataFrame([dict(results[url], url=url) for url in urls],
+                        columns=['url', 'path', 'size', 'sha256', 'status'])
+
+
+# EOF
+
+# EOF
@@ -0,0 +1,79 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 06:10:27:270  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: _fixture_server.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 06:10:27:270  GMT-0600
+# @License: [Private IP]
+
+import functools
+import os
+import re
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+_ = """
+#######################################################################################################################
+##############################################   LOCAL FIXTURE SERVER   ###############################################
+#######################################################################################################################
+"""
+# Serves saved or rendered pages on localhost, for the tests ("tests/conftest.py") and the benchmarks
+# ("benchmarks/bench_suite.py")
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+
+class RangeHandler(QuietHandler):
+    """Also answers `Range: bytes=<start>-` requests (206 with `Content-Range`, or 416 past the end), like the scan
+    servers. `range_shift` misreports the start of every range by that many bytes (a misbehaving server)."""
+
+    range_shift = 0
+
+    def do_GET(self) -> None:
+        requested = re.fullmatch(r'bytes=(\d+)-', self.headers.get('Range', ''))
+        path = self.translate_path(self.path)
+        if requested is None or not os.path.isfile(path):
+            return super().do_GET()
+        with open(path, 'rb') as file:
+            content = file.read()
+        start = int(requested.group(1))
+        if start >= len(content):
+            self.send_response(416)
+            self.send_header('Content-Range', f'bytes */{len(content)}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = content[start:]
+        self.send_response(206)
+        self.send_header('Content-Range', f'bytes {start + self.range_shift}-{len(content) - 1}/{len(content)}')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FixtureServer:
+    """Serves a directory on localhost (from a background thread) for the duration of a `with`."""
+
+    def __init__(self, directory: str, handler=QuietHandler) -> None:
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(handler, directory=directory))
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_address[1]}/'
+
+    def __enter__(self) -> 'FixtureServer':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# EOF
+
+# EOF
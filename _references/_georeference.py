@@ -0,0 +1,450 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 17:10:05:050  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: _georeference.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 17:10:05:050  GMT-0600
+# @License: [Private IP]
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import _references._accessories as _accessories
+import _references._mosaic as _mosaic
+import _references._spatial as _spatial
+
+_ = """
+#######################################################################################################################
+#########################################   GEOREFERENCE – HYPERPARAMETERS   ##########################################
+#######################################################################################################################
+"""
+KEYPOINT_DIR = 'Data/keypoints/'
+# Keypoints detected per scan, on the scan decimated by `DOWNSAMPLE` (full-resolution scans are far too large)
+N_KEYPOINTS = 2000
+DOWNSAMPLE = 4
+# Processes extracting keypoints at once
+N_PROCESSES = os.cpu_count() or 1
+
+# The resolution the film was scanned at (see `_spatial.FILM_SIZE_M` for the film itself)
+SCAN_DPI = 600
+# Ground resolution of the mosaic, in metres per pixel
+MOSAIC_RESOLUTION = 2.0
+
+# Descriptor matching: maximum Hamming distance, Lowe's ratio test, and rows of descriptors compared at a time
+MAX_HAMMING = 64
+MAX_RATIO = 0.8
+MATCH_BATCH = 4096
+# Affine RANSAC: hypotheses per pair, inlier threshold (full-resolution scan pixels), and inliers to accept a pair
+RANSAC_TRIALS = 1000
+RANSAC_THRESHOLD = 3.0 * DOWNSAMPLE
+MIN_INLIERS = 15
+
+_ = """
+#######################################################################################################################
+########################################   CANDIDATE NEIGHBOURS (CENTROIDS)   #########################################
+#######################################################################################################################
+"""
+
+
+def candidate_pairs(long: np.ndarray, lat: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """Pairs of frames whose footprints may overlap, from their centroids and scales alone.
+
+    Two square footprints (of any rotation) of sides `a` and `b` can only overlap if their centres are closer than
+    `(a + b) / sqrt(2)`, so each frame only needs a radius query on the spatial index.
+
+    Parameters
+    ----------
+    long, lat : np.ndarray
+        The centroids of the frames.
+    scale : np.ndarray
+        The scale denominators of the frames (see `_spatial.scale_denominators`). Frames without one have no candidates.
+
+    Returns
+    -------
+    np.ndarray
+        `(n_pairs, 2)` positional indices `i < j`.
+
+    """
+    long, lat = np.asarray(long, dtype='float64'), np.asarray(lat, dtype='float64')
+    side = _spatial.footprint_km(scale)
+    if not np.isfinite(side).any():
+        return np.empty((0, 2), dtype='int64')
+    index = _spatial.GridIndex(long, lat)
+    largest = np.nanmax(side)
+    pairs = []
+    for i in np.flatnonzero(np.isfinite(side)):
+        hits = index.radius(long[i], lat[i], (side[i] + largest) / np.sqrt(2))
+        hits = hits[hits > i]
+        reach = (side[i] + side[hits]) / np.sqrt(2)
+        hits = hits[_spatial.haversine_km(long[hits], lat[hits], long[i], lat[i]) < reach]
+        pairs.append(np.column_stack([np.full(len(hits), i), hits]))
+    return np.concatenate(pairs).astype('int64') if pairs else np.empty((0, 2), dtype='int64')
+
+
+def centroid_transforms(long: np.ndarray, lat: np.ndarray, scale: np.ndarray, shapes: Sequence[Tuple[int, int]],
+                        resolution_m: float = MOSAIC_RESOLUTION, dpi: float = SCAN_DPI) -> List[np.ndarray]:
+    """Initial (north-up) transforms from scan pixels to mosaic pixels, placing each frame at its centroid.
+
+    The mosaic is a local equirectangular projection around the mean centroid, at `resolution_m` metres per pixel.
+    """
+    long, lat = np.asarray(long, dtype='float64'), np.asarray(lat, dtype='float64')
+    long0, lat0 = np.nanmean(long), np.nanmean(lat)
+    metres_per_degree = _spatial.KM_PER_DEGREE * 1000
+    x = (long - long0) * metres_per_degree * np.cos(np.radians(lat0)) / resolution_m
+    y = -(lat - lat0) * metres_per_degree / resolution_m
+    # Mosaic pixels per scan pixel
+    zoom = np.asarray(scale, dtype='float64') * 0.0254 / dpi / resolution_m
+    return [np.array([[s, 0, cx - s * width / 2], [0, s, cy - s * height / 2], [0, 0, 1]])
+            for s, cx, cy, (height, width) in zip(zoom, x, y, shapes)]
+
+
+_ = """
+#######################################################################################################################
+#################################################   KEYPOINT CACHE   ##################################################
+#######################################################################################################################
+"""
+
+
+def extract_keypoints(scan_path: str, n_keypoints: int = N_KEYPOINTS,
+                      downsample: int = DOWNSAMPLE) -> Tuple[np.ndarray, np.ndarray]:
+    """ORB keypoints of a scan, detected on the scan decimated by `downsample` (read straight from its memory map).
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        The `(x, y)` keypoints in full-resolution scan pixel coordinates (float32), and their bit-packed 256-bit
+        descriptors (uint8, 32 bytes each).
+
+    """
+    # Imported here: only this stage needs scikit-image
+    from skimage.feature import ORB
+
+    image = np.asarray(_mosaic._open_frame(scan_path)[::downsample, ::downsample], dtype='float64')
+    if image.ndim == 3:
+        image = image[..., :3].mean(axis=2)
+    image = (image - image.min()) / max(image.max() - image.min(), 1e-12)
+    orb = ORB(n_keypoints=n_keypoints)
+    try:
+        orb.detect_and_extract(image)
+    except RuntimeError:
+        # Blank (or featureless) scans have no keypoints
+        return np.empty((0, 2), dtype='float32'), np.empty((0, 32), dtype='uint8')
+    keypoints = (orb.keypoints[:, ::-1] * downsample + 0.5).astype('float32')
+    return keypoints, np.packbits(orb.descriptors, axis=1)
+
+
+def _extract(args: tuple) -> Tuple[np.ndarray, np.ndarray]:
+    return extract_keypoints(*args)
+
+
+class KeypointCache:
+    """Persistent cache of the keypoints of each scan, so that they're extracted once no matter how often it's matched.
+
+    Entries are keyed by the scan's path, size and modification time and the extraction parameters, so a re-downloaded
+    scan (or a change of parameters) is re-extracted.
+
+    Parameters
+    ----------
+    directory : str
+        Where the keypoints are saved (one ".npz" per scan).
+    n_keypoints, downsample : int
+        The extraction parameters (see `extract_keypoints`).
+
+    """
+
+    def __init__(self, directory: str = KEYPOINT_DIR, n_keypoints: int = N_KEYPOINTS,
+                 downsample: int = DOWNSAMPLE) -> None:
+        self.directory = directory
+        self.n_keypoints, self.downsample = n_keypoints, downsample
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, scan_path: str) -> str:
+        stat = os.stat(scan_path)
+        key = f'{os.path.abspath(scan_path)}|{stat.st_size}|{stat.st_mtime_ns}|{self.n_keypoints}|{self.downsample}'
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.npz')
+
+    def __contains__(self, scan_path: str) -> bool:
+        return os.path.exists(self._path(scan_path))
+
+    def _save(self, scan_path: str, keypoints: np.ndarray, descriptors: np.ndarray) -> None:
+        with _accessories.atomic_write(self._path(scan_path), mode='wb') as file:
+            np.savez(file, keypoints=keypoints, descriptors=descriptors)
+
+    def get(self, scan_path: str) -> Tuple[np.ndarray, np.ndarray]:
+        """The keypoints and descriptors of a scan, extracted (and saved) if they aren't cached yet."""
+        if scan_path in self:
+            with np.load(self._path(scan_path)) as arrays:
+                return arrays['keypoints'], arrays['descriptors']
+        keypoints, descriptors = extract_keypoints(scan_path, self.n_keypoints, self.downsample)
+        self._save(scan_path, keypoints, descriptors)
+        return keypoints, descriptors
+
+    def get_many(self, scan_paths: Sequence[str],
+                 n_workers: int = N_PROCESSES) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """`get` for many scans, extracting the uncached ones in parallel across `n_workers` processes."""
+        scan_paths = list(dict.fromkeys(scan_paths))
+        missing = [path for path in scan_paths if path not in self]
+        _accessories._print(f'Keypoints of {len(scan_paths) - len(missing)} of {len(scan_paths)} scans cached, '
+                            f'extracting the remaining {len(missing)}...', color='GREEN')
+        if n_workers > 1 and len(missing) > 1:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                extracted = pool.map(_extract, [(path, self.n_keypoints, self.downsample) for path in missing])
+                for path, (keypoints, descriptors) in zip(missing, extracted):
+                    self._save(path, keypoints, descriptors)
+        return {path: self.get(path) for path in scan_paths}
+
+
+_ = """
+#######################################################################################################################
+################################################   BATCHED MATCHING   #################################################
+#######################################################################################################################
+"""
+
+
+def hamming_distances(a: np.ndarray, b: np.ndarray, batch: int = MATCH_BATCH) -> np.ndarray:
+    """All pairwise Hamming distances between two sets of bit-packed descriptors, `batch` rows of `a` at a time.
+
+    With bits mapped to +1/-1, the dot product of two descriptors is `n_bits - 2 * hamming`, so every distance comes
+    out of one (exact, in float32) matrix product per batch.
+    """
+    n_bits = a.shape[1] * 8
+    signs_b = np.unpackbits(b, axis=1).astype('float32') * 2 - 1
+    distances = np.empty((len(a), len(b)), dtype='uint16')
+    for start in range(0, len(a), batch):
+        signs_a = np.unpackbits(a[start:start + batch], axis=1).astype('float32') * 2 - 1
+        distances[start:start + batch] = (n_bits - signs_a @ signs_b.T) / 2
+    return distances
+
+
+def match_descriptors(a: np.ndarray, b: np.ndarray, max_distance: int = MAX_HAMMING, max_ratio: float = MAX_RATIO,
+                      cross_check: bool = True) -> np.ndarray:
+    """Match two sets of bit-packed descriptors.
+
+    Parameters
+    ----------
+    a, b : np.ndarray
+        Bit-packed descriptors (see `extract_keypoints`).
+    max_distance : int
+        Matches further apart than this are rejected.
+    max_ratio : float
+        Lowe's ratio test: the nearest neighbour must be closer than `max_ratio` times the second nearest.
+    cross_check : bool
+        Whether matches must be each other's nearest neighbour in both directions.
+
+    Returns
+    -------
+    np.ndarray
+        `(n_matches, 2)` indices into `a` and `b`.
+
+    """
+    if len(a) == 0 or len(b) == 0:
+        return np.empty((0, 2), dtype='int64')
+    distances = hamming_distances(a, b)
+    rows = np.arange(len(a))
+    nearest = distances.argmin(axis=1)
+    best = distances[rows, nearest]
+    keep = best <= max_distance
+    if max_ratio < 1 and len(b) > 1:
+        second = np.partition(distances, 1, axis=1)[:, 1]
+        keep &= best < max_ratio * second
+    if cross_check:
+        keep &= distances.argmin(axis=0)[nearest] == rows
+    return np.column_stack([rows[keep], nearest[keep]])
+
+
+def ransac_affine(source: np.ndarray, target: np.ndarray, trials: int = RANSAC_TRIALS,
+                  threshold: float = RANSAC_THRESHOLD, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Robustly fit the affine transform mapping `source` points onto `target` points.
+
+    Every hypothesis (from 3 random correspondences) is solved and scored at once, as batched linear algebra, and the
+    best is refined by least squares on its inliers.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        The 3x3 transform (None if there are too few correspondences) and the boolean inlier mask.
+
+    """
+    n = len(source)
+    if n < 3:
+        return None, np.zeros(n, dtype=bool)
+    source_h = np.column_stack([source, np.ones(n)]).astype('float64')
+    target = np.asarray(target, dtype='float64')
+
+    samples = np.random.default_rng(seed).integers(0, n, (trials, 3))
+    samples = samples[(samples[:, 0] != samples[:, 1]) & (samples[:, 0] != samples[:, 2]) &
+                      (samples[:, 1] != samples[:, 2])]
+    systems = source_h[samples]
+    samples = samples[np.abs(np.linalg.det(systems)) > 1e-6]
+    if len(samples) == 0:
+        return None, np.zeros(n, dtype=bool)
+    # `source_h @ params = target` for each hypothesis: (trials, 3, 2)
+    params = np.linalg.solve(source_h[samples], target[samples])
+    errors = np.linalg.norm(np.einsum('nk,tkd->tnd', source_h, params) - target[None], axis=2)
+    inliers = errors < threshold
+    best = inliers[inliers.sum(axis=1).argmax()]
+
+    # Refine on the inliers (twice, as refitting can pick up a few more)
+    for _ in range(2):
+        if best.sum() < 3:
+            break
+        fitted = np.linalg.lstsq(source_h[best], target[best], rcond=None)[0]
+        best = np.linalg.norm(source_h @ fitted - target, axis=1) < threshold
+    if best.sum() < 3:
+        return None, best
+    fitted = np.linalg.lstsq(source_h[best], target[best], rcond=None)[0]
+    return np.vstack([fitted.T, [0, 0, 1]]), best
+
+
+_ = """
+#######################################################################################################################
+##############################################   GEOREFERENCING STAGE   ###############################################
+#######################################################################################################################
+"""
+
+
+def chain_transforms(initial: List[np.ndarray], pairs: pd.DataFrame, shapes: Sequence[Tuple[int, int]],
+                     min_inliers: int = MIN_INLIERS) -> List[np.ndarray]:
+    """Place frames relative to each other along the best-matched pairs, anchored by their centroids.
+
+    The pairs with the most inliers form a maximum spanning forest. Transforms are chained outwards from a root in
+    each tree, and each tree is then translated to best fit its frames' centroid positions. Frames without accepted
+    matches keep their `initial` (centroid) transforms.
+
+    Parameters
+    ----------
+    initial : List[np.ndarray]
+        The centroid transforms of the frames (see `centroid_transforms`).
+    pairs : pd.DataFrame
+        The matched pairs (see `georeference`), with `i`, `j`, `inliers` and `transform` (scan `j` -> scan `i`).
+    shapes : Sequence[Tuple[int, int]]
+        The `(height, width)` of each scan.
+    min_inliers : int
+        Pairs with fewer inliers are ignored.
+
+    Returns
+    -------
+    List[np.ndarray]
+        The transforms of the frames, from scan pixels to mosaic pixels.
+
+    """
+    parent = list(range(len(initial)))
+
+    def _find(node: int) -> int:
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    adjacency = {node: [] for node in range(len(initial))}
+    accepted = pairs[pairs['inliers'] >= min_inliers].sort_values('inliers', ascending=False)
+    for i, j, transform in zip(accepted['i'], accepted['j'], accepted['transform']):
+        root_i, root_j = _find(i), _find(j)
+        if root_i != root_j:
+            parent[root_i] = root_j
+            adjacency[i].append((j, transform))
+            adjacency[j].append((i, np.linalg.inv(transform)))
+
+    transforms, visited = list(initial), set()
+    for root in range(len(initial)):
+        if root in visited:
+            continue
+        tree, stack = [root], [root]
+        visited.add(root)
+        while stack:
+            node = stack.pop()
+            # `step` maps scan `neighbour` onto scan `node`
+            for neighbour, step in adjacency[node]:
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    transforms[neighbour] = transforms[node] @ step
+                    tree.append(neighbour)
+                    stack.append(neighbour)
+        if len(tree) > 1:
+            # Translate the tree so its frame centres best fit their centroid positions
+            centres = [np.array([shapes[node][1] / 2, shapes[node][0] / 2, 1]) for node in tree]
+            offset = np.mean([(initial[node] @ centre - transforms[node] @ centre)[:2]
+                              for node, centre in zip(tree, centres)], axis=0)
+            for node in tree:
+                transforms[node] = np.array([[1, 0, offset[0]], [0, 1, offset[1]], [0, 0, 1]]) @ transforms[node]
+    return transforms
+
+
+def georeference(frames: pd.DataFrame, scan_paths: Sequence[str], cache: KeypointCache = None,
+                 n_workers: int = N_PROCESSES, resolution_m: float = MOSAIC_RESOLUTION,
+                 min_inliers: int = MIN_INLIERS) -> Tuple[List[_mosaic.Frame], pd.DataFrame]:
+    """Georeference scans by matching features between neighbouring frames only.
+
+    1. The centroids and scales select candidate neighbours (see `candidate_pairs`), instead of all pairs.
+    2. Keypoints are extracted once per scan, in parallel, into the persistent `cache`.
+    3. Each candidate pair is matched (batched Hamming distances) and an affine transform is fitted (batched RANSAC).
+    4. The frames are chained along their best matches and anchored by their centroids (see `chain_transforms`).
+
+    Parameters
+    ----------
+    frames : pd.DataFrame
+        The frames (e.g. rows of `raw_df`), with `long`, `lat` and `scale`.
+    scan_paths : Sequence[str]
+        The downloaded scan of each frame (frames without a scan on disk, or without a finite scale and centroid, are
+        skipped).
+    cache : KeypointCache
+        Where keypoints are cached. Defaults to `KEYPOINT_DIR`.
+    n_workers : int
+        Processes extracting keypoints at once.
+    resolution_m : float
+        Ground resolution of the mosaic, in metres per pixel.
+    min_inliers : int
+        The inliers a pair needs to be used for placement.
+
+    Returns
+    -------
+    Tuple[List[_mosaic.Frame], pd.DataFrame]
+        The georeferenced frames (ready for `_mosaic.fit_to_origin` and `_mosaic.stitch`), and one row per candidate
+        pair with its positional indices `i` and `j` (into the frames kept), `matches`, `inliers` and `transform`.
+
+    """
+    cache = cache or KeypointCache()
+    available = np.array([isinstance(path, str) and os.path.exists(path) for path in scan_paths], dtype=bool)
+    # A frame can only be placed with a finite scale and centroid (a NaN would make every transform NaN)
+    scale = _spatial.scale_denominators(frames['scale'])
+    placeable = np.isfinite(scale) & (scale > 0) & np.isfinite(np.asarray(frames['long'], dtype='float64')) & \
+        np.isfinite(np.asarray(frames['lat'], dtype='float64'))
+    unplaceable = np.flatnonzero(available & ~placeable)
+    if len(unplaceable):
+        _accessories._print(f'Skipping {len(unplaceable)} frames without a scale or centroid (rows '
+                            f'{", ".join(map(str, frames.index[unplaceable][:10]))}'
+                            f'{", ..." if len(unplaceable) > 10 else ""}).', color='LIGHTRED_EX')
+    kept = available & placeable
+    frames, scale = frames[kept].reset_index(drop=True), scale[kept]
+    scan_paths = [path for path, keep in zip(scan_paths, kept) if keep]
+    if not scan_paths:
+        raise ValueError('None of the scans are on disk with a scale and centroid to place them by.')
+
+    pairs = candidate_pairs(frames['long'], frames['lat'], scale)
+    n_all = len(scan_paths) * (len(scan_paths) - 1) // 2
+    _accessories._print(f'{len(pairs)} candidate pairs out of {n_all} possible.', color='CYAN')
+
+    features = cache.get_many([scan_paths[k] for k in np.unique(pairs)], n_workers=n_workers)
+    records = []
+    for i, j in pairs:
+        (keypoints_i, descriptors_i), (keypoints_j, descriptors_j) = features[scan_paths[i]], features[scan_paths[j]]
+        matches = match_descriptors(descriptors_j, descriptors_i)
+        transform, inliers = ransac_affine(keypoints_j[matches[:, 0]], keypoints_i[matches[:, 1]])
+        records.append({'i': i, 'j': j, 'matches': len(matches),
+                        'inliers': int(inliers.sum()) if transform is not None else 0, 'transform': transform})
+    pairs = pd.DataFrame(records, columns=['i', 'j', 'matches', 'inliers', 'transform'])
+
+    shapes = [_mosaic.Frame(path, np.eye(3)).shape[:2] for path in scan_paths]
+    initial = centroid_transforms(frames['long'], frames['lat'], scale, shapes, resolution_m=resolution_m)
+    transforms = chain_transforms(initial, pairs, shapes, min_inliers=min_inliers)
+    return [_mosaic.Frame(path, transform) for path, transform in zip(scan_paths, transforms)], pairs
+
+
+# EOF
+
+# EOF
@@ -0,0 +1,171 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 13:10:18:180  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: _ingest.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 13:10:18:180  GMT-0600
+# @License: [Private IP]
+
+from typing import Iterable, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+_ = """
+#######################################################################################################################
+############################################   INGEST – HYPERPARAMETERS   #############################################
+#######################################################################################################################
+"""
+# Positional column names of "All_Flights_Merge.csv" (the file's own header is replaced by these)
+FLIGHT_COLUMNS = ['long', 'lat', 'FID_delete', 'object_id', 'held_delete', 'flight_id', 'date',
+                  'frame', 'scale', 'latlong_delete', 'scan', 'roll_delete', 'nitrate_delete',
+                  'cut_frame_delete', 'print_delete']
+# Only these columns are ever parsed; "_delete" columns are skipped by the CSV reader itself
+KEPT_COLUMNS = [c for c in FLIGHT_COLUMNS if '_delete' not in c]
+# Dates repeat for every frame of a flight, so they're read as categories and only the distinct values are parsed
+FLIGHT_DTYPES = {'long': 'float64', 'lat': 'float64', 'object_id': 'float64', 'flight_id': 'category',
+                 'date': 'category', 'frame': 'object', 'scale': 'object', 'scan': 'object'}
+# The scan column holds free text around the url of the frame's TIFF
+SCAN_PATTERN = r'(http:\S+.tif)'
+# Rows read at a time by `iter_flights`
+CHUNKSIZE = 250_000
+
+_ = """
+#######################################################################################################################
+#################################################   FLIGHTS INGEST   ##################################################
+#######################################################################################################################
+"""
+
+
+def _clean_flights(data: pd.DataFrame, bbox: Tuple[float, float, float, float] = None) -> pd.DataFrame:
+    """Vectorized cleaning of (a chunk of) the raw flights table, optionally restricted to `bbox` first."""
+    if bbox is not None:
+        data = data[within_bbox(data, bbox)]
+    data = data.copy()
+    data['scan'] = data['scan'].str.extract(SCAN_PATTERN, expand=False)
+    data['date'] = parse_categorical_dates(data['date'])
+    return data
+
+
+def parse_categorical_dates(dates: pd.Series) -> pd.Series:
+    """Parse a categorical column of date strings by parsing each distinct value once.
+
+    Parameters
+    ----------
+    dates : pd.Series
+        Categorical date strings (unparseable values and missing values become `NaT`).
+
+    Returns
+    -------
+    pd.Series
+        The parsed dates, with the same index as `dates`.
+
+    """
+    parsed = pd.DatetimeIndex(pd.to_datetime(dates.cat.categories, errors='coerce'))
+    # Missing values have code -1, which picks the trailing NaT
+    parsed = parsed.append(pd.DatetimeIndex([pd.NaT]))
+    return pd.Series(parsed.take(dates.cat.codes.to_numpy()), index=dates.index, name=dates.name)
+
+
+def within_bbox(data: pd.DataFrame, bbox: Tuple[float, float, float, float]) -> pd.Series:
+    """Boolean mask of the frames whose centroid lies in `bbox`.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The flights table (with `long` and `lat`).
+    bbox : Tuple[float, float, float, float]
+        `(min_long, min_lat, max_long, max_lat)`. Lower bounds are inclusive and upper bounds exclusive; use
+        `-np.inf`/`np.inf` to leave a side open.
+
+    Returns
+    -------
+    pd.Series
+        The mask.
+
+    """
+    min_long, min_lat, max_long, max_lat = bbox
+    return (data['long'] >= min_long) & (data['long'] < max_long) & (data['lat'] >= min_lat) & (data['lat'] < max_lat)
+
+
+def read_flights(filepath: str = 'Data/All_Flights_Merge.csv', bbox: Tuple[float, float, float, float] = None,
+                 chunksize: int = None) -> pd.DataFrame:
+    """Read and clean the flights table, reading only the columns that are kept, with explicit dtypes.
+
+    Parameters
+    ----------
+    filepath : str
+        The flights CSV (e.g. "All_Flights_Merge.csv").
+    bbox : Tuple[float, float, float, float]
+        If supplied, only frames within `(min_long, min_lat, max_long, max_lat)` are kept (see `within_bbox`).
+    chunksize : int
+        If supplied, the file is streamed `chunksize` rows at a time (each chunk filtered to `bbox` before the next
+        is read), so only the kept frames are ever held in memory at once.
+
+    Returns
+    -------
+    pd.DataFrame
+        The cleaned flights: `flight_id` is categorical, `date` is datetime and `scan` is the url of the TIFF.
+
+    """
+    if chunksize is not None:
+        return concat_flights(iter_flights(filepath, bbox=bbox, chunksize=chunksize))
+    data = pd.read_csv(filepath, header=0, names=FLIGHT_COLUMNS, usecols=KEPT_COLUMNS, dtype=FLIGHT_DTYPES)
+    return _clean_flights(data[KEPT_COLUMNS], bbox).reset_index(drop=True)
+
+
+def iter_flights(filepath: str = 'Data/All_Flights_Merge.csv', bbox: Tuple[float, float, float, float] = None,
+                 chunksize: int = CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """Stream the cleaned flights table `chunksize` rows at a time (for statewide merges that don't fit in memory).
+
+    Parameters
+    ----------
+    filepath : str
+        The flights CSV.
+    bbox : Tuple[float, float, float, float]
+        If supplied, each chunk is restricted to `(min_long, min_lat, max_long, max_lat)` (see `within_bbox`).
+    chunksize : int
+        The number of rows read at a time.
+
+    Yields
+    ------
+    pd.DataFrame
+        Cleaned chunks. Their `flight_id` categories differ; combine them with `concat_flights`.
+
+    """
+    reader = pd.read_csv(filepath, header=0, names=FLIGHT_COLUMNS, usecols=KEPT_COLUMNS, dtype=FLIGHT_DTYPES,
+                         chunksize=chunksize)
+    for chunk in reader:
+        yield _clean_flights(chunk[KEPT_COLUMNS], bbox)
+
+
+def concat_flights(chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate cleaned chunks, keeping `flight_id` categorical (pandas would otherwise fall back to objects)."""
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame({c: pd.Series(dtype=FLIGHT_DTYPES.get(c)) for c in KEPT_COLUMNS})
+    categories = union_categoricals([chunk['flight_id'] for chunk in chunks]).categories
+    for chunk in chunks:
+        chunk['flight_id'] = chunk['flight_id'].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def year_delta(dates: pd.Series) -> pd.Series:
+    """Whole years between each date and the earliest one (vectorized; no per-row `.date().year`)."""
+    years = dates.dt.year
+    return years - years.min()
+
+
+def scaled_delta(delta: pd.Series, power: float = 40, scale: float = 100000) -> np.ndarray:
+    """Exaggerate `delta` (e.g. for marker sizes): `delta ** power`, normalized to a maximum of `scale`.
+
+    Computed in floating point (integer powers this large overflow int64).
+    """
+    values = delta.to_numpy(dtype='float64') ** power
+    return values / np.nanmax(values) * scale
+
+
+# EOF
+
+# EOF
@@ -0,0 +1,250 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 20:10:14:140  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: _metrics.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 20:10:14:140  GMT-0600
+# @License: [Private IP]
+
+import csv
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator
+
+import psutil
+from colorama import Fore, Style
+
+_ = """
+#######################################################################################################################
+############################################   METRICS – HYPERPARAMETERS   ############################################
+#######################################################################################################################
+"""
+METRICS_DIR = 'Data/metrics/'
+# Seconds between samples of the process' resident memory (for the peak of each stage)
+MEMORY_SAMPLE_INTERVAL = 0.1
+# Log records kept in memory (and in the report); older ones are dropped
+MAX_EVENTS = 10_000
+# Whether log records are also printed to the console
+ECHO = True
+
+# Log level implied by the colour a message is printed in
+_LEVELS = {'RED': 'ERROR', 'LIGHTRED_EX': 'ERROR', 'YELLOW': 'WARNING', 'LIGHTYELLOW_EX': 'WARNING'}
+
+_ = """
+#######################################################################################################################
+####################################################   METRICS   ######################################################
+#######################################################################################################################
+"""
+
+
+class Metrics:
+    """Low-overhead, thread-safe run metrics: structured log records, timers and counters (per stage and per key,
+    e.g. per url), and the peak resident memory of each stage.
+
+    Stages are consecutive sections of a run (e.g. of "scrape_files.py"): `begin` ends the current stage and starts the
+    next one. Every timer and counter is attributed to the stage it was recorded in.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.stages = []
+        self.timers = {}
+        self.counters = {}
+        self.events = deque(maxlen=MAX_EVENTS)
+        self._stage = None
+        self._process = psutil.Process()
+        self._sampler = None
+
+    @property
+    def current_stage(self) -> str:
+        return self._stage['stage'] if self._stage is not None else None
+
+    def _rss(self) -> int:
+        try:
+            return self._process.memory_info().rss
+        except psutil.Error:
+            return 0
+
+    def _sample(self) -> None:
+        while True:
+            rss = self._rss()
+            with self._lock:
+                if self._stage is not None:
+                    self._stage['peak_rss'] = max(self._stage['peak_rss'], rss)
+            time.sleep(MEMORY_SAMPLE_INTERVAL)
+
+    def begin(self, stage: str) -> None:
+        """End the current stage (if any) and start `stage`."""
+        self.end()
+        if self._sampler is None:
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+        rss = self._rss()
+        with self._lock:
+            self._stage = {'stage': stage, 'started': time.time(), 'start_rss': rss, 'peak_rss': rss,
+                           '_start': time.perf_counter()}
+
+    def end(self) -> None:
+        """End the current stage, recording its wall time and peak memory."""
+        rss = self._rss()
+        with self._lock:
+            if self._stage is None:
+                return
+            stage, self._stage = self._stage, None
+            stage['seconds'] = time.perf_counter() - stage.pop('_start')
+            stage['end_rss'], stage['peak_rss'] = rss, max(stage['peak_rss'], rss)
+            self.stages.append(stage)
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """`begin` the stage for the duration of a `with` block."""
+        self.begin(stage)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def record(self, name: str, seconds: float, key: str = None, error: bool = False) -> None:
+        """Record one timing of `name` (optionally for `key`, e.g. the url)."""
+        with self._lock:
+            stats = self.timers.setdefault((self.current_stage, name, key), [0, 0.0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] += error
+
+    @contextmanager
+    def timer(self, name: str, key: str = None) -> Iterator[None]:
+        """Time a `with` block as `name` (for `key`); exceptions are counted as errors and re-raised."""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.record(name, time.perf_counter() - start, key, error=True)
+            raise
+        self.record(name, time.perf_counter() - start, key)
+
+    def timed(self, name: str = None, key: str = None) -> Callable:
+        """Decorator timing every call of a function, per value of its argument `key` (e.g. "url") if supplied."""
+        def decorator(fn: Callable) -> Callable:
+            signature = inspect.signature(fn)
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                value = signature.bind_partial(*args, **kwargs).arguments.get(key) if key else None
+                with self.timer(name or fn.__qualname__, value if value is None else str(value)):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name: str, n: int = 1, key: str = None) -> None:
+        """Add `n` to the counter `name` (for `key`)."""
+        with self._lock:
+            counter = (self.current_stage, name, key)
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def drain(self) -> Dict[str, dict]:
+        """The timers and counters recorded so far, which are then reset (e.g. in a worker process, for `merge`)."""
+        with self._lock:
+            drained = {'timers': self.timers, 'counters': self.counters}
+            self.timers, self.counters = {}, {}
+        return drained
+
+    def merge(self, drained: Dict[str, dict]) -> None:
+        """Add timers and counters drained from another process' metrics, attributed to the current stage."""
+        with self._lock:
+            for (_, name, key), (count, total, longest, errors) in drained['timers'].items():
+                stats = self.timers.setdefault((self.current_stage, name, key), [0, 0.0, 0.0, 0])
+                stats[0] += count
+                stats[1] += total
+                stats[2] = max(stats[2], longest)
+                stats[3] += errors
+            for (_, name, key), value in drained['counters'].items():
+                counter = (self.current_stage, name, key)
+                self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def log(self, message, color: str = 'LIGHTGREEN_EX', **fields) -> None:
+        """Record a structured log message (with the current stage and any extra `fields`) and print it."""
+        color = color.upper()
+        self.events.append(dict(fields, time=time.time(), stage=self.current_stage,
+                                level=_LEVELS.get(color, 'INFO'), message=str(message)))
+        if ECHO:
+            if isinstance(message, str):
+                print(getattr(Fore, color, '') + message + Style.RESET_ALL)
+            else:
+                print(getattr(Fore, color, ''), message, Style.RESET_ALL)
+
+    def report(self) -> Dict[str, object]:
+        """Everything recorded so far (the current stage is included as if it ended now)."""
+        with self._lock:
+            stages = [dict(stage) for stage in self.stages]
+            if self._stage is not None:
+                current = dict(self._stage)
+                current['seconds'] = time.perf_counter() - current.pop('_start')
+                stages.append(current)
+            timers = [{'stage': stage, 'name': name, 'key': key, 'count': count, 'total_s': total, 'max_s': longest,
+                       'mean_s': total / count, 'errors': errors}
+                      for (stage, name, key), (count, total, longest, errors) in self.timers.items()]
+            counters = [{'stage': stage, 'name': name, 'key': key, 'value': value}
+                        for (stage, name, key), value in self.counters.items()]
+            events = list(self.events)
+        return {'started': self.started, 'seconds': time.time() - self.started, 'peak_rss': max(
+            [stage['peak_rss'] for stage in stages] + [self._rss()]), 'stages': stages, 'timers': timers,
+            'counters': counters, 'events': events}
+
+    def save(self, directory: str = METRICS_DIR, name: str = None) -> str:
+        """Write the report as JSON (everything) plus CSVs of the stages, timers and counters.
+
+        Returns
+        -------
+        str
+            The path of the JSON report (the CSVs share its name, with "_stages", "_timers" and "_counters").
+
+        """
+        report = self.report()
+        name = name or time.strftime('run_%Y%m%d_%H%M%S', time.localtime(self.started))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name + '.json')
+        with open(path, 'w') as file:
+            json.dump(report, file, indent=1, default=str)
+        for table in ('stages', 'timers', 'counters'):
+            rows = report[table]
+            with open(os.path.join(directory, f'{name}_{table}.csv'), 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=list(rows[0]) if rows else ['stage'])
+                writer.writeheader()
+                writer.writerows(rows)
+        return path
+
+    def summary(self, top: int = 10) -> str:
+        """A short text summary: time and peak memory per stage, and the slowest timers overall."""
+        report = self.report()
+        lines = [f'{"stage":<32} {"seconds":>9} {"peak MB":>9}']
+        lines += [f'{str(stage["stage"]):<32} {stage["seconds"]:>9.2f} {stage["peak_rss"] / 1024 ** 2:>9.0f}'
+                  for stage in report['stages']]
+        totals = {}
+        for timer in report['timers']:
+            total = totals.setdefault((timer['stage'], timer['name']), [0, 0.0])
+            total[0] += timer['count']
+            total[1] += timer['total_s']
+        lines += ['', f'{"stage / timer":<48} {"calls":>7} {"seconds":>9}']
+        lines += [f'{f"{stage} / {name}":<48} {count:>7} {seconds:>9.2f}'
+                  for (stage, name), (count, seconds) in sorted(totals.items(), key=lambda t: -t[1][1])[:top]]
+        return '\n'.join(lines)
+
+
+# Shared by every module (so one report covers the whole run)
+METRICS = Metrics()
+begin, end, stage, record, timer, timed, count, log = (METRICS.begin, METRICS.end, METRICS.stage, METRICS.record,
+                                                       METRICS.timer, METRICS.timed, METRICS.count, METRICS.log)
+
+
+# EOF
+
+# EOF
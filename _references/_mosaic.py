@@ -0,0 +1,341 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 16:10:12:120  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: _mosaic.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 16:10:12:120  GMT-0600
+# @License: [Private IP]
+
+import functools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+import tifffile
+
+import _references._accessories as _accessories
+
+_ = """
+#######################################################################################################################
+############################################   MOSAIC – HYPERPARAMETERS   #############################################
+#######################################################################################################################
+"""
+MOSAIC_DIR = 'Data/mosaics/'
+# Side (in mosaic pixels) of the tiles the mosaic is blended in; peak memory per process is a few tiles' worth
+TILE_SIZE = 512
+# Processes blending tiles at once
+N_PROCESSES = os.cpu_count() or 1
+
+_ = """
+#######################################################################################################################
+##############################################   GEOREFERENCED FRAMES   ###############################################
+#######################################################################################################################
+"""
+
+
+class Frame:
+    """A georeferenced scan: its TIFF and the affine transform from its pixel coordinates to mosaic pixel coordinates.
+
+    Coordinates are `(x, y) = (column, row)` of pixel corners, so pixel `(r, c)` covers `[c, c + 1) x [r, r + 1)`.
+
+    Parameters
+    ----------
+    path : str
+        The scan (a TIFF; only its header is read here).
+    transform : np.ndarray
+        The 2x3 (or 3x3) affine matrix mapping `(x, y, 1)` in the frame to `(x, y)` in the mosaic.
+
+    """
+
+    def __init__(self, path: str, transform: np.ndarray) -> None:
+        self.path = path
+        transform = np.asarray(transform, dtype='float64')
+        self.transform = np.vstack([transform[:2], [0, 0, 1]])
+        with tifffile.TiffFile(path) as tif:
+            self.shape, self.dtype = tuple(tif.series[0].shape), tif.series[0].dtype
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """`(min_x, min_y, max_x, max_y)` of the frame in mosaic pixel coordinates."""
+        height, width = self.shape[:2]
+        corners = self.transform @ np.array([[0, width, width, 0], [0, 0, height, height], [1, 1, 1, 1]])
+        return corners[0].min(), corners[1].min(), corners[0].max(), corners[1].max()
+
+    def translated(self, dx: float, dy: float) -> 'Frame':
+        """The same frame, shifted by `(dx, dy)` mosaic pixels."""
+        frame = Frame.__new__(Frame)
+        frame.path, frame.shape, frame.dtype = self.path, self.shape, self.dtype
+        frame.transform = np.array([[1, 0, dx], [0, 1, dy], [0, 0, 1]]) @ self.transform
+        return frame
+
+
+def fit_to_origin(frames: Sequence[Frame]) -> Tuple[List[Frame], Tuple[int, int]]:
+    """Shift the frames so that the mosaic starts at pixel (0, 0), and compute the `(height, width)` of the mosaic."""
+    if not frames:
+        raise ValueError('No frames to fit: none of them could be georeferenced.')
+    bounds = np.array([frame.bounds for frame in frames])
+    min_x, min_y = np.floor(bounds[:, 0].min()), np.floor(bounds[:, 1].min())
+    shape = (int(np.ceil(bounds[:, 3].max() - min_y)), int(np.ceil(bounds[:, 2].max() - min_x)))
+    return [frame.translated(-min_x, -min_y) for frame in frames], shape
+
+
+@functools.lru_cache(maxsize=None)
+def _layout(path: str) -> Tuple[int, tuple, str]:
+    """`(offset, shape, dtype)` of the scan's pixels if they're stored uncompressed and contiguously, else None."""
+    # NOTE: Only page attributes that every tifffile since the pinned version has (the series' data offset is newer)
+    with tifffile.TiffFile(path) as tif:
+        page = tif.pages[0]
+        shape, dtype = tuple(page.shape), np.dtype(tif.byteorder + page.dtype.char)
+        offsets, counts = page.dataoffsets, page.databytecounts
+        contiguous = page.compression == 1 and page.predictor == 1 and not page.is_tiled and len(offsets) > 0 and \
+            all(offset + count == following for offset, count, following in zip(offsets, counts, offsets[1:])) and \
+            sum(counts) == int(np.prod(shape)) * dtype.itemsize
+        return (offsets[0], shape, dtype.str) if contiguous else None
+
+
+class SegmentedScan:
+    """A compressed or tiled scan, sliced like an array: only the strips or tiles under a slice are ever decoded.
+
+    Slices are read one row of segments at a time, so a strided slice of the whole scan (e.g. `scan[::8, ::8]`) holds
+    at most one band of decoded segments besides its result. Nothing is cached, and the file is only open during a
+    read.
+
+    Parameters
+    ----------
+    path : str
+        The scan (a TIFF with its samples interleaved, as the scans and `to_tiled_tiff` mosaics are).
+
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with tifffile.TiffFile(path) as tif:
+            page = tif.pages[0]
+            if page.shaped[0] > 1 or page.shaped[1] > 1:
+                raise ValueError(f'"{path}" stores its samples (or depths) in separate planes, which is not supported.')
+            self.shape, self.dtype = tuple(tif.series[0].shape), tif.series[0].dtype
+            self._segment = (page.tilelength, page.tilewidth) if page.is_tiled else \
+                (min(page.rowsperstrip or page.imagelength, page.imagelength), page.imagewidth)
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    def _window(self, tif: tifffile.TiffFile, y0: int, y1: int, x0: int, x1: int) -> np.ndarray:
+        """Rows `y0:y1` and columns `x0:x1`, decoding only the segments overlapping them."""
+        page, handle = tif.pages[0], tif.filehandle
+        length, width = self._segment
+        across = -(-self.shape[1] // width)
+        window = np.zeros((y1 - y0, x1 - x0, page.shaped[4]), dtype=self.dtype)
+        for row in range(y0 // length, (y1 - 1) // length + 1):
+            for column in range(x0 // width, (x1 - 1) // width + 1):
+                index = row * across + column
+                data = None
+                if page.databytecounts[index]:
+                    handle.seek(page.dataoffsets[index])
+                    data = handle.read(page.databytecounts[index])
+                # Edge tiles may come back padded (or not): only their part within the scan is copied below
+                segment, (_, _, top, left, _), _ = page.decode(data, index, jpegtables=page.jpegtables)
+                if segment is None:
+                    continue
+                segment = segment[0]
+                r0, r1 = max(top, y0), min(top + segment.shape[0], y1)
+                c0, c1 = max(left, x0), min(left + segment.shape[1], x1)
+                window[r0 - y0:r1 - y0, c0 - x0:c1 - x0] = segment[r0 - top:r1 - top, c0 - left:c1 - left]
+        return window if self.ndim == 3 else window[..., 0]
+
+    def __getitem__(self, key) -> np.ndarray:
+        key = key if isinstance(key, tuple) else (key,)
+        rows, columns = (tuple(key) + (slice(None), slice(None)))[:2]
+        if not all(isinstance(k, slice) for k in (rows, columns)):
+            raise TypeError('Scans can only be sliced along their rows and columns.')
+        (r0, r1, r_step), (c0, c1, c_step) = rows.indices(self.shape[0]), columns.indices(self.shape[1])
+        if r_step < 1 or c_step < 1:
+            raise ValueError('Scans can only be sliced forwards.')
+        n_rows, n_columns = len(range(r0, r1, r_step)), len(range(c0, c1, c_step))
+        result = np.zeros((n_rows, n_columns) + self.shape[2:], dtype=self.dtype)
+        if not n_rows or not n_columns:
+            return result[(slice(None), slice(None)) + tuple(key[2:])]
+
+        length = self._segment[0]
+        with tifffile.TiffFile(self.path) as tif:
+            for top in range(r0 - r0 % length, r1, length):
+                # The first selected row in this band of segments
+                first = r0 + -(-max(top - r0, 0) // r_step) * r_step
+                bottom = min(top + length, r1)
+                if first >= bottom:
+                    continue
+                band = self._window(tif, first, bottom, c0, c1)[::r_step, ::c_step]
+                result[(first - r0) // r_step:(first - r0) // r_step + len(band)] = band
+        return result[(slice(None), slice(None)) + tuple(key[2:])]
+
+
+def _open_frame(path: str):
+    """The scan's pixels: memory-mapped if possible, read segment by segment otherwise (nothing is read until sliced).
+
+    A new mapping is returned every time, so that the pages read through it are released once it's dropped.
+    """
+    layout = _layout(path)
+    if layout is None:
+        return SegmentedScan(path)
+    offset, shape, dtype = layout
+    return np.memmap(path, mode='r', dtype=np.dtype(dtype), offset=offset, shape=shape)
+
+
+_ = """
+#######################################################################################################################
+#################################################   TILED BLENDING   ##################################################
+#######################################################################################################################
+"""
+
+
+def _blend_tile(task: tuple) -> int:
+    """Blend every frame overlapping one tile and write the tile to the (memory-mapped) mosaic.
+
+    Each frame is sampled at the tile's pixel centres (nearest neighbour, through the inverse transform), and only the
+    window of the scan under the tile is ever read. Overlaps are feathered: each frame is weighted by the distance
+    (in its own pixels) to its nearest edge, so seams fade instead of cutting.
+
+    Returns
+    -------
+    int
+        The number of mosaic pixels written.
+
+    """
+    out_path, (r0, c0, r1, c1), frames, feather = task
+    cy = np.arange(r0, r1, dtype='float64')[:, None] + 0.5
+    cx = np.arange(c0, c1, dtype='float64')[None, :] + 0.5
+    total, weights = None, np.zeros((r1 - r0, c1 - c0), dtype='float64')
+
+    for path, inverse, (height, width) in frames:
+        fx = inverse[0, 0] * cx + inverse[0, 1] * cy + inverse[0, 2]
+        fy = inverse[1, 0] * cx + inverse[1, 1] * cy + inverse[1, 2]
+        ix, iy = np.floor(fx).astype('int64'), np.floor(fy).astype('int64')
+        inside = (ix >= 0) & (ix < width) & (iy >= 0) & (iy < height)
+        if not inside.any():
+            continue
+        ix, iy = ix[inside], iy[inside]
+        x0, x1, y0, y1 = ix.min(), ix.max() + 1, iy.min(), iy.max() + 1
+        window = np.asarray(_open_frame(path)[y0:y1, x0:x1])
+        values = window[iy - y0, ix - x0].astype('float64')
+        if feather:
+            weight = np.minimum(np.minimum(fx, width - fx), np.minimum(fy, height - fy))[inside]
+        else:
+            weight = np.ones(len(ix))
+        if total is None:
+            total = np.zeros(weights.shape + values.shape[1:], dtype='float64')
+        total[inside] += values * weight.reshape((-1,) + (1,) * (values.ndim - 1))
+        weights[inside] += weight
+
+    mosaic = np.lib.format.open_memmap(out_path, mode='r+')
+    if total is not None:
+        covered = weights > 0
+        tile = np.zeros(total.shape, dtype=mosaic.dtype)
+        blended = total[covered] / weights[covered].reshape((-1,) + (1,) * (total.ndim - 2))
+        if np.issubdtype(mosaic.dtype, np.integer):
+            info = np.iinfo(mosaic.dtype)
+            blended = np.clip(np.rint(blended), info.min, info.max)
+        tile[covered] = blended
+        mosaic[r0:r1, c0:c1] = tile
+        mosaic.flush()
+    del mosaic
+    return (r1 - r0) * (c1 - c0)
+
+
+def _tiles(shape: Tuple[int, int], tile_size: int) -> Iterator[Tuple[int, int, int, int]]:
+    for r0 in range(0, shape[0], tile_size):
+        for c0 in range(0, shape[1], tile_size):
+            yield r0, c0, min(r0 + tile_size, shape[0]), min(c0 + tile_size, shape[1])
+
+
+def stitch(frames: Sequence[Frame], out_path: str, shape: Tuple[int, int] = None, tile_size: int = TILE_SIZE,
+           n_workers: int = N_PROCESSES, feather: bool = True) -> dict:
+    """Stitch georeferenced frames into a mosaic written tile by tile to a memory-mapped ".npy" array.
+
+    Neither the frames nor the mosaic are ever held in memory: each tile reads only the windows of the frames under
+    it, and tiles are blended in parallel across `n_workers` processes (each writing its own, disjoint, region).
+
+    Parameters
+    ----------
+    frames : Sequence[Frame]
+        The frames, with transforms into mosaic pixel coordinates (see `fit_to_origin`). All must share a dtype and
+        number of channels.
+    out_path : str
+        The mosaic (".npy"). It's written next to its final path and only moved there once complete.
+    shape : Tuple[int, int]
+        The `(height, width)` of the mosaic. Defaults to the extent of the frames.
+    tile_size : int
+        The side of each tile, in mosaic pixels.
+    n_workers : int
+        The number of processes (1 blends in this process).
+    feather : bool
+        Whether to feather overlaps (weight by the distance to each frame's edge) instead of averaging them.
+
+    Returns
+    -------
+    dict
+        The mosaic's `path` and `shape`, and the `tiles`, `pixels`, `seconds` and `mpix_per_s` of the run.
+
+    """
+    if not frames:
+        raise ValueError('No frames to stitch.')
+    if shape is None:
+        shape = (int(np.ceil(max(frame.bounds[3] for frame in frames))),
+                 int(np.ceil(max(frame.bounds[2] for frame in frames))))
+    full_shape = tuple(shape) + tuple(frames[0].shape[2:])
+    start = time.perf_counter()
+
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    part_path = out_path + '.part.npy'
+    # Created sparse: pixels outside every frame stay 0 and untouched tiles cost no disk
+    mosaic = np.lib.format.open_memmap(part_path, mode='w+', dtype=frames[0].dtype, shape=full_shape)
+    del mosaic
+
+    bounds = np.array([frame.bounds for frame in frames])
+    specs = [(frame.path, np.linalg.inv(frame.transform), frame.shape[:2]) for frame in frames]
+    tasks = []
+    for r0, c0, r1, c1 in _tiles(shape, tile_size):
+        overlapping = np.flatnonzero((bounds[:, 0] < c1) & (bounds[:, 2] > c0) &
+                                     (bounds[:, 1] < r1) & (bounds[:, 3] > r0))
+        if len(overlapping):
+            tasks.append((part_path, (r0, c0, r1, c1), [specs[i] for i in overlapping], feather))
+
+    if n_workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            pixels = sum(pool.map(_blend_tile, tasks, chunksize=max(1, len(tasks) // (n_workers * 8))))
+    else:
+        pixels = sum(map(_blend_tile, tasks))
+    os.replace(part_path, out_path)
+
+    seconds = time.perf_counter() - start
+    _accessories._print(f'Stitched {len(frames)} frames into a {shape[0]}x{shape[1]} mosaic ({len(tasks)} tiles) '
+                        f'in {seconds:.1f} s.', color='GREEN')
+    return {'path': out_path, 'shape': full_shape, 'tiles': len(tasks), 'pixels': pixels, 'seconds': seconds,
+            'mpix_per_s': pixels / seconds / 1e6 if seconds else float('nan')}
+
+
+def to_tiled_tiff(npy_path: str, tiff_path: str, tile_size: int = TILE_SIZE) -> str:
+    """Convert a stitched mosaic to a tiled TIFF, streaming one tile at a time from the memory-mapped array."""
+    mosaic = np.load(npy_path, mmap_mode='r')
+    height, width = mosaic.shape[:2]
+
+    def _tile_data() -> Iterator[np.ndarray]:
+        for r0 in range(0, height, tile_size):
+            for c0 in range(0, width, tile_size):
+                tile = np.zeros((tile_size, tile_size) + mosaic.shape[2:], dtype=mosaic.dtype)
+                block = mosaic[r0:r0 + tile_size, c0:c0 + tile_size]
+                tile[:block.shape[0], :block.shape[1]] = block
+                yield tile
+
+    part_path = tiff_path + '.part'
+    tifffile.imwrite(part_path, _tile_data(), shape=mosaic.shape, dtype=mosaic.dtype, tile=(tile_size, tile_size),
+                     bigtiff=mosaic.nbytes > 2 ** 31, photometric='rgb' if mosaic.ndim == 3 else 'minisblack')
+    os.replace(part_path, tiff_path)
+    return tiff_path
+
+
+# EOF
+
+# EOF
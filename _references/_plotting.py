@@ -0,0 +1,329 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 19:10:02:020  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: _plotting.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 19:10:02:020  GMT-0600
+# @License: [Private IP]
+
+import os
+from typing import Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+import _references._accessories as _accessories
+import _references._spatial as _spatial
+
+_ = """
+#######################################################################################################################
+###########################################   PLOTTING – HYPERPARAMETERS   ############################################
+#######################################################################################################################
+"""
+# Longest side of a rendered figure, in pixels (the other side follows the aspect ratio of the bbox)
+CANVAS_SIZE = 4096
+# Side of each slippy-map tile, and the zoom levels rendered by default
+TILE_SIZE = 256
+TILE_ZOOMS = range(5, 11)
+# Consecutive frames of a flight further apart than this aren't joined (e.g. the jump between two flight lines)
+MAX_SEGMENT_KM = 15
+# Colormaps: categorical for flights, sequential for dates and densities
+FLIGHT_CMAP = 'tab20'
+DATE_CMAP = 'viridis'
+DENSITY_CMAP = 'magma_r'
+# Frames weighted by a column (e.g. the year delta) are drawn at between this and full opacity, so none is ever hidden
+WEIGHT_FLOOR = 0.4
+
+_ = """
+#######################################################################################################################
+###############################################   VECTORIZED RASTERS   ################################################
+#######################################################################################################################
+"""
+
+
+def _lut(name: str) -> np.ndarray:
+    """The colours of a matplotlib colormap as a `(n, 3)` uint8 lookup table."""
+    # Imported here: only the colours are needed, never a figure
+    import matplotlib
+    cmap = matplotlib.colormaps[name] if hasattr(matplotlib, 'colormaps') else matplotlib.cm.get_cmap(name)
+    return (cmap(np.arange(cmap.N))[:, :3] * 255).astype('uint8')
+
+
+def frame_order(data: pd.DataFrame) -> np.ndarray:
+    """Positional order of the frames: by flight, then frame number (then object id), i.e. along each flight path."""
+    frames = pd.to_numeric(data['frame'], errors='coerce').to_numpy(dtype='float64')
+    object_ids = data['object_id'].to_numpy(dtype='float64') if 'object_id' in data else np.zeros(len(data))
+    flights = data['flight_id'].astype('category').cat.codes.to_numpy()
+    return np.lexsort((object_ids, frames, flights))
+
+
+def segment_samples(x: np.ndarray, y: np.ndarray, groups: np.ndarray, max_length: float = np.inf,
+                    spacing: float = 0.5) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Points along the segments joining consecutive points of each group (so lines can be rasterized as points).
+
+    Parameters
+    ----------
+    x, y : np.ndarray
+        The points, in pixel coordinates, already sorted along each path (see `frame_order`).
+    groups : np.ndarray
+        The path (e.g. flight code) of each point; only consecutive points of the same group are joined.
+    max_length : float
+        Longer segments (in pixels) are skipped.
+    spacing : float
+        Distance (in pixels) between consecutive samples.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        The `x` and `y` of the samples, and the position (in the inputs) of the segment start each belongs to.
+
+    """
+    dx, dy = np.diff(x), np.diff(y)
+    length = np.hypot(dx, dy)
+    segments = np.flatnonzero((groups[1:] == groups[:-1]) & np.isfinite(length) & (length <= max_length))
+    counts = np.ceil(length[segments] / spacing).astype('int64') + 1
+    owner = np.repeat(segments, counts)
+    # Fraction along its segment of each sample, from 0 to 1 inclusive
+    step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    t = step / np.repeat(np.maximum(counts - 1, 1), counts)
+    return x[owner] + t * dx[owner], y[owner] + t * dy[owner], owner
+
+
+def rasterize(x: np.ndarray, y: np.ndarray, shape: Tuple[int, int], colors: np.ndarray = None,
+              weights: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Count the points (and sum their colours) falling in each pixel of a `(height, width)` canvas.
+
+    With `weights`, each point counts its weight instead of 1 (e.g. to sum the `intensities` of the points per pixel).
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        The (weighted) counts per pixel, and the summed `(height, width, 3)` colours (None if `colors` isn't supplied).
+
+    """
+    height, width = shape
+    ix, iy = np.floor(x).astype('int64', copy=False), np.floor(y).astype('int64', copy=False)
+    inside = (ix >= 0) & (ix < width) & (iy >= 0) & (iy < height) & np.isfinite(x) & np.isfinite(y)
+    flat = iy[inside] * width + ix[inside]
+    counts = np.bincount(flat, weights=None if weights is None else weights[inside],
+                         minlength=height * width).reshape(shape)
+    if colors is None:
+        return counts, None
+    colors = colors[inside]
+    sums = np.stack([np.bincount(flat, weights=colors[:, channel], minlength=height * width)
+                     for channel in range(3)], axis=-1).reshape(shape + (3,))
+    return counts, sums
+
+
+def intensities(weights: np.ndarray, floor: float = WEIGHT_FLOOR) -> np.ndarray:
+    """Map weights onto `[floor, 1]`, in proportion to the largest weight (a missing weight gets the `floor`)."""
+    weights = np.asarray(weights, dtype='float64')
+    largest = np.nanmax(weights) if np.isfinite(weights).any() else 0
+    scaled = np.nan_to_num(weights / largest if largest > 0 else np.zeros_like(weights), nan=0)
+    return floor + (1 - floor) * np.clip(scaled, 0, 1)
+
+
+def shade(counts: np.ndarray, sums: np.ndarray = None, cmap: str = DENSITY_CMAP, vmax: float = None,
+          intensity: np.ndarray = None) -> np.ndarray:
+    """An RGBA image from rasterized counts: log-scaled density, or the mean colour per pixel with log-scaled opacity.
+
+    Parameters
+    ----------
+    counts : np.ndarray
+        Points per pixel (see `rasterize`).
+    sums : np.ndarray
+        Summed colours per pixel. If None, the density itself is coloured with `cmap`.
+    cmap : str
+        The colormap of the density.
+    vmax : float
+        The count mapped to full intensity (default: the maximum), e.g. shared across tiles.
+    intensity : np.ndarray
+        The mean intensity of the points in each pixel (see `intensities`), which scales its opacity.
+
+    Returns
+    -------
+    np.ndarray
+        `(height, width, 4)` uint8.
+
+    """
+    level = (np.log1p(counts, dtype='float32') / np.float32(np.log1p(max(vmax or counts.max(), 1))))
+    alpha = np.where(counts > 0, 0.35 + 0.65 * np.clip(level, 0, 1), 0)
+    if intensity is not None:
+        alpha = alpha * intensity
+    if sums is None:
+        lut = _lut(cmap)
+        rgb = lut[np.clip((level * (len(lut) - 1)).astype('int64'), 0, len(lut) - 1)]
+    else:
+        rgb = (sums / np.where(counts > 0, counts, 1)[..., None]).astype('uint8')
+    return np.dstack([rgb, (alpha * 255).astype('uint8')])
+
+
+def _colors(data: pd.DataFrame, color_by: str) -> np.ndarray:
+    """The `(n, 3)` colour of each frame: by flight (categorical) or by date (sequential)."""
+    if color_by == 'flight_id':
+        lut = _lut(FLIGHT_CMAP)
+        return lut[data['flight_id'].astype('category').cat.codes.to_numpy() % len(lut)].astype('float64')
+    if color_by == 'date':
+        years = data['date'].dt.year.to_numpy(dtype='float64')
+        span = np.nanmax(years) - np.nanmin(years)
+        level = np.nan_to_num((years - np.nanmin(years)) / (span or 1))
+        lut = _lut(DATE_CMAP)
+        return lut[(level * (len(lut) - 1)).astype('int64')].astype('float64')
+    raise ValueError(f'Cannot colour by "{color_by}"; use "flight_id" or "date".')
+
+
+def _points(data: pd.DataFrame, x: np.ndarray, y: np.ndarray, mode: str, color_by: str, max_length: float,
+            weight_by: str = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """The points to rasterize (and their colours and `intensities`, if any) for `mode` "density", "points" or
+    "segments"."""
+    weights = None if weight_by is None else intensities(data[weight_by].to_numpy(dtype='float64'))
+    if mode == 'density':
+        return x, y, None, weights
+    colors = _colors(data, color_by)
+    if mode == 'points':
+        return x, y, colors, weights
+    if mode == 'segments':
+        order = frame_order(data)
+        groups = data['flight_id'].astype('category').cat.codes.to_numpy()[order]
+        sx, sy, owner = segment_samples(x[order], y[order], groups, max_length=max_length)
+        return sx, sy, colors[order][owner], None if weights is None else weights[order][owner]
+    raise ValueError(f'Unknown mode "{mode}"; use "density", "points" or "segments".')
+
+
+_ = """
+#######################################################################################################################
+#####################################################   FIGURES   #####################################################
+#######################################################################################################################
+"""
+
+
+def _save_png(image: np.ndarray, out_path: str, background: Tuple[int, int, int] = None) -> None:
+    # Imported here: only saving needs Pillow
+    from PIL import Image
+    if background is not None:
+        alpha, background = image[..., 3:].astype('uint16'), np.asarray(background, dtype='uint16')
+        image = ((image[..., :3] * alpha + background * (255 - alpha)) // 255).astype('uint8')
+    with _accessories.atomic_write(out_path, mode='wb') as file:
+        # Fast compression: mostly-empty canvases compress well anyway, and encoding dominates otherwise
+        Image.fromarray(image).save(file, format='PNG', compress_level=1)
+
+
+def render(data: pd.DataFrame, out_path: str = None, bbox: Tuple[float, float, float, float] = None,
+           size: int = CANVAS_SIZE, mode: str = 'segments', color_by: str = 'flight_id', weight_by: str = None,
+           background: Tuple[int, int, int] = (255, 255, 255)) -> np.ndarray:
+    """Render frame centroids (or flight paths) into a fixed-size image, by aggregation rather than one marker each.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The frames (e.g. `raw_df`), with `long` and `lat` (and `flight_id`, `frame` and `date` depending on the mode).
+    out_path : str
+        If supplied, the image is saved here (PNG).
+    bbox : Tuple[float, float, float, float]
+        `(min_long, min_lat, max_long, max_lat)` to render. Defaults to the extent of the frames.
+    size : int
+        Longest side of the image, in pixels. Longitude is scaled by the cosine of the central latitude.
+    mode : str
+        "density" (log-scaled frames per pixel), "points" (frames coloured by `color_by`) or "segments" (each
+        flight's path, joining consecutive frames, coloured by `color_by`).
+    color_by : str
+        "flight_id" or "date".
+    weight_by : str
+        A column weighting each frame (e.g. "date_delta", so recent flights stand out, as marker sizes did). Every
+        frame is still drawn; its weight only sets its opacity, from `WEIGHT_FLOOR` (a weight of 0, or none) to full.
+    background : Tuple[int, int, int]
+        The RGB the image is composited over (None keeps it transparent).
+
+    Returns
+    -------
+    np.ndarray
+        The `(height, width, 4)` RGBA image.
+
+    """
+    long, lat = data['long'].to_numpy(dtype='float64'), data['lat'].to_numpy(dtype='float64')
+    extent = bbox is None
+    if extent:
+        bbox = (np.nanmin(long), np.nanmin(lat), np.nanmax(long), np.nanmax(lat))
+    min_long, min_lat, max_long, max_lat = bbox
+    aspect = (max_long - min_long) * np.cos(np.radians((min_lat + max_lat) / 2)) / max(max_lat - min_lat, 1e-12)
+    width, height = (size, max(1, int(round(size / aspect)))) if aspect >= 1 else (max(1, int(round(size * aspect))),
+                                                                                  size)
+    x = (long - min_long) / max(max_long - min_long, 1e-12) * width
+    y = (max_lat - lat) / max(max_lat - min_lat, 1e-12) * height
+    # The (inclusive) southern bound lies on the bottom edge of the canvas, as does the eastern one of the frames' own
+    # extent, so the frames on them are drawn in the last row/column rather than just off the canvas
+    y[lat == min_lat] = np.nextafter(height, 0)
+    if extent:
+        x[long == max_long] = np.nextafter(width, 0)
+
+    km_per_pixel = (max_lat - min_lat) * _spatial.KM_PER_DEGREE / height
+    x, y, colors, weights = _points(data, x, y, mode, color_by, MAX_SEGMENT_KM / km_per_pixel, weight_by)
+    counts, sums = rasterize(x, y, (height, width), colors)
+    intensity = None
+    if weights is not None:
+        intensity = rasterize(x, y, (height, width), weights=weights)[0] / np.where(counts > 0, counts, 1)
+    image = shade(counts, sums, intensity=intensity)
+    if out_path is not None:
+        _save_png(image, out_path, background)
+    return image
+
+
+def mercator_pixels(long: np.ndarray, lat: np.ndarray, zoom: int,
+                    tile_size: int = TILE_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """Global (web mercator) pixel coordinates at `zoom`, as used by slippy-map tiles (XYZ, e.g. in QGIS)."""
+    scale = tile_size * 2 ** zoom
+    lat = np.clip(lat, -85.05112878, 85.05112878)
+    x = (np.asarray(long, dtype='float64') + 180) / 360 * scale
+    y = (1 - np.log(np.tan(np.radians(lat)) + 1 / np.cos(np.radians(lat))) / np.pi) / 2 * scale
+    return x, y
+
+
+def render_tiles(data: pd.DataFrame, out_dir: str, zooms: Iterable[int] = TILE_ZOOMS, mode: str = 'segments',
+                 color_by: str = 'flight_id', tile_size: int = TILE_SIZE) -> pd.DataFrame:
+    """Render zoomable slippy-map tiles (`out_dir/{z}/{x}/{y}.png`) of the frames; only non-empty tiles are written.
+
+    Points are projected once per zoom level and bucketed by tile with a single sort, so each tile is one `rasterize`
+    of just its own points. Densities are normalized per zoom level, so tiles of a level are comparable.
+
+    Returns
+    -------
+    pd.DataFrame
+        `zoom`, `x`, `y` and `points` of each tile written.
+
+    """
+    long, lat = data['long'].to_numpy(dtype='float64'), data['lat'].to_numpy(dtype='float64')
+    records = []
+    for zoom in zooms:
+        x, y = mercator_pixels(long, lat, zoom, tile_size)
+        # Mercator pixels per km, at the central latitude of the frames
+        pixels_per_km = tile_size * 2 ** zoom / (2 * np.pi * _spatial.EARTH_RADIUS_KM *
+                                                 np.cos(np.radians(np.nanmean(lat))))
+        x, y, colors, _ = _points(data, x, y, mode, color_by, MAX_SEGMENT_KM * pixels_per_km)
+        valid = np.isfinite(x) & np.isfinite(y)
+        tx, ty = (x[valid] // tile_size).astype('int64'), (y[valid] // tile_size).astype('int64')
+        x, y = x[valid] - tx * tile_size, y[valid] - ty * tile_size
+        colors = colors[valid] if colors is not None else None
+
+        # The busiest pixel of the level (counted over global pixels, so no tile has to be kept in memory)
+        global_pixels = (ty * tile_size + y.astype('int64')) * (tile_size * 2 ** zoom) + tx * tile_size + \
+            x.astype('int64')
+        vmax = np.unique(global_pixels, return_counts=True)[1].max() if len(global_pixels) else 1
+
+        tile_ids = tx * (2 ** zoom) + ty
+        order = np.argsort(tile_ids, kind='stable')
+        unique, starts = np.unique(tile_ids[order], return_index=True)
+        for tile_id, start, end in zip(unique, starts, np.append(starts[1:], len(order))):
+            members = order[start:end]
+            counts, sums = rasterize(x[members], y[members], (tile_size, tile_size),
+                                     colors[members] if colors is not None else None)
+            tile_x, tile_y = divmod(int(tile_id), 2 ** zoom)
+            path = os.path.join(out_dir, str(zoom), str(tile_x), f'{tile_y}.png')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _save_png(shade(counts, sums, vmax=vmax), path)
+            records.append({'zoom': zoom, 'x': tile_x, 'y': tile_y, 'points': int(counts.sum())})
+    return pd.DataFrame(records, columns=['zoom', 'x', 'y', 'points'])
+
+
+# EOF
+
+# EOF
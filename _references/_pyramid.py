@@ -0,0 +1,228 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 18:10:21:210  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: _pyramid.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 18:10:21:210  GMT-0600
+# @License: [Private IP]
+
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Sequence
+
+import numpy as np
+import pandas as pd
+import tifffile
+
+import _references._accessories as _accessories
+import _references._mosaic as _mosaic
+
+_ = """
+#######################################################################################################################
+############################################   PYRAMID – HYPERPARAMETERS   ############################################
+#######################################################################################################################
+"""
+# Levels are halved until their longest side is at most this
+MIN_OVERVIEW = 256
+# Longest side of each thumbnail
+THUMBNAIL_SIZE = 512
+# Rows of the output level produced at a time (the source is read in bands of twice as many rows)
+BAND_ROWS = 256
+# Side of the tiles each overview level is written in
+OVERVIEW_TILE = 256
+# Processes building pyramids at once
+N_PROCESSES = os.cpu_count() or 1
+
+_ = """
+#######################################################################################################################
+#################################################   STREAMED LEVELS   #################################################
+#######################################################################################################################
+"""
+
+
+def open_source(path: str) -> np.ndarray:
+    """A scan (".tif") or a stitched mosaic (".npy"), memory-mapped whenever possible."""
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode='r')
+    return _mosaic._open_frame(path)
+
+
+def _halve(band: np.ndarray) -> np.ndarray:
+    """Average each 2x2 block of `band` (an odd last row/column is repeated, so the edge isn't lost)."""
+    pad = [(0, band.shape[0] % 2), (0, band.shape[1] % 2)] + [(0, 0)] * (band.ndim - 2)
+    if any(after for _, after in pad):
+        band = np.pad(band, pad, mode='edge')
+    height, width = band.shape[0] // 2, band.shape[1] // 2
+    blocks = band.reshape((height, 2, width, 2) + band.shape[2:]).astype('float32')
+    halved = blocks.mean(axis=(1, 3))
+    if np.issubdtype(band.dtype, np.integer):
+        halved = np.rint(halved)
+    return halved.astype(band.dtype)
+
+
+def halve_streaming(source: np.ndarray, out_path: str, band_rows: int = BAND_ROWS) -> np.ndarray:
+    """Write `source` at half resolution to a memory-mapped ".npy", `band_rows` output rows at a time.
+
+    Only one band of `2 * band_rows` source rows is ever in memory, however large the source is.
+    """
+    shape = ((source.shape[0] + 1) // 2, (source.shape[1] + 1) // 2) + tuple(source.shape[2:])
+    level = np.lib.format.open_memmap(out_path, mode='w+', dtype=source.dtype, shape=shape)
+    for row in range(0, shape[0], band_rows):
+        level[row:row + band_rows] = _halve(np.asarray(source[2 * row:2 * (row + band_rows)]))
+    level.flush()
+    return level
+
+
+def _tiles(level: np.ndarray, tile_size: int) -> Iterator[np.ndarray]:
+    """The tiles of `level`, row by row, zero-padded to `tile_size` at the edges (as tiled TIFFs expect)."""
+    for r0 in range(0, level.shape[0], tile_size):
+        for c0 in range(0, level.shape[1], tile_size):
+            tile = np.zeros((tile_size, tile_size) + level.shape[2:], dtype=level.dtype)
+            block = level[r0:r0 + tile_size, c0:c0 + tile_size]
+            tile[:block.shape[0], :block.shape[1]] = block
+            yield tile
+
+
+_ = """
+#######################################################################################################################
+#############################################   OVERVIEWS + THUMBNAILS   ##############################################
+#######################################################################################################################
+"""
+
+
+def overview_path(path: str) -> str:
+    """Where the overviews of `path` are written: alongside it, as a GDAL-style external overview (QGIS reads these)."""
+    return path + '.ovr'
+
+
+def thumbnail_path(path: str) -> str:
+    """Where the thumbnail of `path` is written."""
+    return os.path.splitext(path)[0] + '_thumbnail.png'
+
+
+def is_current(path: str) -> bool:
+    """Whether the overviews and thumbnail of `path` exist and are newer than it."""
+    mtime = os.path.getmtime(path)
+    return all(os.path.exists(p) and os.path.getmtime(p) >= mtime for p in (overview_path(path), thumbnail_path(path)))
+
+
+def build_pyramid(path: str, min_overview: int = MIN_OVERVIEW, thumbnail_size: int = THUMBNAIL_SIZE,
+                  band_rows: int = BAND_ROWS, tile_size: int = OVERVIEW_TILE, source_path: str = None) -> dict:
+    """Build the overviews (1/2, 1/4, ... resolution) and the thumbnail of a scan or mosaic.
+
+    Each level is streamed from the previous one in bands (the full-resolution source is read exactly once, and never
+    as a whole). The levels are written as the tiled pages of `overview_path(path)`, in decreasing resolution.
+
+    Parameters
+    ----------
+    path : str
+        The scan (".tif") or mosaic (".npy").
+    min_overview : int
+        Levels are halved until their longest side is at most this.
+    thumbnail_size : int
+        Longest side of the thumbnail (`thumbnail_path(path)`).
+    band_rows : int
+        Output rows computed at a time.
+    tile_size : int
+        Side of the tiles of each overview page.
+    source_path : str
+        Read the pixels from this file instead (e.g. the ".npy" a mosaic's ".tif" was converted from, which is
+        memory-mapped rather than decoded tile by tile). The overviews and thumbnail are still those of `path`.
+
+    Returns
+    -------
+    dict
+        The `path`, its `overview` and `thumbnail` paths, the `levels` shapes and the `seconds` it took.
+
+    """
+    start = time.perf_counter()
+    source = open_source(path if source_path is None else source_path)
+    scratch = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        levels, level = [], source
+        while max(level.shape[:2]) > min_overview or not levels:
+            level = halve_streaming(level, os.path.join(scratch, f'level_{len(levels) + 1}.npy'), band_rows)
+            levels.append(level)
+
+        part_path = overview_path(path) + '.part'
+        photometric = 'rgb' if source.ndim == 3 and source.shape[2] in (3, 4) else 'minisblack'
+        with tifffile.TiffWriter(part_path, bigtiff=levels[0].nbytes > 2 ** 31) as tif:
+            for level in levels:
+                tif.write(_tiles(level, tile_size), shape=level.shape, dtype=level.dtype, tile=(tile_size, tile_size),
+                          photometric=photometric, subfiletype=1)
+        os.replace(part_path, overview_path(path))
+
+        save_thumbnail(levels, thumbnail_path(path), thumbnail_size)
+        shapes = [tuple(level.shape) for level in levels]
+    finally:
+        del level, levels
+        shutil.rmtree(scratch, ignore_errors=True)
+    return {'path': path, 'overview': overview_path(path), 'thumbnail': thumbnail_path(path), 'levels': shapes,
+            'seconds': time.perf_counter() - start}
+
+
+def save_thumbnail(levels: List[np.ndarray], out_path: str, thumbnail_size: int = THUMBNAIL_SIZE) -> str:
+    """Save a thumbnail from the smallest level that's still at least `thumbnail_size` (or the smallest level)."""
+    # Imported here: only thumbnails need Pillow
+    from PIL import Image
+
+    large_enough = [level for level in levels if max(level.shape[:2]) >= thumbnail_size]
+    level = np.asarray(large_enough[-1] if large_enough else levels[-1])
+    if level.dtype != np.uint8:
+        low, high = np.nanpercentile(level, [0.5, 99.5])
+        level = (np.clip((level - low) / max(high - low, 1e-12), 0, 1) * 255).astype('uint8')
+    image = Image.fromarray(level[..., :3] if level.ndim == 3 else level)
+    image.thumbnail((thumbnail_size, thumbnail_size))
+    with _accessories.atomic_write(out_path, mode='wb') as file:
+        image.save(file, format='PNG')
+    return out_path
+
+
+def read_overview(path: str, level: int = -1) -> np.ndarray:
+    """An overview of a scan or mosaic, indexed like GDAL's: 0 is half resolution, 1 a quarter, ...; -1 the smallest."""
+    with tifffile.TiffFile(overview_path(path)) as tif:
+        return tif.pages[level].asarray()
+
+
+def build_pyramids(paths: Sequence[str], n_workers: int = N_PROCESSES, force: bool = False,
+                   sources: Dict[str, str] = None) -> pd.DataFrame:
+    """Build the pyramids of many scans and mosaics in parallel, skipping those whose pyramid is already current.
+
+    `sources` maps some of the paths to the file their pixels are read from instead (see `build_pyramid`).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per path, with its `overview`, `thumbnail`, `levels`, `seconds` and `status` ("built", "current" or
+        "failed").
+
+    """
+    sources = {} if sources is None else sources
+    paths = list(dict.fromkeys(path for path in paths if isinstance(path, str) and os.path.exists(path)))
+    pending = [path for path in paths if force or not is_current(path)]
+    _accessories._print(f'Pyramids of {len(paths) - len(pending)} of {len(paths)} files are current, '
+                        f'building the remaining {len(pending)}...', color='GREEN')
+    results = {path: {'overview': overview_path(path), 'thumbnail': thumbnail_path(path), 'status': 'current'}
+               for path in paths if path not in pending}
+
+    with ProcessPoolExecutor(max_workers=max(1, n_workers)) as executor:
+        futures = {executor.submit(build_pyramid, path, source_path=sources.get(path)): path for path in pending}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                results[path] = dict(future.result(), status='built')
+            except Exception as e:
+                _accessories._print(f'Could not build the pyramid of "{path}"! {str(e)[:100]}\n Proceeding...',
+                                    color='LIGHTRED_EX')
+                results[path] = {'status': 'failed'}
+
+    return pd.DataFrame([dict(results[path], path=path) for path in paths],
+                        columns=['path', 'overview', 'thumbnail', 'levels', 'seconds', 'status'])
+
+
+# EOF
+
+# EOF
@@ -0,0 +1,376 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 09:10:12:120  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: _scrape_engine.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 09:10:12:120  GMT-0600
+# @License: [Private IP]
+
+import queue
+import threading
+from contextlib import contextmanager
+from io import StringIO
+from typing import Any, Callable, Dict, Iterator
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+import _references._accessories as _accessories
+import _references._checkpoint as _checkpoint
+
+_ = """
+#######################################################################################################################
+#########################################   SCRAPE ENGINE – HYPERPARAMETERS   #########################################
+#######################################################################################################################
+"""
+# Number of workers (and therefore browser instances) scraping counties at once
+N_WORKERS = 4
+# Maximum number of in-flight requests to any single host (be polite to UCSB)
+PER_HOST_LIMIT = 2
+
+# Relative xpaths on each county page (see NOTES AND ASSUMPTIONS #3 in `scrape_files.py`)
+COUNTY_LIST_XPATH = '//*[@id="content"]/article/div/ul'
+COUNTY_TABLE_XPATH = '/html/body/div[5]/table'
+COUNTY_IMAGE_XPATH = '/html/body/div[4]/table/tbody/tr/td[2]/img'
+INDEX_URL_BASE = 'http://mil.library.ucsb.edu/ap_indexes/'
+SURFACE_LEVEL_COLUMNS = ['date', 'flight_id', 'scale', 'index_url', 'frame_status']
+# Low-cardinality text columns of the surface-level data, stored as categoricals
+SURFACE_LEVEL_CATEGORICALS = ['flight_id', 'frame_status', 'reference_image_url', 'county_name', 'county_url']
+
+_ = """
+#######################################################################################################################
+#############################################   CONCURRENCY PRIMITIVES   ##############################################
+#######################################################################################################################
+"""
+
+
+class HostLimiter:
+    """Caps the number of concurrent requests made to each host.
+
+    Parameters
+    ----------
+    per_host : int
+        The maximum number of requests which may be in flight against a single host at any point in time.
+
+    """
+
+    def __init__(self, per_host: int = PER_HOST_LIMIT) -> None:
+        self.per_host = per_host
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            return self._semaphores[host]
+
+    @contextmanager
+    def limit(self, url: str) -> Iterator[None]:
+        """Hold a slot for the host of `url` for the duration of the `with` block.
+
+        Parameters
+        ----------
+        url : str
+            The url about to be requested.
+
+        """
+        semaphore = self._semaphore(urlparse(url).netloc)
+        with semaphore:
+            yield
+
+
+class ResourcePool:
+    """A fixed-size pool of lazily created, reusable worker resources (e.g. webdrivers).
+
+    Parameters
+    ----------
+    factory : Callable[[], Any]
+        Zero-argument callable which creates a new resource.
+    size : int
+        The maximum number of resources that will ever be created.
+    closer : Callable[[Any], None]
+        Called on each created resource when the pool is closed.
+
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = N_WORKERS,
+                 closer: Callable[[Any], None] = None) -> None:
+        self.factory = factory
+        self.size = size
+        self.closer = closer
+        self._idle = queue.Queue()
+        self._created = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self) -> Iterator[Any]:
+        """Borrow a resource from the pool, creating one if the pool isn't full yet."""
+        resource = None
+        try:
+            resource = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if len(self._created) < self.size:
+                    resource = self.factory()
+                    self._created.append(resource)
+            if resource is None:
+                resource = self._idle.get()
+        try:
+            yield resource
+        finally:
+            self._idle.put(resource)
+
+    def close(self) -> None:
+        """Close every resource that the pool has created."""
+        with self._lock:
+            for resource in self._created:
+                if self.closer is not None:
+                    self.closer(resource)
+            self._created = []
+            self._idle = queue.Queue()
+
+    def __enter__(self) -> 'ResourcePool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+_ = """
+#######################################################################################################################
+###############################################   COUNTY PAGE PARSING   ###############################################
+#######################################################################################################################
+"""
+
+
+def format_county_table(table: pd.DataFrame, reference_image_url: str, county: str, county_url: str) -> pd.DataFrame:
+    """Clean the raw table read from a county page into the surface-level format.
+
+    Parameters
+    ----------
+    table : pd.DataFrame
+        The table as returned by `pd.read_html` on the county page's table element.
+    reference_image_url : str
+        The `src` of the county's reference image.
+    county : str
+        The name of the county.
+    county_url : str
+        The url of the county page.
+
+    Returns
+    -------
+    pd.DataFrame
+        The formatted surface-level data for a single county.
+
+    """
+    # Minor data cleaning
+    table = table.drop([0, 1], axis=0)
+    table.columns = SURFACE_LEVEL_COLUMNS
+    table['date'] = pd.to_datetime(table['date'], errors='coerce')
+
+    # Feature addition/formatting
+    table['index_url'] = table['flight_id'].apply(lambda x: INDEX_URL_BASE + x.replace('-', '').lower())
+    # Scales may be separated by line breaks, which `pd.read_html` turns into whitespace
+    table['scale'] = [[v.replace(',', '').strip() for v in found if v.strip() != '']
+                      for found in table['scale'].str.split('1:').replace(np.nan, '')]
+    table['reference_image_url'] = reference_image_url
+    table['county_name'] = county
+    table['county_url'] = county_url
+
+    return table
+
+
+def scrape_county_selenium(driver, county: str, county_url: str,
+                           checkpoint: _checkpoint.CheckpointStore = None, cache=None) -> pd.DataFrame:
+    """Scrape a single county page with a selenium webdriver.
+
+    Parameters
+    ----------
+    driver : selenium.webdriver.chrome.webdriver.WebDriver
+        The (pooled) webdriver that should load the county page.
+    county : str
+        The name of the county.
+    county_url : str
+        The url of the county page.
+    checkpoint : _checkpoint.CheckpointStore
+        If supplied, the parsed table is checkpointed. A browser can't make conditional requests, so the page is
+        still loaded, but parsing is skipped if the table's HTML hasn't changed since the checkpoint.
+    cache : _cache.ContentCache
+        Unused (the browser fetches pages itself); accepted so that the backends are interchangeable.
+
+    Returns
+    -------
+    pd.DataFrame
+        The formatted surface-level data for a single county.
+
+    """
+    _accessories.retry_call(lambda: _accessories.load(driver, county_url, val_xpath=COUNTY_TABLE_XPATH), county_url)
+
+    # NOTE: Exceptions are specifically caught here since the UCSB website sometimes timesout.
+    #       This may be due to multiple requests or bad internet connection. The page is refreshed (with backoff) to
+    #       hopefully fix this issue. If this error still persists, an Exception will be raised.
+    def _read_table():
+        table_html = driver.find_element_by_xpath(COUNTY_TABLE_XPATH).get_attribute('outerHTML')
+        return table_html, pd.read_html(StringIO(table_html))[0]
+
+    table_html, table = _accessories.retry_call(_read_table, county_url, on_retry=driver.refresh)
+
+    reference_image_url = driver.find_element_by_xpath(COUNTY_IMAGE_XPATH).get_attribute('src')
+    digest = _checkpoint.content_hash((table_html + reference_image_url).encode('utf-8'))
+    if checkpoint is not None and checkpoint.is_unchanged(county_url, digest):
+        return checkpoint.load(county_url)
+
+    table = format_county_table(table, reference_image_url, county, county_url)
+    if checkpoint is not None:
+        checkpoint.save(county_url, table, digest=digest, county=county)
+    return table
+
+
+def scrape_county_http(session, county: str, county_url: str,
+                       checkpoint: _checkpoint.CheckpointStore = None, cache=None) -> pd.DataFrame:
+    """Scrape a single county page over plain HTTP (no browser) with the same xpaths as `scrape_county_selenium`.
+
+    Parameters
+    ----------
+    session : requests.Session
+        The (pooled) keep-alive session created by `_accessories.init_session`.
+    county : str
+        The name of the county.
+    county_url : str
+        The url of the county page.
+    checkpoint : _checkpoint.CheckpointStore
+        If supplied, the page is requested conditionally on the checkpoint's `ETag`/`Last-Modified` and the
+        checkpointed table is reused when the page (or its content hash) hasn't changed. Otherwise the freshly parsed
+        table is checkpointed.
+    cache : _cache.ContentCache
+        If supplied, the page is fetched through this on-disk cache.
+
+    Returns
+    -------
+    pd.DataFrame
+        The formatted surface-level data for a single county.
+
+    """
+    headers = checkpoint.validators(county_url) if checkpoint is not None else None
+    response = _accessories.retry_call(lambda: _accessories.fetch_page(session, county_url, headers=headers,
+                                                                       cache=cache),
+                                       county_url, retry_on=_accessories.RETRYABLE_HTTP_ERRORS)
+    if response.status_code == 304:
+        return checkpoint.load(county_url)
+    digest = _checkpoint.content_hash(response.content)
+    if checkpoint is not None and checkpoint.is_unchanged(county_url, digest):
+        return checkpoint.load(county_url)
+
+    tree = _accessories.parse_html(response.content, base_url=response.url)
+    table_html = _accessories.html_outer(_accessories.find_html_element(tree, COUNTY_TABLE_XPATH))
+    table = pd.read_html(StringIO(table_html))[0]
+    reference_image_url = _accessories.html_attribute(_accessories.find_html_element(tree, COUNTY_IMAGE_XPATH), 'src')
+    table = format_county_table(table, reference_image_url, county, county_url)
+
+    if checkpoint is not None:
+        checkpoint.save(county_url, table, etag=response.headers.get('ETag'),
+                        last_modified=response.headers.get('Last-Modified'), digest=digest, county=county)
+    return table
+
+
+def county_names_selenium(driver) -> Dict[str, str]:
+    """Map each county name to its page url, from the all-counties page already loaded in `driver`."""
+    counties_obj = driver.find_element_by_xpath(COUNTY_LIST_XPATH).find_elements_by_tag_name('li')
+    return {elem.find_element_by_tag_name('a').text: elem.find_element_by_tag_name('a').get_attribute('href')
+            for elem in counties_obj}
+
+
+def county_names_http(session, url: str, cache=None) -> Dict[str, str]:
+    """Map each county name to its page url, by fetching the all-counties page at `url` over HTTP [through `cache`]."""
+    tree = _accessories.fetch_html(session, url, cache=cache)
+    anchors = [elem.find('.//a') for elem in _accessories.find_html_element(tree, COUNTY_LIST_XPATH).iter('li')]
+    return {anchor.text_content().strip(): _accessories.html_attribute(anchor, 'href')
+            for anchor in anchors if anchor is not None}
+
+
+_ = """
+#######################################################################################################################
+##############################################   SURFACE-LEVEL STORAGE   ##############################################
+#######################################################################################################################
+"""
+
+
+def typed_surface_level(data: pd.DataFrame) -> pd.DataFrame:
+    """Convert surface-level data (freshly scraped, or read from the legacy CSV) to its typed, columnar form.
+
+    The legacy CSV stores `scale` as the repr of a Python list (e.g. "['33600']"). Here, every number in it is
+    extracted at once with a vectorized regex (no per-row `ast.literal_eval`) into
+
+    - `scales`: a list of ints per flight (every scale the flight was flown at), and
+    - `scale`: the nullable int scale of single-scale flights (`<NA>` for multi-scale or unknown ones).
+
+    `date` becomes tz-aware (UTC) and the low-cardinality text columns become categoricals.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The surface-level data, with `scale` either as lists of strings or as their string repr.
+
+    Returns
+    -------
+    pd.DataFrame
+        The typed surface-level data, ready to be saved as ".parquet" with `_accessories.save_local_data_file`.
+
+    """
+    data = data.reset_index(drop=True).copy()
+    numbers = data['scale'].astype(str).str.findall(r'\d+').explode().dropna().astype('int64')
+    grouped = numbers.groupby(level=0)
+    data['scales'] = grouped.agg(list).reindex(data.index).apply(lambda found: found if isinstance(found, list)
+                                                                  else [])
+    data['scale'] = grouped.first().reindex(data.index).astype('Int64').where(
+        grouped.size().reindex(data.index) == 1)
+    data['date'] = pd.to_datetime(data['date'], errors='coerce', utc=True)
+    for column in SURFACE_LEVEL_CATEGORICALS:
+        if column in data.columns:
+            data[column] = data[column].astype('category')
+    return data
+
+
+def convert_surface_level_csv(csv_path: str = 'Data/surface_level.csv',
+                              out_path: str = 'Data/surface_level.parquet') -> pd.DataFrame:
+    """One-time conversion of the legacy (stringified-list) surface-level CSV to the typed Parquet format.
+
+    Parameters
+    ----------
+    csv_path : str
+        The legacy CSV.
+    out_path : str
+        Where the typed data should be saved.
+
+    Returns
+    -------
+    pd.DataFrame
+        The typed surface-level data (as saved).
+
+    """
+    data = typed_surface_level(pd.read_csv(csv_path, dtype=str))
+    _accessories.save_local_data_file(data, out_path)
+    return data
+
+
+_ = """
+#######################################################################################################################
+#################################################   SCRAPE BACKENDS   #################################################
+#######################################################################################################################
+"""
+# Backend name -> (county scraper, resource factory, resource closer)
+BACKENDS = {
+    'selenium': (scrape_county_selenium,
+                 lambda: _accessories.init_driver(_accessories.headless_options()),
+                 lambda driver: driver.quit()),
+    'http': (scrape_county_http,
+             lambda: _accessories.init_session(pool_size=PER_HOST_LIMIT),
+             lambda session: session.close())
+}
+
+
+# EOF
+
+# EOF
@@ -0,0 +1,354 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 00:10:22:220  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: _shards.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 00:10:22:220  GMT-0600
+# @License: [Private IP]
+
+import glob
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import util
+from typing import Dict, Iterable, List, Tuple
+from urllib.parse import urlparse
+
+import pandas as pd
+
+import _references._accessories as _accessories
+import _references._checkpoint as _checkpoint
+import _references._metrics as _metrics
+import _references._scrape_engine as _scrape_engine
+
+_ = """
+#######################################################################################################################
+############################################   SHARDS – HYPERPARAMETERS   #############################################
+#######################################################################################################################
+"""
+# Every (state, county) shard of the surface-level data is written to "<SHARD_DIR>/<state>/<county>.parquet"
+SHARD_DIR = 'Data/surface_level/'
+# The counties listed on each state's all-counties page (name -> url) are kept in the state's directory
+COUNTIES_FILENAME = '_counties.json'
+# Each county is checkpointed in its own "<CHECKPOINT_DIR>/<state>/<county>/" (so processes never share an index)
+CHECKPOINT_DIR = 'Data/checkpoints/surface_level/'
+# Number of processes scraping and parsing counties at once, and how many of them may hit the same host at once
+N_PROCESSES = 4
+PER_HOST_LIMIT = _scrape_engine.PER_HOST_LIMIT
+# Low-cardinality text columns of the compacted catalog, stored as categoricals
+SHARD_CATEGORICALS = _scrape_engine.SURFACE_LEVEL_CATEGORICALS + ['state']
+
+_ = """
+#######################################################################################################################
+##################################################   SHARD LAYOUT   ###################################################
+#######################################################################################################################
+"""
+
+
+def slug(name: str) -> str:
+    """A file-system friendly version of a state or county name (e.g. "San Luis Obispo" -> "san-luis-obispo")."""
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def shard_path(directory: str, state: str, county: str) -> str:
+    """The file the surface-level data of `county` (in `state`) is written to."""
+    return os.path.join(directory, slug(state), slug(county) + '.parquet')
+
+
+def county_checkpoint_dir(checkpoint_dir: str, state: str, county: str) -> str:
+    """Where the checkpoint of `county` (in `state`) is kept."""
+    return os.path.join(checkpoint_dir, slug(state), slug(county))
+
+
+def migrate_checkpoints(checkpoint_dir: str, shards: pd.DataFrame) -> int:
+    """Move the checkpoints of the single store the counties shared before sharding (at the root of `checkpoint_dir`)
+    into the per-county stores, so that counties scraped before are still requested conditionally.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        The root of the checkpoints.
+    shards : pd.DataFrame
+        The `state`, `county` and `county_url` of every listed county.
+
+    Returns
+    -------
+    int
+        The number of checkpoints moved.
+
+    """
+    legacy = _checkpoint.CheckpointStore(checkpoint_dir)
+    if not len(legacy):
+        return 0
+    moved = 0
+    for state, county, county_url in shards[['state', 'county', 'county_url']].itertuples(index=False):
+        if county_url in legacy:
+            store = _checkpoint.CheckpointStore(county_checkpoint_dir(checkpoint_dir, state, county))
+            if county_url not in store:
+                legacy.move(county_url, store)
+                moved += 1
+    return moved
+
+
+def read_counties(directory: str, state: str) -> Dict[str, str]:
+    """The counties (name -> url) last listed for `state`, or None if it was never listed."""
+    path = os.path.join(directory, slug(state), COUNTIES_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def write_counties(directory: str, state: str, county_names: Dict[str, str]) -> None:
+    """Atomically record the counties (name -> url) listed for `state`."""
+    path = os.path.join(directory, slug(state), COUNTIES_FILENAME)
+    with _accessories.atomic_write(path, mode='w') as file:
+        json.dump(county_names, file, indent=1)
+
+
+def list_counties(resource, url: str, backend: str = 'http', cache=None) -> Dict[str, str]:
+    """Map each county name to its page url, from a state's all-counties page at `url`."""
+    if backend == 'selenium':
+        _accessories.retry_call(lambda: _accessories.load(resource, url, val_xpath=_scrape_engine.COUNTY_LIST_XPATH),
+                                url)
+        return _scrape_engine.county_names_selenium(resource)
+    return _scrape_engine.county_names_http(resource, url, cache=cache)
+
+
+_ = """
+#######################################################################################################################
+##################################################   SHARD WORKERS   ##################################################
+#######################################################################################################################
+"""
+# State of each worker process, set by `_init_worker` (the resource is only created once it's first needed)
+_WORKER = {}
+
+
+def host_semaphores(urls: Iterable[str], per_host: int = PER_HOST_LIMIT) -> dict:
+    """A process-shared semaphore of `per_host` slots for each host of `urls` (the `HostLimiter` of a process pool).
+
+    Semaphores can only be handed to worker processes as they start, so one is made for every host up front.
+    """
+    return {host: multiprocessing.BoundedSemaphore(per_host) for host in sorted({urlparse(url).netloc for url in urls})}
+
+
+def _init_worker(backend: str, semaphores: dict, cache_args: tuple, checkpoint_dir: str) -> None:
+    _WORKER.update(backend=backend, semaphores=semaphores, checkpoint_dir=checkpoint_dir, resource=None,
+                   cache=None if cache_args is None else _cache_from_args(cache_args), lookups=(0, 0))
+
+
+def _cache_from_args(cache_args: tuple):
+    # Imported here: the cache (and its SQLite index) is only opened by the workers that use it
+    import _references._cache as _cache
+
+    directory, max_bytes, max_age = cache_args
+    return _cache.ContentCache(directory, max_bytes=max_bytes, max_age=max_age)
+
+
+def _worker_resource():
+    """The webdriver or HTTP session of this worker process, created on first use and closed when it exits."""
+    if _WORKER['resource'] is None:
+        _, factory, closer = _scrape_engine.BACKENDS[_WORKER['backend']]
+        _WORKER['resource'] = factory()
+        util.Finalize(None, closer, args=(_WORKER['resource'],), exitpriority=10)
+    return _WORKER['resource']
+
+
+def _drain_stats() -> dict:
+    """What this worker recorded since it was last drained: request latencies, timers and counters, and cache lookups.
+
+    Workers have their own copies of the shared stats, so these are handed back to the parent with every shard (the
+    stats of a failed shard go with the worker's next one).
+    """
+    lookups = (0, 0)
+    if _WORKER['cache'] is not None:
+        hits, misses = _WORKER['cache'].hits, _WORKER['cache'].misses
+        lookups = (hits - _WORKER['lookups'][0], misses - _WORKER['lookups'][1])
+        _WORKER['lookups'] = (hits, misses)
+    return {'latency': _accessories.LATENCY_STATS.drain(), 'metrics': _metrics.METRICS.drain(), 'lookups': lookups}
+
+
+def _merge_stats(stats: dict, cache=None) -> None:
+    """Add the stats drained from a worker to this process' (see `_drain_stats`)."""
+    _accessories.LATENCY_STATS.extend(stats['latency'])
+    _metrics.METRICS.merge(stats['metrics'])
+    if cache is not None:
+        cache.add_lookups(*stats['lookups'])
+
+
+def _scrape_shard(state: str, county: str, county_url: str, path: str) -> Tuple[int, float, dict]:
+    """Scrape, type and write a single (state, county) shard.
+
+    Returns
+    -------
+    Tuple[int, float, dict]
+        Its number of rows, the seconds it took, and the stats the worker recorded (see `_drain_stats`).
+
+    """
+    start = time.perf_counter()
+    scrape_fn = _scrape_engine.BACKENDS[_WORKER['backend']][0]
+    checkpoint = _checkpoint.CheckpointStore(county_checkpoint_dir(_WORKER['checkpoint_dir'], state, county))
+    kwargs = {'cache': _WORKER['cache']} if _WORKER['cache'] is not None else {}
+    with _WORKER['semaphores'][urlparse(county_url).netloc]:
+        table = scrape_fn(_worker_resource(), county, county_url, checkpoint=checkpoint, **kwargs)
+    # Parsing is typed here, in the worker, so the compaction only has to concatenate
+    table = _scrape_engine.typed_surface_level(table.assign(state=state))
+    _accessories.save_local_data_file(table, path)
+    return len(table), time.perf_counter() - start, _drain_stats()
+
+
+_ = """
+#######################################################################################################################
+##############################################   SHARDED STATE SCRAPE   ###############################################
+#######################################################################################################################
+"""
+
+
+def scrape_states(states: Dict[str, str], backend: str = 'http', directory: str = SHARD_DIR, refresh: bool = False,
+                  n_processes: int = N_PROCESSES, per_host: int = PER_HOST_LIMIT,
+                  checkpoint_dir: str = CHECKPOINT_DIR, cache=None) -> pd.DataFrame:
+    """Scrape the surface-level data of every county of `states` across a pool of processes, one shard per county.
+
+    States whose counties were already listed, and counties whose shard already exists, are skipped unless `refresh`,
+    so adding a state only costs that state's scrape (and a failed county is retried on the next run). Refreshed
+    counties are requested conditionally on their checkpoint, and only re-parsed if their page changed.
+
+    Parameters
+    ----------
+    states : Dict[str, str]
+        Mapping of state name to the url of its all-counties page.
+    backend : str
+        Either "selenium" (a headless webdriver per process) or "http" (a keep-alive session per process).
+    directory : str
+        Where the shards are written (see `shard_path`).
+    refresh : bool
+        Whether to re-list and re-scrape states and counties that were already scraped.
+    n_processes : int
+        The number of counties scraped (and parsed) at once.
+    per_host : int
+        The maximum number of processes requesting pages from the same host at once.
+    checkpoint_dir : str
+        Where each county is checkpointed.
+    cache : _cache.ContentCache
+        If supplied, pages are fetched through this on-disk cache (every process opens its own handle on it).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per county, with its `state`, `county`, `county_url`, `path`, number of `rows` (if scraped now) and
+        `status` ("scraped", "stored" or "failed").
+
+    """
+    if backend not in _scrape_engine.BACKENDS:
+        raise ValueError(f'Unknown backend "{backend}", expected one of {list(_scrape_engine.BACKENDS)}.')
+    listed = {state: None if refresh else read_counties(directory, state) for state in states}
+    unlisted = [state for state, county_names in listed.items() if county_names is None]
+    if unlisted:
+        _, factory, closer = _scrape_engine.BACKENDS[backend]
+        resource = factory()
+        try:
+            for state in unlisted:
+                listed[state] = list_counties(resource, states[state], backend=backend, cache=cache)
+                write_counties(directory, state, listed[state])
+        finally:
+            closer(resource)
+
+    shards = pd.DataFrame([{'state': state, 'county': county, 'county_url': county_url,
+                            'path': shard_path(directory, state, county)}
+                           for state, county_names in listed.items() for county, county_url in county_names.items()],
+                          columns=['state', 'county', 'county_url', 'path'])
+    pending = shards if refresh else shards[[not os.path.exists(path) for path in shards['path']]]
+    _accessories._print(f'{len(states)} states list {len(shards)} counties ({len(unlisted)} states listed now); '
+                        f'scraping {len(pending)} of them...', color='GREEN')
+    migrated = migrate_checkpoints(checkpoint_dir, shards)
+    if migrated:
+        _accessories._print(f'Moved {migrated} checkpoints of the unsharded scrape into their counties\' stores.',
+                            color='GREEN')
+
+    results = {path: {'rows': None, 'status': 'stored'} for path in shards['path']}
+    start = time.perf_counter()
+    cache_args = None if cache is None else (cache.directory, cache.max_bytes, cache.max_age)
+    with ProcessPoolExecutor(max_workers=n_processes, initializer=_init_worker,
+                             initargs=(backend, host_semaphores(pending['county_url'], per_host), cache_args,
+                                       checkpoint_dir)) as executor:
+        futures = {executor.submit(_scrape_shard, state, county, county_url, path): (state, county, county_url, path)
+                   for state, county, county_url, path in pending.itertuples(index=False)}
+        for future in as_completed(futures):
+            state, county, county_url, path = futures[future]
+            try:
+                rows, seconds, stats = future.result()
+                # Workers have their own stats, so they (and each shard's time) are added to the parent's here
+                _merge_stats(stats, cache)
+                _metrics.record('shards.scrape', seconds, key=county_url)
+                results[path] = {'rows': rows, 'status': 'scraped'}
+            except Exception as e:
+                # The county's previous shard (if any) is left as it was, and it's retried on the next run
+                _accessories._print(f'Something went wrong with "{county}" ({state})! {str(e)[:100]}\n Proceeding...',
+                                    color='LIGHTRED_EX')
+                results[path] = {'rows': None, 'status': 'failed'}
+    _accessories._print(f'Scraped {len(pending)} counties in {time.perf_counter() - start:.1f} seconds.',
+                        color='GREEN')
+
+    return shards.assign(rows=[results[path]['rows'] for path in shards['path']],
+                         status=[results[path]['status'] for path in shards['path']]).astype({'rows': 'Int64'})
+
+
+_ = """
+#######################################################################################################################
+###################################################   COMPACTION   ####################################################
+#######################################################################################################################
+"""
+
+
+def shard_paths(directory: str = SHARD_DIR, states: List[str] = None) -> List[str]:
+    """The shards of the counties last listed for `states` (every listed state if None), in the order of each state's
+    all-counties page. Shards of counties no longer listed are left out, as are listed counties without a shard."""
+    if states is None:
+        states = [os.path.basename(os.path.dirname(path))
+                  for path in sorted(glob.glob(os.path.join(directory, '*', COUNTIES_FILENAME)))]
+    paths = []
+    for state in states:
+        county_names = read_counties(directory, state) or {}
+        paths += [path for path in (shard_path(directory, state, county) for county in county_names)
+                  if os.path.exists(path)]
+    return paths
+
+
+def compact(directory: str = SHARD_DIR, states: List[str] = None, n_threads: int = N_PROCESSES) -> pd.DataFrame:
+    """Concatenate the shards of the listed counties into the unified surface-level catalog.
+
+    Shards are already typed, so this is only a (threaded) read of every file, one concatenation and re-applying the
+    categoricals (whose categories differ between shards).
+
+    Parameters
+    ----------
+    directory : str
+        Where the shards are.
+    states : List[str]
+        Only compact the shards of these states (every listed state's if None).
+    n_threads : int
+        The number of shards read at once.
+
+    Returns
+    -------
+    pd.DataFrame
+        The surface-level data of every listed county with a shard, by state and in the order of its page.
+
+    """
+    paths = shard_paths(directory, states)
+    if not paths:
+        raise ValueError(f'No surface-level shards of listed counties in "{directory}".')
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        data = pd.concat(list(executor.map(pd.read_parquet, paths)), ignore_index=True)
+    for column in SHARD_CATEGORICALS:
+        if column in data.columns:
+            data[column] = data[column].astype('category')
+    return data
+
+
+# EOF
+
+# EOF
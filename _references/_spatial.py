@@ -0,0 +1,268 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 14:10:26:260  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: _spatial.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 14:10:26:260  GMT-0600
+# @License: [Private IP]
+
+import hashlib
+import os
+from typing import Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import _references._accessories as _accessories
+
+_ = """
+#######################################################################################################################
+############################################   SPATIAL – HYPERPARAMETERS   ############################################
+#######################################################################################################################
+"""
+# Side of each (square) grid cell, in degrees. ~5.5 km; a handful of frames per cell for statewide data
+CELL_SIZE = 0.05
+# Mean Earth radius (km) used for all distances
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+# Side of the (standard 9 x 9 inch) aerial film, in metres
+FILM_SIZE_M = 0.2286
+
+_ = """
+#######################################################################################################################
+#############################################   BRUTE-FORCE PREDICATES   ##############################################
+#######################################################################################################################
+"""
+# NOTE: The index filters its candidates with exactly these functions, so its results always match brute force.
+
+
+def bbox_mask(long: np.ndarray, lat: np.ndarray, bbox: Tuple[float, float, float, float]) -> np.ndarray:
+    """Whether each point is in `bbox = (min_long, min_lat, max_long, max_lat)` (lower bounds inclusive, upper
+    bounds exclusive – the same convention as `_ingest.within_bbox`)."""
+    min_long, min_lat, max_long, max_lat = bbox
+    return (long >= min_long) & (long < max_long) & (lat >= min_lat) & (lat < max_lat)
+
+
+def haversine_km(long: np.ndarray, lat: np.ndarray, center_long: float, center_lat: float) -> np.ndarray:
+    """Great-circle distance (km) from each point to the center."""
+    long, lat = np.radians(long), np.radians(lat)
+    center_long, center_lat = np.radians(center_long), np.radians(center_lat)
+    a = np.sin((lat - center_lat) / 2) ** 2 + np.cos(lat) * np.cos(center_lat) * np.sin((long - center_long) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def polygon_mask(long: np.ndarray, lat: np.ndarray, vertices: Sequence[Tuple[float, float]]) -> np.ndarray:
+    """Whether each point is inside the polygon with `(long, lat)` `vertices` (even-odd rule, vectorized)."""
+    vertices = np.asarray(vertices, dtype='float64')
+    inside = np.zeros(len(long), dtype=bool)
+    x0, y0 = vertices[:, 0], vertices[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    for ax, ay, bx, by in zip(x0, y0, x1, y1):
+        crosses = (ay > lat) != (by > lat)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = ax + (lat - ay) * (bx - ax) / (by - ay)
+        inside ^= crosses & (long < x_cross)
+    return inside
+
+
+_ = """
+#######################################################################################################################
+################################################   FRAME FOOTPRINTS   #################################################
+#######################################################################################################################
+"""
+
+
+def scale_denominators(scale: pd.Series) -> np.ndarray:
+    """The scale of each frame as a number, e.g. 20000 for "1:20,000" or 20000.0 (NaN where it can't be parsed)."""
+    if pd.api.types.is_numeric_dtype(scale):
+        return pd.to_numeric(scale, errors='coerce').to_numpy(dtype='float64')
+    digits = scale.astype(str).str.replace(',', '', regex=False).str.extract(r'(\d+(?:\.\d*)?)\s*$', expand=False)
+    return pd.to_numeric(digits, errors='coerce').to_numpy(dtype='float64')
+
+
+def footprint_km(scale: np.ndarray) -> np.ndarray:
+    """Side (km) of the ground covered by a frame of each scale."""
+    return np.asarray(scale, dtype='float64') * FILM_SIZE_M / 1000
+
+
+_ = """
+#######################################################################################################################
+###################################################   GRID INDEX   ####################################################
+#######################################################################################################################
+"""
+
+
+def fingerprint(long: np.ndarray, lat: np.ndarray) -> str:
+    """A hash of the coordinates, so that a persisted index is never used for a different table."""
+    digest = hashlib.sha1(np.ascontiguousarray(long, dtype='float64').tobytes())
+    digest.update(np.ascontiguousarray(lat, dtype='float64').tobytes())
+    return digest.hexdigest()
+
+
+class GridIndex:
+    """Uniform-grid spatial index over frame centroids (`long`/`lat`).
+
+    Points are bucketed into square cells numbered row by row, and sorted by cell. The cells of one bbox row are
+    therefore contiguous, so a query costs one binary search per grid row it touches plus an exact check of the
+    candidates in those cells – instead of a full scan of every centroid.
+
+    Queries return positional row indices (sorted, i.e. in table order) for use with `.iloc`, e.g.
+    `raw_df.iloc[index.bbox(...)]`. Rows with missing coordinates are never returned.
+
+    Parameters
+    ----------
+    long, lat : np.ndarray
+        The centroids, one per row of the indexed table.
+    cell_size : float
+        The side of each grid cell, in degrees.
+
+    """
+
+    def __init__(self, long: np.ndarray, lat: np.ndarray, cell_size: float = CELL_SIZE) -> None:
+        long, lat = np.asarray(long, dtype='float64'), np.asarray(lat, dtype='float64')
+        self.n_rows = len(long)
+        self.cell_size = cell_size
+        self.fingerprint = fingerprint(long, lat)
+
+        valid = np.flatnonzero(np.isfinite(long) & np.isfinite(lat))
+        self.origin = (long[valid].min(), lat[valid].min()) if len(valid) else (0.0, 0.0)
+        self.shape = ((int(np.floor((lat[valid].max() - self.origin[1]) / cell_size)) + 1,
+                       int(np.floor((long[valid].max() - self.origin[0]) / cell_size)) + 1) if len(valid) else (1, 1))
+
+        cells = self._cells(long[valid], lat[valid])
+        order = np.argsort(cells, kind='stable')
+        self._init_arrays(valid[order], cells[order], long[valid][order], lat[valid][order])
+
+    def _init_arrays(self, positions: np.ndarray, cells: np.ndarray, long: np.ndarray, lat: np.ndarray) -> None:
+        self.positions, self.cells, self.long, self.lat = positions, cells, long, lat
+
+    def _cells(self, long: np.ndarray, lat: np.ndarray) -> np.ndarray:
+        # NOTE: Must be computed exactly as in `_cell_range` (rounding is then monotonic, so no hit is ever missed)
+        ix = np.floor((long - self.origin[0]) / self.cell_size).astype('int64')
+        iy = np.floor((lat - self.origin[1]) / self.cell_size).astype('int64')
+        return iy * self.shape[1] + ix
+
+    def _cell_range(self, value: float, axis: int) -> int:
+        return int(np.clip(np.floor((value - self.origin[axis]) / self.cell_size), 0, self.shape[1 - axis] - 1))
+
+    def _candidates(self, bbox: Tuple[float, float, float, float]) -> np.ndarray:
+        """Offsets (into the sorted arrays) of every point in the cells overlapping `bbox` (a superset of the hits)."""
+        min_long, min_lat, max_long, max_lat = bbox
+        if min_long > max_long or min_lat > max_lat or len(self.cells) == 0:
+            return np.empty(0, dtype='int64')
+        ix0, ix1 = self._cell_range(min_long, 0), self._cell_range(max_long, 0)
+        iy0, iy1 = self._cell_range(min_lat, 1), self._cell_range(max_lat, 1)
+        rows = np.arange(iy0, iy1 + 1) * self.shape[1]
+        starts = np.searchsorted(self.cells, rows + ix0, side='left')
+        ends = np.searchsorted(self.cells, rows + ix1, side='right')
+        # Concatenate the ranges [start, end) without a Python-level loop
+        lengths = ends - starts
+        offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        return offsets + np.arange(lengths.sum())
+
+    def bbox(self, min_long: float, min_lat: float, max_long: float, max_lat: float) -> np.ndarray:
+        """Rows whose centroid is in the bbox (lower bounds inclusive, upper bounds exclusive; see `bbox_mask`)."""
+        bbox = (min_long, min_lat, max_long, max_lat)
+        candidates = self._candidates(bbox)
+        hits = candidates[bbox_mask(self.long[candidates], self.lat[candidates], bbox)]
+        return np.sort(self.positions[hits])
+
+    def _radius_bbox(self, long: float, lat: float, radius_km: float) -> Tuple[float, float, float, float]:
+        """A bbox containing every point within `radius_km` of `(long, lat)` (the bounds of the spherical cap)."""
+        angle = radius_km / EARTH_RADIUS_KM
+        d_lat = np.degrees(angle)
+        ratio = np.sin(angle) / np.cos(np.radians(lat)) if abs(lat) < 90 else np.inf
+        # The cap contains a pole (or reaches all the way around) if the ratio exceeds 1
+        d_long = 180.0 if angle >= np.pi / 2 or ratio >= 1 else np.degrees(np.arcsin(ratio))
+        # Padded so that points exactly on the circle (and rounding in the bounds) are still candidates
+        pad = 1e-9 + 1e-6 * max(d_lat, d_long)
+        return (long - d_long - pad, lat - d_lat - pad, long + d_long + pad, lat + d_lat + pad)
+
+    def radius(self, long: float, lat: float, radius_km: float) -> np.ndarray:
+        """Rows whose centroid is within `radius_km` (great-circle distance, inclusive) of `(long, lat)`."""
+        candidates = self._candidates(self._radius_bbox(long, lat, radius_km))
+        hits = candidates[haversine_km(self.long[candidates], self.lat[candidates], long, lat) <= radius_km]
+        return np.sort(self.positions[hits])
+
+    def polygon(self, vertices: Sequence[Tuple[float, float]]) -> np.ndarray:
+        """Rows whose centroid is inside the polygon with `(long, lat)` `vertices` (see `polygon_mask`)."""
+        vertices = np.asarray(vertices, dtype='float64')
+        candidates = self._candidates((vertices[:, 0].min(), vertices[:, 1].min(),
+                                       vertices[:, 0].max(), vertices[:, 1].max()))
+        hits = candidates[polygon_mask(self.long[candidates], self.lat[candidates], vertices)]
+        return np.sort(self.positions[hits])
+
+    def nearest(self, long: float, lat: float, k: int = 1) -> np.ndarray:
+        """The `k` rows whose centroids are closest to `(long, lat)`, nearest first (ties broken by row order).
+
+        The search window starts at one cell around the point and doubles until it holds `k` points that are all
+        closer than anything outside the window could be.
+        """
+        k = min(k, len(self.positions))
+        if k <= 0:
+            return np.empty(0, dtype='int64')
+        radius_km = self.cell_size * KM_PER_DEGREE
+        while True:
+            candidates = self._candidates(self._radius_bbox(long, lat, radius_km))
+            distances = haversine_km(self.long[candidates], self.lat[candidates], long, lat)
+            within = distances <= radius_km
+            if within.sum() >= k or len(candidates) == len(self.positions):
+                candidates, distances = candidates[within], distances[within]
+                if len(candidates) < k:
+                    candidates = np.arange(len(self.positions))
+                    distances = haversine_km(self.long, self.lat, long, lat)
+                order = np.lexsort((self.positions[candidates], distances))[:k]
+                return self.positions[candidates[order]]
+            radius_km *= 2
+
+    def save(self, filepath: str) -> None:
+        """Persist the index (atomically) so that it isn't rebuilt on every run."""
+        with _accessories.atomic_write(filepath, mode='wb') as file:
+            np.savez(file, positions=self.positions, cells=self.cells, long=self.long, lat=self.lat,
+                     origin=np.asarray(self.origin), shape=np.asarray(self.shape),
+                     meta=np.asarray([self.cell_size, self.n_rows]), fingerprint=np.asarray(self.fingerprint))
+
+    @classmethod
+    def load(cls, filepath: str) -> 'GridIndex':
+        """Load an index persisted with `save`."""
+        with np.load(filepath) as arrays:
+            index = cls.__new__(cls)
+            index.cell_size, n_rows = arrays['meta']
+            index.n_rows = int(n_rows)
+            index.origin, index.shape = tuple(arrays['origin']), tuple(int(n) for n in arrays['shape'])
+            index.fingerprint = str(arrays['fingerprint'])
+            index._init_arrays(arrays['positions'], arrays['cells'], arrays['long'], arrays['lat'])
+        return index
+
+
+def load_or_build(filepath: str, long: np.ndarray, lat: np.ndarray, cell_size: float = CELL_SIZE) -> GridIndex:
+    """Load the index persisted at `filepath` if it was built from these exact coordinates, otherwise (re)build it.
+
+    Parameters
+    ----------
+    filepath : str
+        Where the index is persisted (".npz").
+    long, lat : np.ndarray
+        The centroids, one per row of the indexed table.
+    cell_size : float
+        The side of each grid cell, in degrees (a persisted index with another cell size is rebuilt).
+
+    Returns
+    -------
+    GridIndex
+        The index of `long`/`lat`.
+
+    """
+    if os.path.exists(filepath):
+        index = GridIndex.load(filepath)
+        if index.fingerprint == fingerprint(np.asarray(long, dtype='float64'), np.asarray(lat, dtype='float64')) \
+                and index.cell_size == cell_size:
+            return index
+    index = GridIndex(long, lat, cell_size=cell_size)
+    index.save(filepath)
+    return index
+
+
+# EOF
+
+# EOF
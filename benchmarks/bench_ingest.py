@@ -0,0 +1,106 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 13:10:52:520  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: bench_ingest.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 13:10:52:520  GMT-0600
+# @License: [Private IP]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import _references._ingest as _ingest  # noqa: E402
+
+_ = """
+#######################################################################################################################
+#############################################   SYNTHETIC FLIGHTS TABLE   #############################################
+#######################################################################################################################
+"""
+
+
+def synthetic_flights(n_rows: int = 1_000_000, n_flights: int = 2_000, seed: int = 0) -> pd.DataFrame:
+    """A synthetic "All_Flights_Merge.csv" with the same columns (and similar content) as the real one."""
+    rng = np.random.default_rng(seed)
+    flight_ids = np.array([f'C_{rng.integers(1000, 99999)}{"X" if i % 7 == 0 else ""}' for i in range(n_flights)])
+    flight = rng.integers(0, n_flights, n_rows)
+    frames = rng.integers(1, 500, n_rows)
+    dates = pd.Timestamp('1928-01-01') + pd.to_timedelta(rng.integers(0, 365 * 90, n_flights)[flight], unit='D')
+    scans = pd.Series(flight_ids[flight]).str.cat(frames.astype(str), sep='_')
+    return pd.DataFrame({
+        'X': rng.uniform(-124.5, -113.5, n_rows), 'Y': rng.uniform(32.4, 43.0, n_rows),
+        'FID': np.arange(n_rows), 'OBJECTID': np.arange(1, n_rows + 1), 'HELD': 'Y', 'FLIGHT_ID': flight_ids[flight],
+        'DATE': dates.strftime('%m/%d/%Y'), 'FRAME': frames, 'SCALE': rng.choice([12000, 20000, 24000], n_rows),
+        'LATLONG': 'x', 'SCAN': 'Scan: http://mil.library.ucsb.edu/ap_images/' + scans + '.tif (download)',
+        'ROLL': 1, 'NITRATE': 'N', 'CUT_FRAME': 'N', 'PRINT': 'Y'})
+
+
+_ = """
+#######################################################################################################################
+#################################################   INGEST VARIANTS   #################################################
+#######################################################################################################################
+"""
+
+
+def legacy_ingest(filepath: str) -> pd.DataFrame:
+    """The ingest of "scrape_files.py" before `_ingest` existed (kept verbatim for comparison)."""
+    raw_df = pd.read_csv(filepath).infer_objects()
+    raw_df.columns = ['long', 'lat', 'FID_delete', 'object_id', 'held_delete', 'flight_id', 'date',
+                      'frame', 'scale', 'latlong_delete', 'scan', 'roll_delete', 'nitrate_delete',
+                      'cut_frame_delete', 'print_delete']
+    raw_df = raw_df[[c for c in raw_df.columns if '_delete' not in c]]
+    raw_df['scan'] = raw_df['scan'].str.extract(r'(http:\S+.tif)')
+    raw_df['date'] = pd.to_datetime(raw_df['date'])
+
+    _temp = raw_df[(raw_df['long'] < -114) & (raw_df['lat'] < 42.5)].reset_index(drop=True)
+    _temp['date_delta'] = _temp['date'].apply(lambda x: x.date().year) - min(_temp['date']).date().year
+    return _temp
+
+
+def vectorized_ingest(filepath: str, chunksize: int = None) -> pd.DataFrame:
+    """The same selection through `_ingest`."""
+    _temp = _ingest.read_flights(filepath, bbox=(-np.inf, -np.inf, -114, 42.5), chunksize=chunksize)
+    _temp['date_delta'] = _ingest.year_delta(_temp['date'])
+    return _temp
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(n_rows: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, 'All_Flights_Merge.csv')
+        synthetic_flights(n_rows).to_csv(filepath, index=False)
+        print(f'Synthetic table: {n_rows:,} rows, {os.path.getsize(filepath) / 1024 ** 2:.1f} MB')
+
+        legacy, legacy_s = _timed(legacy_ingest, filepath)
+        vectorized, vectorized_s = _timed(vectorized_ingest, filepath)
+        chunked, chunked_s = _timed(vectorized_ingest, filepath, chunksize=_ingest.CHUNKSIZE)
+
+    columns = ['long', 'lat', 'flight_id', 'date', 'scan', 'date_delta']
+    for name, result in [('vectorized', vectorized), ('chunked', chunked)]:
+        pd.testing.assert_frame_equal(legacy[columns].astype({'flight_id': str}),
+                                      result[columns].astype({'flight_id': str}), check_dtype=False)
+        print(f'{name} output matches legacy output ({len(result):,} rows).')
+    print(f'legacy:     {legacy_s:7.2f} s')
+    print(f'vectorized: {vectorized_s:7.2f} s  ({legacy_s / vectorized_s:.1f}x)')
+    print(f'chunked:    {chunked_s:7.2f} s  ({legacy_s / chunked_s:.1f}x)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the flights ingest against the legacy code.')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Rows in the synthetic flights table.')
+    main(parser.parse_args().rows)
+
+# EOF
+
+# EOF
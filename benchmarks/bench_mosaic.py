@@ -0,0 +1,144 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 16:10:47:470  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: bench_mosaic.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 16:10:47:470  GMT-0600
+# @License: [Private IP]
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import psutil
+import tifffile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import _references._mosaic as _mosaic  # noqa: E402
+
+_ = """
+#######################################################################################################################
+################################################   SYNTHETIC FRAMES   #################################################
+#######################################################################################################################
+"""
+
+
+def scene(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """The synthetic "ground": a smooth pattern of mosaic coordinates, so overlapping frames agree where they meet."""
+    return (127.5 + 60 * np.sin(x / 97.0) + 60 * np.cos(y / 131.0)).astype('uint8')
+
+
+def synthetic_frames(directory: str, grid: int, frame_size: int = 2048, overlap: float = 0.3,
+                     seed: int = 0) -> list:
+    """A `grid` x `grid` block of overlapping, slightly rotated scans of `scene`, written as uncompressed TIFFs."""
+    rng = np.random.default_rng(seed)
+    step = frame_size * (1 - overlap)
+    frames = []
+    for i in range(grid):
+        for j in range(grid):
+            angle = rng.uniform(-0.02, 0.02)
+            cos, sin = np.cos(angle), np.sin(angle)
+            transform = np.array([[cos, -sin, j * step + rng.uniform(-20, 20)],
+                                  [sin, cos, i * step + rng.uniform(-20, 20)]])
+            # Pixel centres of the frame, in mosaic coordinates
+            fy, fx = np.mgrid[0:frame_size, 0:frame_size] + 0.5
+            path = os.path.join(directory, f'frame_{i}_{j}.tif')
+            tifffile.imwrite(path, scene(transform[0, 0] * fx + transform[0, 1] * fy + transform[0, 2],
+                                         transform[1, 0] * fx + transform[1, 1] * fy + transform[1, 2]))
+            frames.append(_mosaic.Frame(path, transform))
+    return frames
+
+
+_ = """
+#######################################################################################################################
+####################################################   BENCHMARK   ####################################################
+#######################################################################################################################
+"""
+
+
+class PeakMemory:
+    """Samples the resident memory of this process and all its children (e.g. a process pool) in the background.
+
+    `ru_maxrss` can't be used: on Linux it survives `exec`, so a spawned process "inherits" its parent's peak.
+    """
+
+    def __init__(self, interval: float = 0.02) -> None:
+        self.interval = interval
+        self.peak_total = self.peak_process = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        process = psutil.Process()
+        while not self._stop.is_set():
+            rss = []
+            for p in [process] + process.children(recursive=True):
+                try:
+                    rss.append(p.memory_info().rss)
+                except psutil.Error:
+                    pass
+            self.peak_total, self.peak_process = max(self.peak_total, sum(rss)), max(self.peak_process, max(rss))
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> 'PeakMemory':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def _run(frames: list, out_path: str, n_workers: int, tile_size: int) -> dict:
+    """Stitch in a fresh process and report the peak resident memory of it and of its blending processes."""
+    bounds = np.array([frame.bounds for frame in frames])
+    min_x, min_y = np.floor(bounds[:, 0].min()), np.floor(bounds[:, 1].min())
+    frames, shape = _mosaic.fit_to_origin(frames)
+    with PeakMemory() as memory:
+        stats = _mosaic.stitch(frames, out_path, shape=shape, tile_size=tile_size, n_workers=n_workers)
+    mosaic = np.load(out_path, mmap_mode='r')
+    # Away from the mosaic's edges, every pixel should be the scene itself (up to nearest-neighbour sampling)
+    margin = 200
+    rows = np.arange(margin, shape[0] - margin, 97)
+    cols = np.arange(margin, shape[1] - margin, 89)
+    expected = scene(cols[None, :] + 0.5 + min_x, rows[:, None] + 0.5 + min_y)
+    stats['max_abs_error'] = int(np.abs(mosaic[np.ix_(rows, cols)].astype(int) - expected.astype(int)).max())
+    stats['peak_rss_mb'], stats['peak_process_rss_mb'] = memory.peak_total / 1024 ** 2, memory.peak_process / 1024 ** 2
+    return stats
+
+
+def main(grids: list, frame_size: int, n_workers: int, tile_size: int) -> None:
+    spawn = multiprocessing.get_context('spawn')
+    print(f'{"frames":>7} {"mosaic (MB)":>12} {"workers":>8} {"seconds":>8} {"MPix/s":>8} {"peak RSS (MB)":>14} '
+          f'{"per process":>12} {"max err":>8}')
+    for grid in grids:
+        with tempfile.TemporaryDirectory() as directory:
+            frames = synthetic_frames(directory, grid, frame_size)
+            for workers in sorted({1, n_workers}):
+                # A fresh process per run, so each run's peak memory is measured on its own
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as runner:
+                    stats = runner.submit(_run, frames, os.path.join(directory, f'mosaic_{workers}.npy'), workers,
+                                          tile_size).result()
+                size_mb = np.prod(stats['shape']) / 1024 ** 2
+                print(f'{len(frames):>7} {size_mb:>12.0f} {workers:>8} {stats["seconds"]:>8.2f} '
+                      f'{stats["mpix_per_s"]:>8.1f} {stats["peak_rss_mb"]:>14.0f} '
+                      f'{stats["peak_process_rss_mb"]:>12.0f} {stats["max_abs_error"]:>8}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark out-of-core mosaic stitching on synthetic frames.')
+    parser.add_argument('--grids', type=int, nargs='+', default=[2, 4, 6], help='Frames per side of each mosaic.')
+    parser.add_argument('--frame-size', type=int, default=2048, help='Side of each synthetic scan, in pixels.')
+    parser.add_argument('--workers', type=int, default=_mosaic.N_PROCESSES, help='Blending processes.')
+    parser.add_argument('--tile-size', type=int, default=_mosaic.TILE_SIZE, help='Side of each mosaic tile.')
+    args = parser.parse_args()
+    main(args.grids, args.frame_size, args.workers, args.tile_size)
+
+# EOF
+
+# EOF
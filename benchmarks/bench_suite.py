@@ -0,0 +1,288 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   18-Oct-2026 21:10:08:080  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: bench_suite.py
+# @Last modified by:   Ray
+# @Last modified time: 18-Oct-2026 21:10:08:080  GMT-0600
+# @License: [Private IP]
+
+import argparse
+import ast
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import _references._accessories as _accessories  # noqa: E402
+import _references._catalog_join as _catalog_join  # noqa: E402
+import _references._fixture_server as _fixture_server  # noqa: E402
+import _references._ingest as _ingest  # noqa: E402
+import _references._metrics as _metrics  # noqa: E402
+import _references._plotting as _plotting  # noqa: E402
+import _references._scrape_engine as _scrape_engine  # noqa: E402
+import _references._shards as _shards  # noqa: E402
+from bench_ingest import synthetic_flights  # noqa: E402
+
+# The checked-in scrape of every county. The fixture pages are rendered from it in the UCSB layout, not saved from the
+# live site, so they only exercise the XPaths as `county_page` lays pages out (the trimmed pages in "tests/fixtures/"
+# cover the parsing of the real layout)
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Data', 'surface_level.csv')
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+_ = """
+#######################################################################################################################
+################################################   OFFLINE FIXTURES   #################################################
+#######################################################################################################################
+"""
+
+
+def _scale_text(scale: str) -> str:
+    """The scale cell as the county pages show it, from its legacy repr (e.g. "['20000', '40000']")."""
+    return ' '.join(f'1:{int(value):,}' for value in ast.literal_eval(scale))
+
+
+def county_page(rows: pd.DataFrame, image_url: str) -> str:
+    """A county page laid out like the UCSB ones (so `_scrape_engine.COUNTY_*_XPATH` find the same elements)."""
+    cells = ''.join(f'<tr><td>{row.date}</td><td>{row.flight_id}</td><td>{_scale_text(row.scale)}</td>'
+                    f'<td><a href="{row.index_url}">Index</a></td><td>{row.frame_status}</td></tr>\n'
+                    for row in rows.itertuples())
+    return ('<html><body><div>UCSB Library</div><div>Geospatial Collection</div><div>Aerial Photography</div>\n'
+            f'<div><table><tr><td>County</td><td><img src="{image_url}"></td></tr></table></div>\n'
+            '<div><table><tr><td>Date</td><td>Flight ID</td><td>Scale</td><td>Index</td><td>Frames</td></tr>'
+            '<tr><td></td><td></td><td></td><td></td><td></td></tr>\n'
+            f'{cells}</table></div></body></html>\n')
+
+
+def build_site(directory: str, catalog_path: str = CATALOG_PATH) -> dict:
+    """Render the all-counties page ("index.html") and every county page of the checked-in catalog into `directory`.
+
+    Returns
+    -------
+    dict
+        The name of each county page, and the number of catalog rows on it.
+
+    """
+    catalog = pd.read_csv(catalog_path, dtype=str).fillna('')
+    pages, links = {}, []
+    for i, (county, rows) in enumerate(catalog.groupby('county_name', sort=False)):
+        name = f'county_{i}.html'
+        with open(os.path.join(directory, name), 'w') as file:
+            file.write(county_page(rows, rows['reference_image_url'].iloc[0]))
+        pages[name] = len(rows)
+        links.append(f'<li><a href="{name}">{county}</a></li>')
+    with open(os.path.join(directory, 'index.html'), 'w') as file:
+        file.write(f'<html><body><div id="content"><article><div><h3>California</h3><ul>{"".join(links)}</ul></div>'
+                   '</article></div></body></html>\n')
+    return pages
+
+
+def synthetic_surface_level(flight_ids: np.ndarray, seed: int = 0) -> pd.DataFrame:
+    """A legacy "surface_level.csv" (stringified scale lists, hyphenated ids) covering most of `flight_ids`."""
+    rng = np.random.default_rng(seed)
+    flight_ids = np.asarray(flight_ids)[rng.random(len(flight_ids)) < 0.9]
+    scales = rng.choice([12000, 20000, 24000, 33600], len(flight_ids))
+    multi = rng.random(len(flight_ids)) < 0.05
+    return pd.DataFrame({
+        'date': '1950-06-01', 'flight_id': np.char.replace(flight_ids.astype(str), '_', '-'),
+        'scale': [str([str(s), str(2 * s)]) if m else str([str(s)]) for s, m in zip(scales, multi)],
+        'index_url': 'http://mil.library.ucsb.edu/ap_indexes/x', 'frame_status': 'Ask MIL staff'})
+
+
+_ = """
+#######################################################################################################################
+######################################################   CASES   ######################################################
+#######################################################################################################################
+"""
+
+
+def legacy_surface_level_load(csv_path: str) -> pd.DataFrame:
+    """The load of "scrape_files.py" before the typed format existed (one `ast.literal_eval` per row)."""
+    data = pd.read_csv(csv_path).infer_objects()
+    data['scale'] = [ast.literal_eval(val) for val in data['scale']]
+    return data
+
+
+def legacy_join(flights: pd.DataFrame, surface_level: pd.DataFrame) -> pd.DataFrame:
+    """The `flight_id` merge of "scrape_files.py" before `_catalog_join` existed."""
+    surface_level = surface_level.copy()
+    surface_level['flight_id'] = surface_level['flight_id'].str.replace('-', '_')
+    return pd.merge(flights.astype({'flight_id': str}), surface_level, how='inner', on=['flight_id'])
+
+
+def parse_pages(pages: dict) -> int:
+    """Parse county pages already in memory (no network): the lxml + `pd.read_html` path of `scrape_county_http`."""
+    rows = 0
+    for url, content in pages.items():
+        tree = _accessories.parse_html(content, base_url=url)
+        table_html = _accessories.html_outer(_accessories.find_html_element(tree, _scrape_engine.COUNTY_TABLE_XPATH))
+        image = _accessories.find_html_element(tree, _scrape_engine.COUNTY_IMAGE_XPATH)
+        table = _scrape_engine.format_county_table(pd.read_html(StringIO(table_html))[0],
+                                                   _accessories.html_attribute(image, 'src'), url, url)
+        rows += len(table)
+    return rows
+
+
+def scrape_site(url: str, n_workers: int) -> int:
+    """Scrape the fixture site end to end over HTTP, as `scrape` does (the all-counties page, then every county in
+    its own shard across `n_workers` processes), from scratch every time."""
+    with tempfile.TemporaryDirectory() as directory:
+        report = _shards.scrape_states({'california': url + 'index.html'}, backend='http',
+                                       directory=os.path.join(directory, 'shards'), n_processes=n_workers,
+                                       checkpoint_dir=os.path.join(directory, 'checkpoints'))
+        return int(report['rows'].sum())
+
+
+def measure(fn, repeats: int) -> dict:
+    """Run `fn` once to warm up, then `repeats` times; the best time is what's compared (it's the least noisy)."""
+    result = fn()
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {'best_s': min(times), 'median_s': statistics.median(times), 'result': result}
+
+
+def run_suite(sizes: list, repeats: int, n_workers: int) -> list:
+    """Time every case (the flights-dependent ones at each of `sizes` rows) and check that variants agree."""
+    results = []
+
+    def _record(case: str, size, fn) -> dict:
+        timing = measure(fn, repeats)
+        results.append({'case': case, 'size': size, 'best_s': timing['best_s'], 'median_s': timing['median_s']})
+        print(f'{case:<28} {str(size):>10} {timing["best_s"]:>9.3f} s (median {timing["median_s"]:.3f} s)')
+        return timing['result']
+
+    # Progress messages of the scrape engine would drown the results (restored even if a case fails)
+    _metrics.ECHO = False
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            site = os.path.join(directory, 'site')
+            os.makedirs(site)
+            counts = build_site(site)
+            pages = {}
+            for name in counts:
+                with open(os.path.join(site, name), 'rb') as file:
+                    pages[name] = file.read()
+            rows = _record('scrape.parse', len(counts), lambda: parse_pages(pages))
+            assert rows == sum(counts.values()), f'Parsed {rows} rows, expected {sum(counts.values())}.'
+            with _fixture_server.FixtureServer(site) as server:
+                rows = _record('scrape.http', len(counts), lambda: scrape_site(server.url, n_workers))
+            assert rows == sum(counts.values()), f'Scraped {rows} rows, expected {sum(counts.values())}.'
+
+            legacy = _record('surface_level.literal_eval', len(pd.read_csv(CATALOG_PATH, usecols=['scale'])),
+                             lambda: legacy_surface_level_load(CATALOG_PATH))
+            typed = _record('surface_level.convert', len(legacy),
+                            lambda: _scrape_engine.typed_surface_level(pd.read_csv(CATALOG_PATH, dtype=str)))
+            assert typed['scales'].tolist() == [[int(v) for v in scale] for scale in legacy['scale']]
+            # The one-time conversion above is not what replaced the legacy load; reading its Parquet output is
+            parquet_path = os.path.join(directory, 'surface_level.parquet')
+            _accessories.save_local_data_file(typed, parquet_path)
+            loaded = _record('surface_level.parquet', len(legacy),
+                             lambda: _accessories.retrieve_local_data_file(parquet_path))
+            assert [list(scales) for scales in loaded['scales']] == typed['scales'].tolist()
+
+            for size in sizes:
+                csv_path = os.path.join(directory, f'flights_{size}.csv')
+                synthetic_flights(size).to_csv(csv_path, index=False)
+                flights = _record('ingest.read_flights', size, lambda: _ingest.read_flights(csv_path))
+                surface_level = synthetic_surface_level(flights['flight_id'].cat.categories.to_numpy())
+
+                merged = _record('join.legacy', size, lambda: legacy_join(flights, surface_level))
+                joined = _record('join.catalog', size, lambda: _catalog_join.CatalogJoin(flights, surface_level).join())
+                assert len(joined) == len(merged), f'CatalogJoin gave {len(joined)} rows, pd.merge {len(merged)}.'
+
+                png_path = os.path.join(directory, 'flight_paths.png')
+                _record('plot.density', size, lambda: _plotting.render(flights, png_path, mode='density'))
+                _record('plot.segments', size, lambda: _plotting.render(flights, png_path, mode='segments'))
+                del flights, surface_level, merged, joined
+    finally:
+        _metrics.ECHO = True
+    return results
+
+
+_ = """
+#######################################################################################################################
+####################################################   BASELINE   #####################################################
+#######################################################################################################################
+"""
+
+
+def environment() -> dict:
+    """What the timings depend on (besides the code): compare these before trusting a comparison."""
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(), 'cpus': os.cpu_count(),
+            'system': platform.system()}
+
+
+def save_baseline(results: list, path: str = BASELINE_PATH) -> None:
+    with open(path, 'w') as file:
+        json.dump({'environment': environment(), 'results': results}, file, indent=1)
+    print(f'Baseline saved to "{path}".')
+
+
+def compare(results: list, path: str = BASELINE_PATH, tolerance: float = 0.25) -> list:
+    """Compare `results` with the stored baseline; cases more than `tolerance` slower than it are regressions.
+
+    Returns
+    -------
+    list
+        The regressed cases, as `(case, size, ratio)`.
+
+    """
+    with open(path) as file:
+        baseline = json.load(file)
+    differences = {key: (value, environment()[key]) for key, value in baseline['environment'].items()
+                   if environment().get(key) != value}
+    if differences:
+        print(f'NOTE: The baseline was measured in a different environment {differences}; '
+              'ratios may not be meaningful.')
+    stored = {(row['case'], str(row['size'])): row['best_s'] for row in baseline['results']}
+
+    regressions = []
+    print(f'\n{"case":<28} {"size":>10} {"baseline":>10} {"now":>10} {"ratio":>7}')
+    for row in results:
+        before = stored.get((row['case'], str(row['size'])))
+        if before is None:
+            print(f'{row["case"]:<28} {str(row["size"]):>10} {"-":>10} {row["best_s"]:>10.3f} {"new":>7}')
+            continue
+        ratio = row['best_s'] / before
+        flag = '  REGRESSION' if ratio > 1 + tolerance else ''
+        print(f'{row["case"]:<28} {str(row["size"]):>10} {before:>10.3f} {row["best_s"]:>10.3f} {ratio:>7.2f}{flag}')
+        if flag:
+            regressions.append((row['case'], row['size'], ratio))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Offline benchmarks of the scrape, ingest, join and plotting paths, '
+                                                 'compared against a stored baseline.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000],
+                        help='Rows in the synthetic flights tables.')
+    parser.add_argument('--repeats', type=int, default=3, help='Timed runs of each case (after one warm-up run).')
+    parser.add_argument('--workers', type=int, default=_shards.N_PROCESSES, help='Concurrent county scrapes.')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='How much slower than the baseline (as a fraction) a case may be before it regresses.')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='The stored baseline (JSON).')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline.')
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.repeats, args.workers)
+    if args.save_baseline or not os.path.exists(args.baseline):
+        save_baseline(results, args.baseline)
+    elif compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+# EOF
+
+# EOF
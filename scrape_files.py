@@ -6,21 +6,14 @@
 # @Last modified time: 05-May-2021 00:05:29:298  GMT-0600
 # @License: MIT License
 
-import ast
+import argparse
+import os
 
-import numpy as np
-import pandas as pd
+import _references._metrics as _metrics
 
-if __name__ == '__main__':
-    import matplotlib
-    # matplotlib.use('Qt5Agg')
-    import matplotlib.pyplot as plt
-    import _references._accessories as _accessories
-    import seaborn as sns
-
-from selenium.webdriver.chrome.options import Options
-
-_accessories._print('Dependencies imported.')
+# NOTE: Every other dependency is imported by the command that needs it (selenium only by the selenium backend,
+#       tifffile/scikit-image only by the mosaic, ...), so importing this module or running a data-only command is
+#       quick. Run `python scrape_files.py --help` for the commands.
 
 _ = """
 #######################################################################################################################
@@ -39,8 +32,51 @@ _ = """
 """
 # This is the URL where the data is located
 URL_all_counties = 'https://www.library.ucsb.edu/geospatial/airphotos/california-aerial-photography-county'
-
-_accessories._print('Hyperparameters defined.')
+# UCSB's catalog of each state, as its all-counties page; a state added here is scraped (alone) on the next `scrape`
+STATES = {'california': URL_all_counties}
+# Number of processes scraping counties at once, and how many may hit the same host concurrently
+N_WORKERS = 4
+PER_HOST_LIMIT = 2
+# "http" fetches pages over pooled keep-alive sessions (no browser); "selenium" drives headless Chrome instead
+BACKEND = 'http'
+# Every county is checkpointed here as soon as it's scraped; reruns only re-parse counties whose pages changed
+CHECKPOINT_DIR = 'Data/checkpoints/surface_level/'
+# Every (state, county) is written to its own shard here; `scrape` compacts them into `SURFACE_LEVEL_PATH`
+SHARD_DIR = 'Data/surface_level/'
+# Whether to download the scans of the selected frames (statewide, this is hundreds of GB), and to where
+DOWNLOAD_SCANS = False
+SCAN_DIR = 'Data/scans/'
+# Fetched pages and scans are cached here (content-addressed, LRU-evicted beyond the budget in bytes)
+CACHE_DIR = 'Data/cache/'
+CACHE_BUDGET = 20 * 1024 ** 3
+# The spatial index over frame centroids is persisted here (and only rebuilt if the flights table changes)
+FRAME_INDEX_PATH = 'Data/index/frame_centroids.npz'
+# Approximate extent of the Jasper Ridge Biological Preserve as (min_long, min_lat, max_long, max_lat)
+JASPER_RIDGE_BBOX = (-122.26, 37.39, -122.19, 37.42)
+# Keypoints of every scan are cached here; the stitched Jasper Ridge mosaic is written here (also as a tiled TIFF)
+KEYPOINT_DIR = 'Data/keypoints/'
+MOSAIC_PATH = 'Data/mosaics/jasper_ridge.npy'
+# If set, only the finest-scale frames nearest this year are stitched at each spot of Jasper Ridge (else every frame)
+MOSAIC_YEAR = None
+# Coverage of Jasper Ridge is reported for every period of this many years from the first to the last year
+COVERAGE_YEARS = (1920, 2030)
+COVERAGE_STEP = 10
+# Slippy-map tiles of every frame are rendered here
+FLIGHT_TILE_DIR = 'Images/tiles/flight_paths/'
+# Time, memory and call counts of every section below (and of each url/file within it) are reported here per run
+METRICS_DIR = 'Data/metrics/'
+# The flights table (not checked in) and its typed copy, written by `ingest` and read by every other command
+FLIGHTS_PATH = 'Data/All_Flights_Merge.csv'
+FLIGHTS_TYPED_PATH = 'Data/All_Flights_Merge.parquet'
+# Frames within this (min_long, min_lat, max_long, max_lat) are plotted and have their scans downloaded
+CALIFORNIA_BBOX = (-float('inf'), -float('inf'), -114, 42.5)
+# The scraped surface-level data (converted from the legacy CSV of earlier scrapes if it's missing), and the frames
+# joined with it
+SURFACE_LEVEL_PATH = 'Data/surface_level.parquet'
+LEGACY_SURFACE_LEVEL_PATH = 'Data/surface_level.csv'
+MERGED_PATH = 'Data/merged.parquet'
+# Frame-level records of every flight's index page are appended here (in Parquet parts) as they're scraped
+FRAME_STORE_DIR = 'Data/frames/'
 
 _ = """
 #######################################################################################################################
@@ -48,116 +84,185 @@ _ = """
 #######################################################################################################################
 """
 
-_accessories._print('Local functions defined.')
+
+def content_cache():
+    """The on-disk content cache, shared by the scan downloads and the scrapes."""
+    import _references._cache as _cache
+
+    return _cache.ContentCache(CACHE_DIR, max_bytes=CACHE_BUDGET)
+
+
+def load_flights():
+    """The typed flights table (re-ingested first if the CSV is newer, or it was never ingested; without the CSV, the
+    typed copy is served as is)."""
+    import _references._accessories as _accessories
+
+    if not os.path.exists(FLIGHTS_TYPED_PATH) or (os.path.exists(FLIGHTS_PATH) and
+                                                  os.path.getmtime(FLIGHTS_TYPED_PATH) < os.path.getmtime(FLIGHTS_PATH)):
+        return ingest()
+    return _accessories.retrieve_local_data_file(FLIGHTS_TYPED_PATH)
+
+
+def load_surface_level():
+    """The typed surface-level data (converted once from the legacy CSV if it was never scraped into Parquet)."""
+    import _references._accessories as _accessories
+    import _references._scrape_engine as _scrape_engine
+
+    if not os.path.exists(SURFACE_LEVEL_PATH) and os.path.exists(LEGACY_SURFACE_LEVEL_PATH):
+        _accessories._print(f'Converting "{LEGACY_SURFACE_LEVEL_PATH}" to "{SURFACE_LEVEL_PATH}"...', color='GREEN')
+        return _scrape_engine.convert_surface_level_csv(LEGACY_SURFACE_LEVEL_PATH, SURFACE_LEVEL_PATH)
+    return _accessories.retrieve_local_data_file(SURFACE_LEVEL_PATH)
+
+
+def frame_index(raw_df):
+    """The spatial index over the frame centroids of `raw_df` (loaded from disk unless the flights changed)."""
+    import _references._spatial as _spatial
+
+    return _spatial.load_or_build(FRAME_INDEX_PATH, raw_df['long'], raw_df['lat'])
+
+
+def california_frames(raw_df):
+    """The frames within `CALIFORNIA_BBOX`, with the scaled year delta of each."""
+    import _references._ingest as _ingest
+
+    _temp = raw_df.iloc[frame_index(raw_df).bbox(*CALIFORNIA_BBOX)].reset_index(drop=True)
+    _temp['date_delta'] = _ingest.scaled_delta(_ingest.year_delta(_temp['date']))
+    return _temp
+
 
 _ = """
 #######################################################################################################################
 ###############################################  CENTROID LOCATIONS   #################################################
 #######################################################################################################################
 """
-# tiles_df = pd.read_csv('Data/All_Flights_Merge_4tiles.csv').infer_objects()
-# tiles_df.columns = ['long', 'lat', 'FID_delete', 'object_id', 'held_delete', 'flight_id', 'date',
-#                     'frame', 'scale', 'latlong_delete', 'scan', 'roll_delete', 'nitrate_delete',
-#                     'cut_frame_delete', 'print_delete']
-# tiles_df = tiles_df[[c for c in tiles_df.columns if '_delete' not in c]]
-# tiles_df['scan'] = tiles_df['scan'].str.extract('(http:\S+.tif)')
-# tiles_df['date'] = pd.to_datetime(tiles_df['date'])
-
-raw_df = pd.read_csv('Data/All_Flights_Merge.csv').infer_objects()
-raw_df.columns = ['long', 'lat', 'FID_delete', 'object_id', 'held_delete', 'flight_id', 'date',
-                  'frame', 'scale', 'latlong_delete', 'scan', 'roll_delete', 'nitrate_delete',
-                  'cut_frame_delete', 'print_delete']
-raw_df = raw_df[[c for c in raw_df.columns if '_delete' not in c]]
-raw_df['scan'] = raw_df['scan'].str.extract('(http:\S+.tif)')
-raw_df['date'] = pd.to_datetime(raw_df['date'])
-
-_temp = raw_df[(raw_df['long'] < -114) & (raw_df['lat'] < 42.5)].reset_index(drop=True)
-_temp['date_delta'] = _temp['date'].apply(lambda x: x.date().year) - min(_temp['date']).date().year
-_temp['date_delta'] = _temp['date_delta']**40 / max(_temp['date_delta']**40) * 100000
-
-# Latitude VS. Longitude for Different Flight Paths
-plt.figure(figsize=(40, 40))
-figure = sns.scatterplot(data=_temp, x='long', y='lat', hue='flight_id', legend=False, size='date_delta')
-figure.set_title('Latitude VS. Longitude for Selective Flight Paths')
-figure.get_figure().savefig('Images/trimmed_flight_paths_cali.png', dpi=178, bbox_inches='tight', facecolor='white')
+
+
+def ingest(flights_path: str = FLIGHTS_PATH):
+    """Read and clean the flights table, index its frame centroids and save it typed (for the other commands)."""
+    import _references._accessories as _accessories
+    import _references._ingest as _ingest
+
+    # tiles_df = pd.read_csv('Data/All_Flights_Merge_4tiles.csv').infer_objects()
+    # tiles_df.columns = ['long', 'lat', 'FID_delete', 'object_id', 'held_delete', 'flight_id', 'date',
+    #                     'frame', 'scale', 'latlong_delete', 'scan', 'roll_delete', 'nitrate_delete',
+    #                     'cut_frame_delete', 'print_delete']
+    # tiles_df = tiles_df[[c for c in tiles_df.columns if '_delete' not in c]]
+    # tiles_df['scan'] = tiles_df['scan'].str.extract('(http:\S+.tif)')
+    # tiles_df['date'] = pd.to_datetime(tiles_df['date'])
+
+    # Only the kept columns are parsed (explicit dtypes, categorical `flight_id`); pass `chunksize` to stream the file
+    raw_df = _ingest.read_flights(flights_path)
+    frame_index(raw_df)
+    _accessories.save_local_data_file(raw_df, FLIGHTS_TYPED_PATH)
+    return raw_df
+
+
+def plot(raw_df=None) -> None:
+    """Render the flight paths within California, and the zoomable statewide density tiles."""
+    import _references._plotting as _plotting
+
+    raw_df = load_flights() if raw_df is None else raw_df
+
+    # Latitude VS. Longitude for Different Flight Paths
+    # Rasterized by aggregation (each flight's path, coloured by flight) on a fixed-size canvas, not a marker per frame;
+    # the scaled year delta, once the marker size, sets each frame's opacity instead (no frame is hidden)
+    _plotting.render(california_frames(raw_df), 'Images/trimmed_flight_paths_cali.png', mode='segments',
+                     color_by='flight_id', weight_by='date_delta')
+    # Zoomable statewide density (XYZ tiles; e.g. "file:///.../Images/tiles/flight_paths/{z}/{x}/{y}.png" in QGIS)
+    _plotting.render_tiles(raw_df, FLIGHT_TILE_DIR, mode='density')
+
+
+_ = """
+#######################################################################################################################
+##################################################   SCAN DOWNLOADS   #################################################
+#######################################################################################################################
+"""
+
+
+def download(raw_df=None, scan_dir: str = SCAN_DIR):
+    """Download the scans of every frame within California (resumable)."""
+    import _references._accessories as _accessories
+    import _references._download as _download
+
+    raw_df = load_flights() if raw_df is None else raw_df
+
+    # Resumable: scans already recorded in the manifest are skipped and partial downloads are continued
+    # NOTE: UCSB publishes no checksums, so scans are only verified to be complete TIFFs (size and magic number)
+    download_report = _download.download_scans(california_frames(raw_df)['scan'], directory=scan_dir,
+                                               cache=content_cache())
+    _accessories._print(download_report['status'].value_counts(), color='CYAN')
+    return download_report
 
 
 _ = """
 #######################################################################################################################
-#################################################  SCRAPING SETUP   ###################################################
+############################################   GEOREFERENCING AND MOSAIC   ############################################
 #######################################################################################################################
 """
-chrome_options = Options()
-chrome_options.add_argument("--start-maximized")
-# chrome_options.add_argument("--kiosk")
-driver = _accessories.init_driver(chrome_options)
 
-_accessories._print('Setup complete.')
+
+def mosaic(raw_df=None, scan_dir: str = SCAN_DIR):
+    """Georeference the downloaded Jasper Ridge scans, stitch them and build the overviews of every scan and mosaic."""
+    import _references._accessories as _accessories
+    import _references._coverage as _coverage
+    import _references._download as _download
+    import _references._georeference as _georeference
+    import _references._mosaic as _mosaic
+    import _references._pyramid as _pyramid
+
+    raw_df = load_flights() if raw_df is None else raw_df
+    if MOSAIC_YEAR is None:
+        jasper_ridge_frames = raw_df.iloc[frame_index(raw_df).bbox(*JASPER_RIDGE_BBOX)]
+    else:
+        jasper_ridge_frames = raw_df.iloc[_coverage.SpaceTimeIndex.from_frames(raw_df).best_frames(JASPER_RIDGE_BBOX,
+                                                                                                   MOSAIC_YEAR)]
+
+    # Only neighbouring frames (by centroid and scale) are matched; keypoints are extracted once per scan
+    jasper_ridge_scans = [_download.scan_path(url, scan_dir) if isinstance(url, str) else None
+                          for url in jasper_ridge_frames['scan']]
+    georeferenced_frames, frame_pairs = _georeference.georeference(
+        jasper_ridge_frames, jasper_ridge_scans, cache=_georeference.KeypointCache(KEYPOINT_DIR))
+    georeferenced_frames, mosaic_shape = _mosaic.fit_to_origin(georeferenced_frames)
+    _mosaic.stitch(georeferenced_frames, MOSAIC_PATH, shape=mosaic_shape)
+    mosaic_tiff = _mosaic.to_tiled_tiff(MOSAIC_PATH, MOSAIC_PATH.replace('.npy', '.tif'))
+
+    # Overviews (".ovr", read by QGIS) and thumbnails, so scans and the mosaic can be checked without decoding them;
+    # the mosaic's are streamed from its memory-mapped ".npy" rather than decoded from the tiled ".tif"
+    pyramid_report = _pyramid.build_pyramids(jasper_ridge_scans + [mosaic_tiff], sources={mosaic_tiff: MOSAIC_PATH})
+    _accessories._print(pyramid_report['status'].value_counts(), color='CYAN')
+    return pyramid_report
+
 
 _ = """
 #######################################################################################################################
 #################################################   INITIAL SCRAPE   ##################################################
 #######################################################################################################################
 """
-_accessories.load(driver, URL_all_counties, val_xpath='//*[@id="content"]/article/div/h3')
-
-counties_obj = driver.find_element_by_xpath('//*[@id="content"]/article/div/ul').find_elements_by_tag_name('li')
-county_names = {elem.find_element_by_tag_name('a').text: elem.find_element_by_tag_name('a').get_attribute('href')
-                for elem in counties_obj}
-
-all_data = []
-for county, county_url in county_names.items():
-    try:
-        # Open a new, temporary tab and load the respective url for the current county
-        _accessories._print(f'Processing "{county}" at "{county_url}"...', color='GREEN')
-        _accessories.open_tab(driver)
-        _accessories.load(driver, county_url, val_xpath=None)
-
-        # Get the specified table on the page
-        # NOTE: Exceptions are specifically caught here since the UCSB website sometimes timesout.
-        #       This may be due to multiple requests or bad internet connection. The page is refreshed to hopefully
-        #       fix this issue. If this error still persists, scraping will stop as an Exception will be raised.
-        try:
-            table = pd.read_html(driver.find_element_by_xpath(
-                '/html/body/div[5]/table').get_attribute('outerHTML'))[0]
-        except Exception:
-            _accessories._print('The page was not read properly the first time, refreshing...', color='LIGHTRED_EX')
-            driver.refresh()
-            table = pd.read_html(driver.find_element_by_xpath(
-                '/html/body/div[5]/table').get_attribute('outerHTML'))[0]
-
-        # Minor data cleaning
-        table.drop([0, 1], axis=0, inplace=True)
-        table.columns = ['date', 'flight_id', 'scale', 'index_url', 'frame_status']
-        table['date'] = pd.to_datetime(table['date'], errors='coerce')
-
-        # Feature addition/formatting
-        table['index_url'] = table['flight_id'].apply(lambda x:
-                                                      'http://mil.library.ucsb.edu/ap_indexes/' +
-                                                      x.replace('-', '').lower())
-        table['scale'] = [[v.replace(',', '') for v in found if v != '']
-                          for found in table['scale'].str.split('1:').replace(np.nan, '')]
-        table['reference_image_url'] = driver.find_element_by_xpath(
-            '/html/body/div[4]/table/tbody/tr/td[2]/img').get_attribute('src')
-        table['county_name'] = county
-        table['county_url'] = county_url
-
-        # Store the data in each run
-        all_data.append(table)
-        _accessories.close_tab(driver)
-    except Exception as e:
-        # If something ever goes wrong (except the read_html part), then skips and keep going...
-        _accessories._print(f'Something went wrong! {e[:100]}\n Proceeding...', color='LIGHTRED_EX')
-
-# Concatenate all the data and save it
-surface_level_data = pd.concat(all_data).reset_index(drop=True).infer_objects()
-_accessories.auto_make_path('Data/')
-_accessories.save_local_data_file(surface_level_data, 'Data/surface_level.csv')
-
-_accessories._print('Scraped county surface-level data and saved to file.')
-
-surface_level_data = _accessories.retrieve_local_data_file('Data/surface_level.csv')
-surface_level_data['scale'] = [ast.literal_eval(val) for val in surface_level_data['scale']]
+
+
+def scrape(backend: str = BACKEND, n_workers: int = N_WORKERS, states=None, refresh: bool = False):
+    """Scrape the surface-level data of every county of `STATES` (one shard each) and save it compacted."""
+    import _references._accessories as _accessories
+    import _references._shards as _shards
+
+    states = list(STATES) if states is None else states
+    cache = content_cache()
+    # Counties are sharded across processes; states and counties already in `SHARD_DIR` are skipped unless `refresh`
+    shard_report = _shards.scrape_states({state: STATES[state] for state in states}, backend=backend,
+                                         directory=SHARD_DIR, refresh=refresh, n_processes=n_workers,
+                                         per_host=PER_HOST_LIMIT, checkpoint_dir=CHECKPOINT_DIR, cache=cache)
+    _accessories._print(shard_report.groupby('state')['status'].value_counts().unstack(fill_value=0), color='CYAN')
+
+    # Save the compacted data of every listed county, typed (int scales, tz-aware dates, categoricals)
+    surface_level_data = _shards.compact(SHARD_DIR)
+    _accessories.save_local_data_file(surface_level_data, SURFACE_LEVEL_PATH)
+
+    _accessories._print('Scraped county surface-level data and saved to file.')
+    # Including the requests of every worker process (merged in by `scrape_states`)
+    _accessories._print(_accessories.LATENCY_STATS.summary(), color='CYAN')
+    _accessories._print(f'Cache: {cache.stats()}', color='CYAN')
+    return surface_level_data
+
 
 _ = """
 #######################################################################################################################
@@ -165,25 +270,118 @@ _ = """
 #######################################################################################################################
 """
 
+
+def deep_scrape(n_workers: int = N_WORKERS * 2):
+    """Scrape the index page of every flight (once, however many counties list it) into the frame store."""
+    import _references._accessories as _accessories
+    import _references._deep_scrape as _deep_scrape
+
+    surface_level_data = load_surface_level()
+
+    # Pages already in the store are skipped; records are written out in parts as they arrive, not held in a list
+    index_report = _deep_scrape.crawl_index_pages(surface_level_data, store=_deep_scrape.FrameStore(FRAME_STORE_DIR),
+                                                  n_workers=n_workers, per_host=PER_HOST_LIMIT, cache=content_cache())
+    _accessories._print(index_report['status'].value_counts(), color='CYAN')
+    return index_report
+
+
 _ = """
 #######################################################################################################################
 #######################################   MERGED SCRAPED AND DOWNLOADED DATA   ########################################
 #######################################################################################################################
 """
 
-surface_level_data['scale'] = surface_level_data['scale'].apply(lambda x: x[0] if len(x) == 1 else x)
-surface_level_data = surface_level_data[surface_level_data['scale'].apply(lambda x: str(x).isdigit())].infer_objects()
-surface_level_data['date'] = pd.to_datetime(surface_level_data['date'], errors='coerce', utc=True)
-surface_level_data['flight_id'] = surface_level_data['flight_id'].str.replace('-', '_')
 
-raw_df.dtypes
-surface_level_data.dtypes
+def join(raw_df=None):
+    """Join every frame with the surface-level data of its flight, and save the result."""
+    import _references._accessories as _accessories
+    import _references._catalog_join as _catalog_join
 
-set([c for c in raw_df['flight_id'].values if 'C_10800X' in c])
+    raw_df = load_flights() if raw_df is None else raw_df
+    surface_level_data = load_surface_level()
 
-pd.merge(raw_df, surface_level_data, how='inner', on=['flight_id'])
+    # Only single-scale flights (`scale` is <NA> for multi-scale ones; every scale is still in `scales`)
+    surface_level_data = surface_level_data[surface_level_data['scale'].notna()]
 
-driver.quit()
+    # Both flight id columns are normalized once into a shared categorical key (e.g. "C-10800X" -> "C_10800X")
+    catalog_join = _catalog_join.CatalogJoin(raw_df, surface_level_data)
+    # `catalog_join.near_misses()` suggests the closest id on the other side of each of these
+    unmatched = catalog_join.unmatched()
+    _accessories._print(f'{len(unmatched)} flight ids are on only one side of the join.', color='CYAN')
+
+    merged_df = catalog_join.join()
+    _accessories.save_local_data_file(merged_df, MERGED_PATH)
+    return merged_df
+
+
+def coverage(raw_df=None):
+    """Report how much of Jasper Ridge the frames of each period cover (and where the gaps are)."""
+    import _references._accessories as _accessories
+    import _references._coverage as _coverage
+
+    raw_df = load_flights() if raw_df is None else raw_df
+    # Frames are sorted once by (grid cell, date), so each period is a binary search rather than a filter of the table
+    coverage_report = _coverage.SpaceTimeIndex.from_frames(raw_df).coverage_gaps(JASPER_RIDGE_BBOX, *COVERAGE_YEARS,
+                                                                                 step=COVERAGE_STEP)
+    _accessories._print(coverage_report.drop(columns='gaps'), color='CYAN')
+    return coverage_report
+
+
+_ = """
+#######################################################################################################################
+##################################################   COMMAND LINE   ###################################################
+#######################################################################################################################
+"""
+
+# Command name -> what it runs, in the order `all` runs them (the scans are only downloaded if `DOWNLOAD_SCANS`)
+COMMANDS = {'ingest': ingest, 'plot': plot, 'download': download, 'mosaic': mosaic, 'scrape': scrape,
+            'deep-scrape': deep_scrape, 'join': join, 'coverage': coverage}
+
+
+def run(commands, **kwargs) -> None:
+    """Run `commands` in order (each as a stage of the run's metrics), then save the metrics report."""
+    import _references._accessories as _accessories
+
+    for command in commands:
+        _metrics.begin(command)
+        COMMANDS[command](**kwargs)
+    _metrics.end()
+    _accessories._print(_metrics.METRICS.summary(), color='CYAN')
+    _accessories._print(f'Metrics saved to "{_metrics.METRICS.save(METRICS_DIR)}".')
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Scrape the UCSB aerial photography catalog, and ingest, plot, join '
+                                                 'and download (and stitch) its frames.')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.add_parser('all', help='Every command below, in order.')
+    for name, fn in COMMANDS.items():
+        command = commands.add_parser(name, help=fn.__doc__.splitlines()[0])
+        if name == 'ingest':
+            command.add_argument('--flights', dest='flights_path', default=FLIGHTS_PATH, help='The flights CSV.')
+        elif name in ('download', 'mosaic'):
+            command.add_argument('--scan-dir', default=SCAN_DIR, help='Where the scans are (to be) downloaded.')
+        elif name == 'scrape':
+            command.add_argument('--backend', choices=['http', 'selenium'], default=BACKEND)
+            command.add_argument('--workers', dest='n_workers', type=int, default=N_WORKERS,
+                                 help='Counties scraped at once (each in its own process).')
+            command.add_argument('--states', nargs='+', choices=list(STATES), help='Only these states.')
+            command.add_argument('--refresh', action='store_true',
+                                 help='Re-scrape states and counties that were already scraped.')
+        elif name == 'deep-scrape':
+            command.add_argument('--workers', dest='n_workers', type=int, default=N_WORKERS * 2,
+                                 help='Index pages scraped at once.')
+    args = vars(parser.parse_args(argv))
+
+    command = args.pop('command') or 'all'
+    if command == 'all':
+        run([name for name in COMMANDS if DOWNLOAD_SCANS or name not in ('download', 'mosaic')])
+    else:
+        run([command], **args)
+
+
+if __name__ == '__main__':
+    main()
 
 # EOF
 
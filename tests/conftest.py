@@ -0,0 +1,48 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 01:10:14:140  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: conftest.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 01:10:14:140  GMT-0600
+# @License: [Private IP]
+
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import _references._metrics as _metrics  # noqa: E402
+import _references._fixture_server as _fixture_server  # noqa: E402
+
+# Saved pages (in the UCSB layout) served by `fixture_site`
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Tests run quietly; failures still show the records in the metrics report
+_metrics.ECHO = False
+
+
+@pytest.fixture
+def fixture_site(tmp_path):
+    """A copy of the fixture pages, served on localhost (tests may add or change pages in `server.directory`)."""
+    directory = tmp_path / 'site'
+    shutil.copytree(FIXTURE_DIR, directory)
+    with _fixture_server.FixtureServer(str(directory)) as server:
+        server.directory = directory
+        yield server
+
+
+@pytest.fixture
+def scan_server(tmp_path):
+    """An empty directory of "scans", served on localhost with support for resumed (ranged) requests."""
+    directory = tmp_path / 'served'
+    directory.mkdir()
+    with _fixture_server.FixtureServer(str(directory), handler=_fixture_server.RangeHandler) as server:
+        server.directory = directory
+        yield server
+
+
+# EOF
+
+# EOF
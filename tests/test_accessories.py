@@ -0,0 +1,96 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 02:10:03:030  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_accessories.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 02:10:03:030  GMT-0600
+# @License: [Private IP]
+
+import os
+
+import pandas as pd
+import pytest
+import requests
+
+import _references._accessories as _accessories
+
+URL = 'http://catalog.test/page'
+
+
+def http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f'{status} error', response=response)
+
+
+def failing(error: BaseException, calls: list):
+    def fn():
+        calls.append(1)
+        raise error
+    return fn
+
+
+@pytest.fixture
+def policy():
+    return _accessories.RetryPolicy(max_attempts=3, base=0, cap=0)
+
+
+@pytest.mark.parametrize('status', [400, 403, 404, 410])
+def test_client_errors_are_not_retried(policy, status):
+    breaker, calls = _accessories.CircuitBreaker(threshold=1), []
+    with pytest.raises(requests.HTTPError):
+        _accessories.retry_call(failing(http_error(status), calls), URL, policy=policy, breaker=breaker,
+                                stats=_accessories.LatencyStats(), retry_on=_accessories.RETRYABLE_HTTP_ERRORS)
+    assert len(calls) == 1
+    # Not a failure of the host, so its circuit stays closed
+    assert breaker.allow(URL)
+
+
+@pytest.mark.parametrize('error', [http_error(503), http_error(429), requests.ConnectionError('refused'),
+                                   requests.Timeout('timed out')])
+def test_transient_errors_are_retried(policy, error):
+    breaker, calls = _accessories.CircuitBreaker(threshold=10), []
+    with pytest.raises(type(error)):
+        _accessories.retry_call(failing(error, calls), URL, policy=policy, breaker=breaker,
+                                stats=_accessories.LatencyStats(), retry_on=_accessories.RETRYABLE_HTTP_ERRORS)
+    assert len(calls) == policy.max_attempts
+
+
+def test_server_errors_open_the_circuit(policy):
+    breaker = _accessories.CircuitBreaker(threshold=policy.max_attempts, cooldown=60)
+    with pytest.raises(requests.HTTPError):
+        _accessories.retry_call(failing(http_error(500), []), URL, policy=policy, breaker=breaker,
+                                stats=_accessories.LatencyStats(), retry_on=_accessories.RETRYABLE_HTTP_ERRORS)
+    with pytest.raises(_accessories.CircuitOpenError):
+        _accessories.retry_call(lambda: 'ok', URL, policy=policy, breaker=breaker, stats=_accessories.LatencyStats())
+
+
+def test_parquet_round_trip(tmp_path):
+    data = pd.DataFrame({'flight_id': pd.Categorical(['C-5750', 'HM-2002-USA', 'C-5750']),
+                         'date': pd.to_datetime(['1939-06-02', '2002-01-01', None], utc=True),
+                         'scale': pd.array([20000, None, 40000], dtype='Int64'),
+                         'scales': [[20000], [], [20000, 40000]]})
+    path = str(tmp_path / 'data' / 'typed.parquet')
+    _accessories.save_local_data_file(data, path)
+    # Written through a temporary file, which doesn't outlive the write
+    assert os.listdir(tmp_path / 'data') == ['typed.parquet']
+
+    loaded = _accessories.retrieve_local_data_file(path)
+    pd.testing.assert_frame_equal(loaded.drop(columns='scales'), data.drop(columns='scales'))
+    assert [list(scales) for scales in loaded['scales']] == [[20000], [], [20000, 40000]]
+    assert list(_accessories.retrieve_local_data_file(path, columns=['scale']).columns) == ['scale']
+
+
+def test_failed_parquet_write_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / 'typed.parquet')
+    _accessories.save_local_data_file(pd.DataFrame({'scale': [33600]}), path)
+    # Mixed types can't be written as a single Parquet column
+    with pytest.raises(Exception):
+        _accessories.save_local_data_file(pd.DataFrame({'scale': [33600, 'n/a']}), path)
+    assert os.listdir(tmp_path) == ['typed.parquet']
+    assert list(_accessories.retrieve_local_data_file(path)['scale']) == [33600]
+
+
+# EOF
+
+# EOF
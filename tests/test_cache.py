@@ -0,0 +1,65 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 05:10:21:210  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_cache.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 05:10:21:210  GMT-0600
+# @License: [Private IP]
+
+import os
+
+import pytest
+
+import _references._accessories as _accessories
+import _references._cache as _cache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = _cache.ContentCache(str(tmp_path / 'cache'), max_bytes=100)
+    yield cache
+    cache.close()
+
+
+def test_identical_content_shares_a_blob(cache):
+    first = cache.put('http://catalog.test/a', b'page', etag='"1"')
+    second = cache.put('http://catalog.test/b', b'page')
+    assert first['digest'] == second['digest'] and cache.size() == 4
+
+    assert cache.read(cache.lookup('http://catalog.test/b')) == b'page'
+    assert cache.lookup('http://catalog.test/a', etag='"1"')['key'] == first['key']
+    assert cache.lookup('http://catalog.test/a', etag='"2"') is None
+    assert cache.lookup('http://catalog.test/c') is None
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    old, new = cache.put('http://catalog.test/old', b'o' * 60), cache.put('http://catalog.test/new', b'n' * 30)
+    cache.hit(old)
+    # Over the budget: `new` was used least recently (`old` was just served)
+    cache.put('http://catalog.test/next', b'x' * 30)
+    assert cache.lookup('http://catalog.test/new') is None and not os.path.exists(cache.blob_path(new['digest']))
+    assert cache.lookup('http://catalog.test/old') is not None and cache.size() == 90
+
+
+def test_copy_to(cache, tmp_path):
+    entry = cache.put('http://catalog.test/scan.tif', b'II*\x00scan')
+    cache.copy_to(entry, str(tmp_path / 'scans' / 'scan.tif'))
+    assert (tmp_path / 'scans' / 'scan.tif').read_bytes() == b'II*\x00scan'
+
+
+@pytest.mark.parametrize('max_age', [60, None])
+def test_fetch_page_through_the_cache(fixture_site, tmp_path, max_age):
+    cache = _cache.ContentCache(str(tmp_path / 'cache'), max_age=max_age)
+    url = fixture_site.url + 'county_alameda.html'
+    with _accessories.init_session() as session:
+        fetched = _accessories.fetch_page(session, url, cache=cache)
+        # Served without a request while fresh, or revalidated (304) with the server's `Last-Modified` otherwise
+        cached = _accessories.fetch_page(session, url, cache=cache)
+    assert not fetched.from_cache and cached.from_cache and cached.content == fetched.content
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1 and cache.hit_rate() == 0.5
+    cache.close()
+
+
+# EOF
+
+# EOF
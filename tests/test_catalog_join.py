@@ -0,0 +1,74 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 05:10:42:420  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_catalog_join.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 05:10:42:420  GMT-0600
+# @License: [Private IP]
+
+import pandas as pd
+import pytest
+
+import _references._catalog_join as _catalog_join
+
+
+@pytest.fixture
+def frames():
+    return pd.DataFrame({'flight_id': pd.Categorical(['C_5750', 'HM_2002_USA', 'C_5750', 'C_10800X', None, 'GS_CP']),
+                         'frame': ['1', '1', '2', '7', '3', '4'], 'scale': [20000, 10800, 20000, 10800, 0, 24000]})
+
+
+@pytest.fixture
+def catalog():
+    return pd.DataFrame({'flight_id': ['C-5750', 'hm-2002-usa ', 'C-10800', 'C-5750', 'GS-CPA'],
+                         'county_name': ['Alameda', 'Alameda', 'Alpine', 'Alpine', 'Amador'],
+                         'scale': [20000, 10800, 10800, 20000, 24000]})
+
+
+def legacy_merge(frames, catalog):
+    catalog = catalog.assign(flight_id=catalog['flight_id'].str.strip().str.upper().str.replace('-', '_'))
+    return pd.merge(frames.astype({'flight_id': str}), catalog, how='inner', on='flight_id')
+
+
+def test_join_matches_merge(frames, catalog):
+    joined = _catalog_join.CatalogJoin(frames, catalog).join()
+    assert joined['flight_id'].dtype == 'category'
+    expected = legacy_merge(frames, catalog)
+    pd.testing.assert_frame_equal(joined.astype({'flight_id': str}), expected[list(joined.columns)])
+    assert list(joined.columns) == ['flight_id', 'frame', 'scale_x', 'county_name', 'scale_y']
+
+
+@pytest.mark.parametrize('chunksize', [1, 4, 100])
+def test_iter_join_chunks(frames, catalog, chunksize):
+    catalog_join = _catalog_join.CatalogJoin(frames, catalog)
+    chunks = list(catalog_join.iter_join(chunksize=chunksize))
+    assert all(len(chunk) <= 2 * chunksize for chunk in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), catalog_join.join())
+
+
+def test_empty_left_side(catalog):
+    joined = _catalog_join.CatalogJoin(pd.DataFrame({'flight_id': pd.Series([], dtype=str)}), catalog).join()
+    assert len(joined) == 0 and list(joined.columns) == ['flight_id', 'county_name', 'scale']
+
+
+def test_lookups(frames, catalog):
+    catalog_join = _catalog_join.CatalogJoin(frames, catalog)
+    assert list(catalog_join.lookup('c-5750')['county_name']) == ['Alameda', 'Alpine']
+    assert len(catalog_join.lookup('C-9999')) == 0 and catalog_join.code('C-9999') == -1
+    assert catalog_join.prefix('c-') == ['C_10800', 'C_10800X', 'C_5750']
+    assert catalog_join.contains('10800') == ['C_10800', 'C_10800X'] and catalog_join.contains('CP') == ['GS_CP',
+                                                                                                         'GS_CPA']
+
+
+def test_unmatched_and_near_misses(frames, catalog):
+    catalog_join = _catalog_join.CatalogJoin(frames, catalog)
+    unmatched = catalog_join.unmatched()
+    assert unmatched.values.tolist() == [['C_10800X', 'left', 1], ['GS_CP', 'left', 1], ['C_10800', 'right', 1],
+                                         ['GS_CPA', 'right', 1]]
+    near_misses = catalog_join.near_misses()
+    assert near_misses[['flight_id', 'suggestion']].values.tolist() == [['C_10800X', 'C_10800'], ['GS_CP', 'GS_CPA']]
+
+
+# EOF
+
+# EOF
@@ -0,0 +1,63 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 05:10:14:140  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_checkpoint.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 05:10:14:140  GMT-0600
+# @License: [Private IP]
+
+import os
+
+import pandas as pd
+import pytest
+
+import _references._checkpoint as _checkpoint
+
+URL = 'http://catalog.test/county.php?county_id=185'
+
+
+@pytest.fixture
+def table():
+    return pd.DataFrame({'flight_id': ['C-5750', 'HM-2002-USA'], 'scale': [['20000', '40000'], ['10800']]})
+
+
+def test_checkpoints_survive_a_restart(tmp_path, table):
+    store = _checkpoint.CheckpointStore(str(tmp_path))
+    assert URL not in store and store.validators(URL) == {}
+    digest = _checkpoint.content_hash(b'<html>Alameda</html>')
+    store.save(URL, table, etag='"abc"', last_modified='Wed, 06 Apr 2005 00:00:00 GMT', digest=digest,
+               county='Alameda')
+
+    # A new store (the next run) reads the index back
+    store = _checkpoint.CheckpointStore(str(tmp_path))
+    assert URL in store and len(store) == 1
+    pd.testing.assert_frame_equal(store.load(URL), table)
+    assert store.validators(URL) == {'If-None-Match': '"abc"', 'If-Modified-Since': 'Wed, 06 Apr 2005 00:00:00 GMT'}
+    assert store.is_unchanged(URL, digest)
+    assert not store.is_unchanged(URL, _checkpoint.content_hash(b'<html>Alpine</html>'))
+    # Only the table and the index; the temporary files of the atomic writes are gone
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_checkpoint_without_its_table(tmp_path, table):
+    store = _checkpoint.CheckpointStore(str(tmp_path))
+    store.save(URL, table, digest='digest')
+    os.remove(store._table_path(URL))
+    # Treated as never checkpointed, so the page is fetched unconditionally and parsed again
+    assert URL not in store and store.validators(URL) == {} and not store.is_unchanged(URL, 'digest')
+
+
+def test_move(tmp_path, table):
+    store, other = _checkpoint.CheckpointStore(str(tmp_path / 'a')), _checkpoint.CheckpointStore(str(tmp_path / 'b'))
+    store.save(URL, table, etag='"abc"', digest='digest')
+    store.move(URL, other)
+
+    assert URL not in store and URL not in _checkpoint.CheckpointStore(str(tmp_path / 'a'))
+    other = _checkpoint.CheckpointStore(str(tmp_path / 'b'))
+    assert other.is_unchanged(URL, 'digest') and other.validators(URL) == {'If-None-Match': '"abc"'}
+    pd.testing.assert_frame_equal(other.load(URL), table)
+
+
+# EOF
+
+# EOF
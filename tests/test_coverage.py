@@ -0,0 +1,96 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 06:10:19:190  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_coverage.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 06:10:19:190  GMT-0600
+# @License: [Private IP]
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import _references._coverage as _coverage
+import _references._spatial as _spatial
+
+JASPER_RIDGE_BBOX = (-122.26, 37.39, -122.19, 37.42)
+
+
+@pytest.fixture
+def frames():
+    rng = np.random.default_rng(0)
+    n = 2000
+    frames = pd.DataFrame({'long': rng.uniform(-122.5, -122, n), 'lat': rng.uniform(37.2, 37.6, n),
+                           'date': pd.to_datetime(rng.integers(1928, 2010, n).astype(str) + '-06-01'),
+                           'scale': rng.choice(['1:6,000', '1:12,000', '1:20,000', ''], n)})
+    frames.loc[::101, 'date'] = pd.NaT
+    frames.loc[::103, 'long'] = np.nan
+    return frames
+
+
+def footprints(frames):
+    """The (min_long, min_lat, max_long, max_lat) footprint of every frame, brute force."""
+    half_lat = np.nan_to_num(_spatial.footprint_km(_spatial.scale_denominators(frames['scale'])) / 2 /
+                             _spatial.KM_PER_DEGREE)
+    half_long = half_lat / np.cos(np.radians(frames['lat'].to_numpy()))
+    long, lat = frames['long'].to_numpy(), frames['lat'].to_numpy()
+    return long - half_long, lat - half_lat, long + half_long, lat + half_lat
+
+
+@pytest.mark.parametrize('years', [(None, None), (1940, 1950), (None, 1930), (2005, None)])
+def test_frames_match_brute_force(frames, years):
+    min_long, min_lat, max_long, max_lat = footprints(frames)
+    bbox = JASPER_RIDGE_BBOX
+    year = frames['date'].dt.year
+    expected = (max_long >= bbox[0]) & (min_long <= bbox[2]) & (max_lat >= bbox[1]) & (min_lat <= bbox[3]) & \
+        year.notna() & (year >= (years[0] or 0)) & (year < (years[1] or 9999))
+    index = _coverage.SpaceTimeIndex.from_frames(frames)
+    np.testing.assert_array_equal(index.frames(bbox, *years), np.flatnonzero(expected))
+
+
+def test_coverage_matches_brute_force(frames):
+    resolution, (start, end) = 0.005, (1940, 1960)
+    index = _coverage.SpaceTimeIndex.from_frames(frames)
+    hits = index.frames(JASPER_RIDGE_BBOX, start, end)
+    min_long, min_lat, max_long, max_lat = (side[hits] for side in footprints(frames))
+    long, lat = frames['long'].to_numpy()[hits], frames['lat'].to_numpy()[hits]
+
+    n_rows, n_cols = _coverage.raster_shape(JASPER_RIDGE_BBOX, resolution)
+    expected = np.zeros((n_rows, n_cols), dtype=bool)
+    for row in range(n_rows):
+        for col in range(n_cols):
+            cell_long, cell_lat = JASPER_RIDGE_BBOX[0] + col * resolution, JASPER_RIDGE_BBOX[1] + row * resolution
+            centre_long, centre_lat = cell_long + resolution / 2, cell_lat + resolution / 2
+            # A footprint covering the centre of the cell, or a centroid in the cell
+            expected[row, col] = (((min_long <= centre_long) & (centre_long <= max_long) & (min_lat <= centre_lat) &
+                                   (centre_lat <= max_lat)) |
+                                  ((np.floor((long - JASPER_RIDGE_BBOX[0]) / resolution) == col) &
+                                   (np.floor((lat - JASPER_RIDGE_BBOX[1]) / resolution) == row))).any()
+    np.testing.assert_array_equal(index.coverage(JASPER_RIDGE_BBOX, start, end, resolution=resolution), expected)
+
+    report = index.coverage_gaps(JASPER_RIDGE_BBOX, 1920, 2030, step=20, resolution=resolution)
+    assert list(report['start']) == [1920, 1940, 1960, 1980, 2000, 2020]
+    period = report.iloc[1]
+    assert period['frames'] == len(hits) and period['coverage'] == expected.mean()
+    assert period['gap_cells'] == (~expected).sum() == len(period['gaps'])
+    assert report.iloc[-1]['frames'] == 0 and report.iloc[-1]['coverage'] == 0
+
+
+def test_best_frames():
+    # Two flights over the same spot (one finer), and an older one next to it
+    frames = pd.DataFrame({'long': [-122.2, -122.2, -122.2, -122.3], 'lat': [37.4, 37.4, 37.4, 37.4],
+                           'date': pd.to_datetime(['1948-06-01', '1952-06-01', '1952-07-01', '1930-06-01']),
+                           'scale': ['1:20,000', '1:20,000', '1:12,000', '1:20,000']})
+    index = _coverage.SpaceTimeIndex.from_frames(frames)
+    bbox = (-122.35, 37.35, -122.15, 37.45)
+    # The earlier year on ties, and the finest scale of that year
+    assert list(index.best_frames(bbox, 1950)) == [0, 3]
+    # The coarser frame of 1952 still covers the cells around the finer one's (smaller) footprint
+    assert list(index.best_frames(bbox, 1952)) == [1, 2, 3]
+    assert list(index.best_frames(bbox, 1950, max_years=1)) == []
+    assert list(index.best_frames(bbox, 1931, max_years=1)) == [3]
+
+
+# EOF
+
+# EOF
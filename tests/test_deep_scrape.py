@@ -0,0 +1,39 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 03:10:51:510  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_deep_scrape.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 03:10:51:510  GMT-0600
+# @License: [Private IP]
+
+import os
+
+import pandas as pd
+
+import _references._deep_scrape as _deep_scrape
+
+
+def records(index_url: str, n: int) -> pd.DataFrame:
+    return pd.DataFrame({'flight_id': 'C-5750', 'index_url': index_url, 'frame': [str(i) for i in range(n)],
+                         'frame_number': range(n), 'kind': 'image', 'url': [f'{index_url}/{i}.tif' for i in range(n)],
+                         'label': None, 'fetched_at': pd.Timestamp.now(tz='UTC')}).astype(_deep_scrape.FRAME_COLUMNS)
+
+
+def test_new_parts_never_overwrite_existing_ones(tmp_path):
+    directory = str(tmp_path / 'frames')
+    with _deep_scrape.FrameStore(directory, flush_rows=1) as store:
+        for page in ('a', 'b', 'c'):
+            store.append(f'http://index/{page}', records(f'http://index/{page}', 2))
+    # A part removed from the middle leaves fewer parts than the highest number
+    os.remove(os.path.join(directory, 'part-000001.parquet'))
+
+    with _deep_scrape.FrameStore(directory, flush_rows=1) as store:
+        store.append('http://index/d', records('http://index/d', 3))
+    assert [os.path.basename(path) for path in store.parts()] == ['part-000000.parquet', 'part-000002.parquet',
+                                                                  'part-000003.parquet']
+    assert sorted(store.read()['index_url'].unique()) == ['http://index/a', 'http://index/c', 'http://index/d']
+
+
+# EOF
+
+# EOF
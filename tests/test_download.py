@@ -0,0 +1,137 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 02:10:41:410  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_download.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 02:10:41:410  GMT-0600
+# @License: [Private IP]
+
+import hashlib
+import os
+
+import numpy as np
+import pytest
+
+import _references._accessories as _accessories
+import _references._download as _download
+import _references._fixture_server as _fixture_server
+
+
+def synthetic_tiff(path, seed: int = 0, size: int = 200_000) -> bytes:
+    """A file with a TIFF header followed by random bytes (enough for the downloader, which only checks the magic)."""
+    content = b'II*\x00' + np.random.default_rng(seed).bytes(size)
+    path.write_bytes(content)
+    return content
+
+
+@pytest.fixture
+def session():
+    with _accessories.init_session() as session:
+        yield session
+
+
+def test_download_scan(scan_server, session, tmp_path):
+    content = synthetic_tiff(scan_server.directory / 'c-10800_1-12.tif')
+    path = str(tmp_path / 'scan.tif')
+    result = _download.download_scan(session, scan_server.url + 'c-10800_1-12.tif', path)
+    assert result == {'path': path, 'size': len(content), 'sha256': hashlib.sha256(content).hexdigest()}
+    assert open(path, 'rb').read() == content and not os.path.exists(path + '.part')
+
+
+def test_download_scan_resumes_partial_file(scan_server, session, tmp_path):
+    content = synthetic_tiff(scan_server.directory / 'scan.tif')
+    path = str(tmp_path / 'scan.tif')
+    (tmp_path / 'scan.tif.part').write_bytes(content[:70_001])
+    result = _download.download_scan(session, scan_server.url + 'scan.tif', path, chunk_size=4096)
+    assert result['sha256'] == hashlib.sha256(content).hexdigest()
+    assert open(path, 'rb').read() == content
+
+
+def test_download_scan_completes_already_complete_part(scan_server, session, tmp_path):
+    # The server answers "416 Range Not Satisfiable" for a range starting at the end of the file
+    content = synthetic_tiff(scan_server.directory / 'scan.tif')
+    path = str(tmp_path / 'scan.tif')
+    (tmp_path / 'scan.tif.part').write_bytes(content)
+    result = _download.download_scan(session, scan_server.url + 'scan.tif', path,
+                                     expected_sha256=hashlib.sha256(content).hexdigest())
+    assert result['size'] == len(content) and open(path, 'rb').read() == content
+
+
+def test_download_scan_rejects_wrong_content_range(tmp_path, session):
+    class ShiftedRangeHandler(_fixture_server.RangeHandler):
+        range_shift = 1
+
+    (tmp_path / 'served').mkdir()
+    content = synthetic_tiff(tmp_path / 'served' / 'scan.tif')
+    path = str(tmp_path / 'scan.tif')
+    (tmp_path / 'scan.tif.part').write_bytes(content[:1000])
+    with _fixture_server.FixtureServer(str(tmp_path / 'served'), handler=ShiftedRangeHandler) as server:
+        with pytest.raises(_download.IncompleteDownloadError):
+            _download.download_scan(session, server.url + 'scan.tif', path)
+    # The partial file can't be trusted any more, so the next attempt starts over
+    assert not os.path.exists(path + '.part') and not os.path.exists(path)
+
+
+def test_download_scan_rejects_non_tiff(scan_server, session, tmp_path):
+    (scan_server.directory / 'scan.tif').write_bytes(b'<html>Not found</html>')
+    path = str(tmp_path / 'scan.tif')
+    with pytest.raises(_download.ChecksumError, match='not a TIFF'):
+        _download.download_scan(session, scan_server.url + 'scan.tif', path)
+    assert not os.path.exists(path) and not os.path.exists(path + '.part')
+
+
+def test_download_scan_rejects_checksum_mismatch(scan_server, session, tmp_path):
+    synthetic_tiff(scan_server.directory / 'scan.tif')
+    path = str(tmp_path / 'scan.tif')
+    with pytest.raises(_download.ChecksumError, match='does not match'):
+        _download.download_scan(session, scan_server.url + 'scan.tif', path, expected_sha256='0' * 64)
+    assert not os.path.exists(path) and not os.path.exists(path + '.part')
+
+
+def test_scan_path_keeps_same_named_scans_apart(tmp_path):
+    first = _download.scan_path('http://mil.library.ucsb.edu/ap_images/c-1/1-12.tif', str(tmp_path))
+    second = _download.scan_path('http://mil.library.ucsb.edu/ap_images/c-2/1-12.tif', str(tmp_path))
+    assert first != second and first.endswith('.tif') and os.path.basename(first).startswith('1-12_')
+
+
+def test_download_scans(scan_server, tmp_path):
+    contents = {name: synthetic_tiff(scan_server.directory / name, seed=i) for i, name in enumerate(['a.tif', 'b.tif'])}
+    (scan_server.directory / 'bad.tif').write_bytes(b'not a tiff at all')
+    urls = [scan_server.url + name for name in [*contents, 'bad.tif', 'missing.tif']]
+    directory = str(tmp_path / 'scans')
+
+    report = _download.download_scans(urls + [None, urls[0]], directory=directory, n_workers=2)
+    assert list(report['url']) == urls
+    assert list(report['status']) == ['downloaded', 'downloaded', 'failed', 'failed']
+    for url, content in zip(urls, contents.values()):
+        assert open(_download.scan_path(url, directory), 'rb').read() == content
+
+    # Completed scans are skipped on the next run
+    manifest = _download.DownloadManifest(directory)
+    assert len(manifest) == 2
+    report = _download.download_scans(urls[:2], directory=directory, manifest=manifest)
+    assert list(report['status']) == ['skipped', 'skipped']
+
+    # An empty manifest passed in is the one that's used (not replaced by the default one)
+    empty = _download.DownloadManifest(str(tmp_path / 'other'))
+    _download.download_scans(urls[:1], directory=str(tmp_path / 'other'), manifest=empty)
+    assert len(empty) == 1
+
+
+def test_download_scans_moves_scans_named_by_basename(scan_server, tmp_path):
+    content = synthetic_tiff(scan_server.directory / 'a.tif')
+    url, directory = scan_server.url + 'a.tif', str(tmp_path / 'scans')
+    os.makedirs(directory)
+    old_path = os.path.join(directory, 'a.tif')
+    with open(old_path, 'wb') as file:
+        file.write(content)
+    _download.DownloadManifest(directory).mark_done(url, old_path, len(content), hashlib.sha256(content).hexdigest())
+
+    report = _download.download_scans([url], directory=directory)
+    assert list(report['status']) == ['skipped'] and report['path'][0] == _download.scan_path(url, directory)
+    assert open(_download.scan_path(url, directory), 'rb').read() == content and not os.path.exists(old_path)
+
+
+# EOF
+
+# EOF
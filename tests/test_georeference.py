@@ -0,0 +1,93 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 05:10:49:490  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_georeference.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 05:10:49:490  GMT-0600
+# @License: [Private IP]
+
+import numpy as np
+import pandas as pd
+import pytest
+import tifffile
+from scipy import ndimage
+
+import _references._georeference as _georeference
+import _references._spatial as _spatial
+
+# Scan `b.tif` starts this many `(x, y)` pixels into scan `a.tif`
+OFFSET = (150, 100)
+
+
+@pytest.fixture
+def scans(tmp_path):
+    """Two overlapping crops of one textured "photo"."""
+    image = ndimage.gaussian_filter(np.random.default_rng(0).random((700, 800)), 3)
+    image = ((image - image.min()) / np.ptp(image) * 255).astype('uint8')
+    paths = [str(tmp_path / 'a.tif'), str(tmp_path / 'b.tif')]
+    tifffile.imwrite(paths[0], image[:500, :500])
+    tifffile.imwrite(paths[1], image[OFFSET[1]:OFFSET[1] + 500, OFFSET[0]:OFFSET[0] + 500])
+    return paths
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return _georeference.KeypointCache(str(tmp_path / 'keypoints'), n_keypoints=500, downsample=1)
+
+
+def test_hamming_distances_match_brute_force():
+    rng = np.random.default_rng(0)
+    a, b = rng.integers(0, 256, (50, 32), dtype='uint8'), rng.integers(0, 256, (40, 32), dtype='uint8')
+    expected = np.unpackbits(a[:, None] ^ b[None], axis=2).sum(axis=2)
+    np.testing.assert_array_equal(_georeference.hamming_distances(a, b, batch=7), expected)
+
+
+def test_ransac_affine_ignores_outliers():
+    rng = np.random.default_rng(0)
+    source = rng.uniform(0, 1000, (200, 2))
+    affine = np.array([[0.9, -0.1, 40], [0.1, 0.9, -25], [0, 0, 1]])
+    target = (np.column_stack([source, np.ones(200)]) @ affine.T)[:, :2]
+    target[:60] = rng.uniform(0, 1000, (60, 2))
+    transform, inliers = _georeference.ransac_affine(source, target)
+    np.testing.assert_allclose(transform, affine, atol=1e-6)
+    assert not inliers[:60].any() and inliers[60:].all()
+    assert _georeference.ransac_affine(source[:2], target[:2])[0] is None
+
+
+def test_candidate_pairs_match_brute_force():
+    rng = np.random.default_rng(0)
+    long, lat = rng.uniform(-122.5, -122, 300), rng.uniform(37, 37.5, 300)
+    scale = rng.choice([np.nan, 10000, 20000, 40000], 300)
+    side = _spatial.footprint_km(scale)
+    i, j = np.triu_indices(300, k=1)
+    reach = (side[i] + side[j]) / np.sqrt(2)
+    close = _spatial.haversine_km(long[i], lat[i], long[j], lat[j]) < reach
+    np.testing.assert_array_equal(_georeference.candidate_pairs(long, lat, scale), np.column_stack([i, j])[close])
+
+
+def test_keypoints_are_cached(scans, cache):
+    keypoints, descriptors = cache.get(scans[0])
+    assert scans[0] in cache and scans[1] not in cache
+    assert keypoints.shape == (500, 2) and descriptors.shape == (500, 32)
+    cached = cache.get_many(scans, n_workers=1)
+    np.testing.assert_array_equal(cached[scans[0]][1], descriptors)
+    assert scans[1] in cache
+
+
+def test_georeference_recovers_the_offset(scans, cache):
+    frames = pd.DataFrame({'long': [-122.2, -122.2001, -122.0], 'lat': [37.4, 37.4001, np.nan],
+                           'scale': ['1:20,000', '1:20,000', '1:20,000']})
+    # The third frame has no centroid, and is skipped
+    georeferenced, pairs = _georeference.georeference(frames, scans + [scans[0]], cache=cache, n_workers=1)
+
+    assert len(georeferenced) == 2 and pairs[['i', 'j']].values.tolist() == [[0, 1]]
+    assert pairs['inliers'].iloc[0] >= _georeference.MIN_INLIERS
+    # Scan `b` is placed relative to scan `a` by their matches, not by their (nearly identical) centroids
+    relative = np.linalg.inv(georeferenced[0].transform) @ georeferenced[1].transform
+    np.testing.assert_allclose(relative[:2, 2], OFFSET, atol=2)
+    np.testing.assert_allclose(relative[:2, :2], np.eye(2), atol=0.01)
+
+
+# EOF
+
+# EOF
@@ -0,0 +1,67 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 05:10:28:280  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_ingest.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 05:10:28:280  GMT-0600
+# @License: [Private IP]
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import _references._ingest as _ingest
+
+# Rows of "All_Flights_Merge.csv": (long, lat, flight_id, date, scan)
+FLIGHTS = [(-122.2, 37.4, 'C-5750', '6/2/1939', 'Scan: http://mil.test/c5750/1.tif (12 MB)'),
+           (-122.3, 37.5, 'C-5750', '6/2/1939', 'http://mil.test/c5750/2.tif'),
+           (-118.2, 34.0, 'HM-2002-USA', '1/1/2002', ''),
+           (-110.0, 45.0, 'GS-CP', 'unknown', 'http://mil.test/gscp/1.tif'),
+           (-121.0, 38.0, 'GS-CP', '', 'http://mil.test/gscp/2.tif')]
+
+
+@pytest.fixture
+def flights_csv(tmp_path):
+    raw = pd.DataFrame({column: [''] * len(FLIGHTS) for column in _ingest.FLIGHT_COLUMNS})
+    for column, values in zip(['long', 'lat', 'flight_id', 'date', 'scan'], zip(*FLIGHTS)):
+        raw[column] = values
+    raw['frame'] = ['1', '2', '1', '1', '2']
+    path = str(tmp_path / 'All_Flights_Merge.csv')
+    raw.to_csv(path, index=False)
+    return path
+
+
+def test_read_flights(flights_csv):
+    flights = _ingest.read_flights(flights_csv)
+
+    assert list(flights.columns) == _ingest.KEPT_COLUMNS
+    assert flights['flight_id'].dtype == 'category'
+    assert list(flights['date']) == [pd.Timestamp('1939-06-02')] * 2 + [pd.Timestamp('2002-01-01'), pd.NaT, pd.NaT]
+    assert list(flights['scan'].fillna('')) == ['http://mil.test/c5750/1.tif', 'http://mil.test/c5750/2.tif', '',
+                                                'http://mil.test/gscp/1.tif', 'http://mil.test/gscp/2.tif']
+
+
+@pytest.mark.parametrize('bbox', [None, (-123, 37, -114, 42.5)])
+def test_chunked_read_matches_whole_read(flights_csv, bbox):
+    whole = _ingest.read_flights(flights_csv, bbox=bbox)
+    chunked = _ingest.read_flights(flights_csv, bbox=bbox, chunksize=2)
+    pd.testing.assert_frame_equal(chunked, whole, check_categorical=False)
+    assert chunked['flight_id'].dtype == 'category'
+    if bbox is not None:
+        assert list(whole['flight_id']) == ['C-5750', 'C-5750', 'GS-CP']
+
+
+def test_no_chunks():
+    assert list(_ingest.concat_flights([]).columns) == _ingest.KEPT_COLUMNS
+
+
+def test_scaled_delta():
+    delta = _ingest.year_delta(pd.Series(pd.to_datetime(['1939-06-02', '1949-01-01', None, '1959-12-31'])))
+    assert list(delta.fillna(-1)) == [0, 10, -1, 20]
+    scaled = _ingest.scaled_delta(delta, power=2, scale=100)
+    np.testing.assert_allclose(scaled, [0, 25, np.nan, 100])
+
+
+# EOF
+
+# EOF
@@ -0,0 +1,81 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 06:10:11:110  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_metrics.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 06:10:11:110  GMT-0600
+# @License: [Private IP]
+
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import _references._metrics as _metrics
+
+
+@pytest.fixture
+def metrics():
+    return _metrics.Metrics()
+
+
+def test_timers_and_counters_per_stage(metrics):
+    @metrics.timed('fetch', key='url')
+    def fetch(url, fail=False):
+        if fail:
+            raise ValueError(url)
+        return url
+
+    with metrics.stage('scrape'):
+        fetch('http://catalog.test/a')
+        fetch(url='http://catalog.test/a')
+        with pytest.raises(ValueError):
+            fetch('http://catalog.test/b', fail=True)
+        metrics.count('rows', 3, key='Alameda')
+    metrics.begin('join')
+    metrics.count('rows', 5, key='Alameda')
+    metrics.log('Joined.', color='YELLOW', rows=5)
+
+    report = metrics.report()
+    assert [stage['stage'] for stage in report['stages']] == ['scrape', 'join']
+    timers = {(timer['stage'], timer['key']): (timer['count'], timer['errors']) for timer in report['timers']}
+    assert timers == {('scrape', 'http://catalog.test/a'): (2, 0), ('scrape', 'http://catalog.test/b'): (1, 1)}
+    assert {(counter['stage'], counter['value']) for counter in report['counters']} == {('scrape', 3), ('join', 5)}
+    assert report['events'][-1]['level'] == 'WARNING' and report['events'][-1]['stage'] == 'join'
+    assert report['events'][-1]['rows'] == 5
+
+
+def test_drain_and_merge(metrics):
+    worker = _metrics.Metrics()
+    worker.record('http.fetch', 0.5, key='http://catalog.test/a')
+    worker.record('http.fetch', 1.5, key='http://catalog.test/a', error=True)
+    worker.count('rows', 3)
+    drained = worker.drain()
+    assert worker.report()['timers'] == [] and worker.report()['counters'] == []
+
+    # Attributed to the stage the parent is in
+    with metrics.stage('scrape'):
+        metrics.record('http.fetch', 1.0, key='http://catalog.test/a')
+        metrics.merge(drained)
+    timer, = metrics.report()['timers']
+    assert (timer['stage'], timer['count'], timer['total_s'], timer['max_s'], timer['errors']) == ('scrape', 3, 3.0,
+                                                                                                   1.5, 1)
+    assert metrics.report()['counters'] == [{'stage': 'scrape', 'name': 'rows', 'key': None, 'value': 3}]
+
+
+def test_save(metrics, tmp_path):
+    with metrics.stage('scrape'):
+        metrics.record('http.fetch', 0.25, key='http://catalog.test/a')
+    path = metrics.save(str(tmp_path), name='run')
+
+    with open(path) as file:
+        assert json.load(file)['stages'][0]['stage'] == 'scrape'
+    assert sorted(os.listdir(tmp_path)) == ['run.json', 'run_counters.csv', 'run_stages.csv', 'run_timers.csv']
+    assert list(pd.read_csv(tmp_path / 'run_timers.csv')['total_s']) == [0.25]
+    assert 'scrape / http.fetch' in metrics.summary()
+
+
+# EOF
+
+# EOF
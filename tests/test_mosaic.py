@@ -0,0 +1,47 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 03:10:27:270  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_mosaic.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 03:10:27:270  GMT-0600
+# @License: [Private IP]
+
+import numpy as np
+import pytest
+import tifffile
+
+import _references._mosaic as _mosaic
+
+SLICES = [np.s_[:], np.s_[10:20], np.s_[5:290:7, 3:499:5], np.s_[::8, ::8], np.s_[63:65, 63:200], np.s_[-10:, -5:],
+          np.s_[50:40]]
+
+
+@pytest.mark.parametrize('shape', [(300, 500, 3), (301, 257)])
+@pytest.mark.parametrize('layout', [{'tile': (64, 64), 'compression': 'zlib'}, {'tile': (32, 48)},
+                                    {'rowsperstrip': 37, 'compression': 'zlib'}])
+def test_segmented_scan_slices(tmp_path, shape, layout):
+    image = np.random.default_rng(0).integers(0, 255, shape, dtype='uint8')
+    path = str(tmp_path / 'scan.tif')
+    tifffile.imwrite(path, image, **layout)
+
+    scan = _mosaic._open_frame(path)
+    assert isinstance(scan, _mosaic.SegmentedScan)
+    assert scan.shape == image.shape and scan.dtype == image.dtype
+    for key in SLICES:
+        np.testing.assert_array_equal(scan[key], image[key])
+
+
+def test_uncompressed_scans_are_memory_mapped(tmp_path):
+    path = str(tmp_path / 'scan.tif')
+    tifffile.imwrite(path, np.zeros((40, 60), dtype='uint8'))
+    assert isinstance(_mosaic._open_frame(path), np.memmap)
+
+
+def test_fit_to_origin_without_frames():
+    with pytest.raises(ValueError, match='No frames'):
+        _mosaic.fit_to_origin([])
+
+
+# EOF
+
+# EOF
@@ -0,0 +1,73 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 06:10:03:030  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_plotting.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 06:10:03:030  GMT-0600
+# @License: [Private IP]
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import _references._ingest as _ingest
+import _references._plotting as _plotting
+
+
+@pytest.fixture
+def frames():
+    """Three short flights (one of them undated), flown east to west along different latitudes."""
+    n = 12
+    return pd.DataFrame({'flight_id': np.repeat(['C-5750', 'HM-2002-USA', 'GS-CP'], n),
+                         'frame': np.tile(np.arange(n), 3).astype(str),
+                         'long': np.tile(np.linspace(-122.3, -122.2, n), 3),
+                         'lat': np.repeat([37.40, 37.45, 37.50], n),
+                         'date': pd.to_datetime(np.repeat(['1939-06-02', '2002-01-01', None], n))})
+
+
+def test_rasterize_matches_histogram():
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(-5, 45, 1000), rng.uniform(-5, 25, 1000)
+    counts, sums = _plotting.rasterize(x, y, (20, 40), colors=np.ones((1000, 3)))
+    expected = np.histogram2d(y, x, bins=[np.arange(21), np.arange(41)])[0]
+    np.testing.assert_array_equal(counts, expected)
+    np.testing.assert_array_equal(sums[..., 0], expected)
+    weighted = _plotting.rasterize(x, y, (20, 40), weights=np.full(1000, 0.5))[0]
+    np.testing.assert_array_equal(weighted, expected / 2)
+
+
+def test_intensities():
+    np.testing.assert_allclose(_plotting.intensities(np.array([0, 50, 100, np.nan]), floor=0.2), [0.2, 0.6, 1, 0.2])
+    np.testing.assert_allclose(_plotting.intensities(np.array([0, np.nan]), floor=0.2), [0.2, 0.2])
+
+
+@pytest.mark.parametrize('mode', ['points', 'segments'])
+def test_weighted_frames_are_never_hidden(frames, mode):
+    frames['date_delta'] = _ingest.scaled_delta(_ingest.year_delta(frames['date']))
+    # The earliest flight weighs 0, and the undated one has no weight at all
+    assert (frames['date_delta'] == 0).sum() == 12 and frames['date_delta'].isna().sum() == 12
+
+    unweighted = _plotting.render(frames, size=200, mode=mode, background=None)
+    weighted = _plotting.render(frames, size=200, mode=mode, weight_by='date_delta', background=None)
+    np.testing.assert_array_equal(weighted[..., 3] > 0, unweighted[..., 3] > 0)
+    np.testing.assert_array_equal(weighted[..., :3], unweighted[..., :3])
+
+    # Each flight is a row of the image (north up): only the latest (in the middle) is at full opacity
+    undated, latest, earliest = np.flatnonzero(unweighted[..., 3].any(axis=1))
+    opacity = weighted[..., 3].max(axis=1) / unweighted[..., 3].max(axis=1).clip(1)
+    assert opacity[latest] == 1
+    np.testing.assert_allclose(opacity[[undated, earliest]], _plotting.WEIGHT_FLOOR, atol=0.01)
+
+
+def test_render_tiles(frames, tmp_path):
+    report = _plotting.render_tiles(frames, str(tmp_path), zooms=[8, 10])
+    assert set(report['zoom']) == {8, 10} and (report['points'] > 0).all()
+    for zoom, x, y in report[['zoom', 'x', 'y']].itertuples(index=False):
+        assert os.path.exists(tmp_path / str(zoom) / str(x) / f'{y}.png')
+
+
+# EOF
+
+# EOF
@@ -0,0 +1,68 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 05:10:56:560  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_pyramid.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 05:10:56:560  GMT-0600
+# @License: [Private IP]
+
+import os
+
+import numpy as np
+import pytest
+import tifffile
+
+import _references._pyramid as _pyramid
+
+
+@pytest.fixture
+def image():
+    return np.random.default_rng(0).integers(0, 255, (301, 517, 3), dtype='uint8')
+
+
+@pytest.fixture
+def scan(tmp_path, image):
+    path = str(tmp_path / 'scan.tif')
+    tifffile.imwrite(path, image, tile=(64, 64), compression='zlib')
+    return path
+
+
+def test_halve_streaming_matches_whole_image(tmp_path, image):
+    halved = _pyramid.halve_streaming(image, str(tmp_path / 'level.npy'), band_rows=7)
+    np.testing.assert_array_equal(halved, _pyramid._halve(image))
+    assert halved.shape == (151, 259, 3)
+    # Each output pixel is the rounded mean of its 2x2 block (the odd last row and column are repeated)
+    assert halved[0, 0, 0] == np.rint(image[:2, :2, 0].mean())
+    assert halved[-1, 0, 0] == np.rint(image[-1, :2, 0].mean())
+    assert halved[0, -1, 0] == np.rint(image[:2, -1, 0].mean())
+
+
+def test_build_pyramid(scan, image):
+    report = _pyramid.build_pyramid(scan, min_overview=64, thumbnail_size=100, band_rows=16)
+    assert report['levels'] == [(151, 259, 3), (76, 130, 3), (38, 65, 3), (19, 33, 3)]
+    assert _pyramid.is_current(scan) and os.path.exists(_pyramid.thumbnail_path(scan))
+
+    # Indexed from the first halving down (as GDAL does), or from the smallest up
+    np.testing.assert_array_equal(_pyramid.read_overview(scan, 0), _pyramid._halve(image))
+    np.testing.assert_array_equal(_pyramid.read_overview(scan, 1), _pyramid._halve(_pyramid._halve(image)))
+    assert _pyramid.read_overview(scan).shape == _pyramid.read_overview(scan, 3).shape == (19, 33, 3)
+    # Only the overviews and the thumbnail are left behind
+    assert sorted(os.listdir(os.path.dirname(scan))) == ['scan.tif', 'scan.tif.ovr', 'scan_thumbnail.png']
+
+
+def test_build_pyramids(tmp_path, scan, image):
+    # A mosaic's ".tif", read from the ".npy" it was converted from
+    mosaic_npy, mosaic_tif = str(tmp_path / 'mosaic.npy'), str(tmp_path / 'mosaic.tif')
+    np.save(mosaic_npy, image[::-1])
+    tifffile.imwrite(mosaic_tif, np.zeros_like(image))
+
+    report = _pyramid.build_pyramids([scan, mosaic_tif, None, str(tmp_path / 'missing.tif')], n_workers=2,
+                                     sources={mosaic_tif: mosaic_npy})
+    assert list(report['path']) == [scan, mosaic_tif] and list(report['status']) == ['built', 'built']
+    np.testing.assert_array_equal(_pyramid.read_overview(mosaic_tif, 0), _pyramid._halve(image[::-1]))
+    assert list(_pyramid.build_pyramids([scan, mosaic_tif], n_workers=1)['status']) == ['current', 'current']
+
+
+# EOF
+
+# EOF
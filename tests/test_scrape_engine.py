@@ -0,0 +1,109 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 01:10:14:140  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_scrape_engine.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 01:10:14:140  GMT-0600
+# @License: [Private IP]
+
+import ast
+import os
+
+import pandas as pd
+import pytest
+
+import _references._accessories as _accessories
+import _references._checkpoint as _checkpoint
+import _references._scrape_engine as _scrape_engine
+
+
+@pytest.fixture
+def session():
+    with _accessories.init_session() as session:
+        yield session
+
+
+def test_county_names_http(fixture_site, session):
+    county_names = _scrape_engine.county_names_http(session, fixture_site.url + 'counties.html')
+    assert county_names == {'Alameda': fixture_site.url + 'county_alameda.html',
+                            'Alpine': fixture_site.url + 'county_alpine.html'}
+
+
+def test_scrape_county_http(fixture_site, session):
+    county_url = fixture_site.url + 'county_alameda.html'
+    table = _scrape_engine.scrape_county_http(session, 'Alameda', county_url)
+
+    assert list(table.columns) == _scrape_engine.SURFACE_LEVEL_COLUMNS + ['reference_image_url', 'county_name',
+                                                                          'county_url']
+    assert list(table['flight_id']) == ['EAG-AL-CC-05', 'HM-2002-USA', 'C-5750']
+    assert list(table['date']) == [pd.Timestamp('2005-04-06'), pd.Timestamp('2002-01-01'), pd.Timestamp('1939-06-02')]
+    assert list(table['scale']) == [['33600'], ['10800'], ['20000', '40000']]
+    assert list(table['index_url']) == ['http://mil.library.ucsb.edu/ap_indexes/eagalcc05',
+                                        'http://mil.library.ucsb.edu/ap_indexes/hm2002usa',
+                                        'http://mil.library.ucsb.edu/ap_indexes/c5750']
+    assert list(table['frame_status']) == ['Ask MIL staff', 'Frames partially digital', 'Frames digital']
+    assert set(table['reference_image_url']) == {
+        'https://mil.library.ucsb.edu/apcatalog/images/images_counties/Alameda.jpg'}
+    assert set(table['county_name']) == {'Alameda'} and set(table['county_url']) == {county_url}
+
+
+def test_scrape_county_http_reuses_unchanged_checkpoint(fixture_site, session, tmp_path):
+    county_url = fixture_site.url + 'county_alameda.html'
+    checkpoint = _checkpoint.CheckpointStore(str(tmp_path / 'checkpoints'))
+    first = _scrape_engine.scrape_county_http(session, 'Alameda', county_url, checkpoint=checkpoint)
+    assert county_url in checkpoint
+
+    # An unchanged page is served from the checkpoint; a changed one is parsed again
+    pd.testing.assert_frame_equal(_scrape_engine.scrape_county_http(session, 'Alameda', county_url,
+                                                                    checkpoint=checkpoint), first)
+    page = fixture_site.directory / 'county_alameda.html'
+    page.write_text(page.read_text().replace('Ask MIL staff', 'Frames digital'))
+    changed = _scrape_engine.scrape_county_http(session, 'Alameda', county_url, checkpoint=checkpoint)
+    assert list(changed['frame_status'])[0] == 'Frames digital'
+
+
+def test_scrape_county_http_missing_table(fixture_site, session):
+    with pytest.raises(LookupError):
+        _scrape_engine.scrape_county_http(session, 'Counties', fixture_site.url + 'counties.html')
+
+
+def test_typed_surface_level_scales():
+    legacy = pd.DataFrame({'date': ['2005-04-06', '1939-06-02', 'unknown', '2002-01-01', '1941-01-01'],
+                           'flight_id': ['EAG-AL-CC-05', 'C-5750', 'HM-2002-USA', 'C-10800X', 'GS-CP'],
+                           'scale': ["['33600']", "['20000', '40000']", "[]", None, "['n/a']"]})
+    typed = _scrape_engine.typed_surface_level(legacy)
+
+    assert [list(scales) for scales in typed['scales']] == [[33600], [20000, 40000], [], [], []]
+    # Only single-scale flights have a `scale`
+    assert typed['scale'].dtype == 'Int64'
+    assert typed['scale'].tolist() == [33600, pd.NA, pd.NA, pd.NA, pd.NA]
+    assert str(typed['date'].dt.tz) == 'UTC' and typed['date'].isna().tolist() == [False, False, True, False, False]
+    assert typed['flight_id'].dtype == 'category'
+
+
+def test_typed_surface_level_of_a_scraped_table(fixture_site, session):
+    table = _scrape_engine.scrape_county_http(session, 'Alameda', fixture_site.url + 'county_alameda.html')
+    typed = _scrape_engine.typed_surface_level(table)
+    # Lists of strings (as scraped) are parsed the same as their repr (as in the legacy CSV)
+    assert [list(scales) for scales in typed['scales']] == [[33600], [10800], [20000, 40000]]
+    assert typed['scale'].tolist() == [33600, 10800, pd.NA]
+
+
+def test_convert_surface_level_csv(tmp_path):
+    csv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Data', 'surface_level.csv')
+    converted = _scrape_engine.convert_surface_level_csv(csv_path, str(tmp_path / 'surface_level.parquet'))
+    legacy = pd.read_csv(csv_path, dtype=str)
+
+    # What's saved is what was returned, and every row keeps its values (the scales parsed as ints)
+    pd.testing.assert_frame_equal(_accessories.retrieve_local_data_file(str(tmp_path / 'surface_level.parquet')),
+                                  converted)
+    assert len(converted) == len(legacy)
+    assert converted['flight_id'].astype(str).tolist() == legacy['flight_id'].tolist()
+    assert [list(scales) for scales in converted['scales']] == [[int(scale) for scale in ast.literal_eval(scales)]
+                                                                 for scales in legacy['scale']]
+    assert converted['date'].dt.strftime('%Y-%m-%d').tolist() == legacy['date'].tolist()
+
+
+# EOF
+
+# EOF
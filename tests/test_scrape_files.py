@@ -0,0 +1,41 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 05:10:02:020  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_scrape_files.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 05:10:02:020  GMT-0600
+# @License: [Private IP]
+
+import pandas as pd
+
+import _references._accessories as _accessories
+import scrape_files
+
+
+def test_load_flights_without_the_csv(tmp_path, monkeypatch):
+    flights = pd.DataFrame({'flight_id': ['C-5750', 'HM-2002-USA'], 'long': [-122.2, -122.3], 'lat': [37.4, 37.5]})
+    _accessories.save_local_data_file(flights, str(tmp_path / 'flights.parquet'))
+    monkeypatch.setattr(scrape_files, 'FLIGHTS_PATH', str(tmp_path / 'missing.csv'))
+    monkeypatch.setattr(scrape_files, 'FLIGHTS_TYPED_PATH', str(tmp_path / 'flights.parquet'))
+
+    # The typed copy is served as is (there's nothing to re-ingest it from)
+    pd.testing.assert_frame_equal(scrape_files.load_flights(), flights)
+
+
+def test_load_surface_level_converts_the_legacy_csv(tmp_path, monkeypatch):
+    legacy = pd.DataFrame({'date': ['2005-04-06', '1939-06-02'], 'flight_id': ['EAG-AL-CC-05', 'C-5750'],
+                           'scale': ["['33600']", "['20000', '40000']"]})
+    legacy.to_csv(tmp_path / 'surface_level.csv', index=False)
+    monkeypatch.setattr(scrape_files, 'LEGACY_SURFACE_LEVEL_PATH', str(tmp_path / 'surface_level.csv'))
+    monkeypatch.setattr(scrape_files, 'SURFACE_LEVEL_PATH', str(tmp_path / 'surface_level.parquet'))
+
+    converted = scrape_files.load_surface_level()
+    assert converted['scale'].tolist() == [33600, pd.NA]
+    # Once converted, the Parquet is read (even if the CSV is gone)
+    (tmp_path / 'surface_level.csv').unlink()
+    pd.testing.assert_frame_equal(scrape_files.load_surface_level(), converted)
+
+
+# EOF
+
+# EOF
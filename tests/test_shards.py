@@ -0,0 +1,95 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 04:10:16:160  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_shards.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 04:10:16:160  GMT-0600
+# @License: [Private IP]
+
+import shutil
+
+import pandas as pd
+import pytest
+
+import _references._accessories as _accessories
+import _references._cache as _cache
+import _references._checkpoint as _checkpoint
+import _references._metrics as _metrics
+import _references._scrape_engine as _scrape_engine
+import _references._shards as _shards
+
+
+@pytest.fixture
+def site(fixture_site):
+    """The fixture site, with both listed counties on it and listed in reverse alphabetical order."""
+    directory = fixture_site.directory
+    shutil.copy(directory / 'county_alameda.html', directory / 'county_alpine.html')
+    listing = (directory / 'counties.html').read_text()
+    alameda = '<li><a href="county_alameda.html">Alameda</a></li>'
+    alpine = '<li><a href="county_alpine.html">Alpine</a></li>'
+    listing = listing.replace(alameda, '@').replace(alpine, alameda).replace('@', alpine)
+    (directory / 'counties.html').write_text(listing)
+    return fixture_site
+
+
+def scrape(site, tmp_path, **kwargs):
+    return _shards.scrape_states({'california': site.url + 'counties.html'}, backend='http',
+                                 directory=str(tmp_path / 'shards'), n_processes=2,
+                                 checkpoint_dir=str(tmp_path / 'checkpoints'), **kwargs)
+
+
+def test_scrape_states_merges_worker_stats(site, tmp_path):
+    cache = _cache.ContentCache(str(tmp_path / 'cache'))
+    _accessories.LATENCY_STATS.drain()
+    _metrics.METRICS.drain()
+
+    report = scrape(site, tmp_path, cache=cache)
+    assert list(report['status']) == ['scraped', 'scraped'] and list(report['rows']) == [3, 3]
+    county_urls = set(report['county_url'])
+    # The workers' requests, timers and cache lookups reach this process
+    assert county_urls <= set(_accessories.LATENCY_STATS.to_frame()['url'])
+    fetched = {timer['key'] for timer in _metrics.METRICS.report()['timers'] if timer['name'] == 'http.fetch'}
+    assert county_urls <= fetched
+    # The listing and both county pages
+    assert cache.hits + cache.misses == 3
+
+
+def test_host_semaphores_are_per_host():
+    semaphores = _shards.host_semaphores(['http://catalog.test/a', 'http://catalog.test/b', 'http://mirror.test/a'],
+                                         per_host=1)
+    assert sorted(semaphores) == ['catalog.test', 'mirror.test']
+    # A busy host doesn't hold up requests to another
+    assert semaphores['catalog.test'].acquire(block=False)
+    assert not semaphores['catalog.test'].acquire(block=False)
+    assert semaphores['mirror.test'].acquire(block=False)
+
+
+def test_compact_keeps_listed_counties_in_page_order(site, tmp_path):
+    scrape(site, tmp_path)
+    directory = str(tmp_path / 'shards')
+    # A county no longer listed on the state's page
+    shutil.copy(_shards.shard_path(directory, 'california', 'Alameda'),
+                _shards.shard_path(directory, 'california', 'Amador'))
+
+    data = _shards.compact(directory)
+    assert list(data['county_name'].unique()) == ['Alpine', 'Alameda']
+    assert list(data['state'].unique()) == ['california'] and len(data) == 6
+
+
+def test_unsharded_checkpoints_are_migrated(site, tmp_path):
+    county_url = site.url + 'county_alameda.html'
+    legacy = _checkpoint.CheckpointStore(str(tmp_path / 'checkpoints'))
+    with _accessories.init_session() as session:
+        table = _scrape_engine.scrape_county_http(session, 'Alameda', county_url, checkpoint=legacy)
+
+    scrape(site, tmp_path)
+    assert len(_checkpoint.CheckpointStore(str(tmp_path / 'checkpoints'))) == 0
+    store = _checkpoint.CheckpointStore(_shards.county_checkpoint_dir(str(tmp_path / 'checkpoints'), 'california',
+                                                                      'Alameda'))
+    assert county_url in store
+    pd.testing.assert_frame_equal(store.load(county_url), table)
+
+
+# EOF
+
+# EOF
@@ -0,0 +1,76 @@
+# @Author: Shounak Ray <Ray>
+# @Date:   19-Oct-2026 05:10:35:350  GMT-0600
+# @Email:  rijshouray@gmail.com
+# @Filename: test_spatial.py
+# @Last modified by:   Ray
+# @Last modified time: 19-Oct-2026 05:10:35:350  GMT-0600
+# @License: [Private IP]
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import _references._spatial as _spatial
+
+
+@pytest.fixture
+def centroids():
+    """Frame centroids around the Bay Area, with some missing coordinates."""
+    rng = np.random.default_rng(0)
+    long, lat = rng.uniform(-123, -121, 5000), rng.uniform(37, 38.5, 5000)
+    long[::97], lat[::89] = np.nan, np.nan
+    return long, lat
+
+
+@pytest.fixture
+def index(centroids):
+    return _spatial.GridIndex(*centroids)
+
+
+@pytest.mark.parametrize('bbox', [(-122.26, 37.39, -122.19, 37.42), (-124, 36, -120, 39), (-122, 38, -122.5, 38.2),
+                                  (-130, 40, -129, 41)])
+def test_bbox_matches_brute_force(centroids, index, bbox):
+    np.testing.assert_array_equal(index.bbox(*bbox), np.flatnonzero(_spatial.bbox_mask(*centroids, bbox)))
+
+
+@pytest.mark.parametrize('radius_km', [0.5, 5, 50, 500])
+def test_radius_matches_brute_force(centroids, index, radius_km):
+    expected = np.flatnonzero(_spatial.haversine_km(*centroids, -122.2, 37.4) <= radius_km)
+    np.testing.assert_array_equal(index.radius(-122.2, 37.4, radius_km), expected)
+
+
+def test_polygon_matches_brute_force(centroids, index):
+    triangle = [(-122.8, 37.2), (-121.5, 37.3), (-122.0, 38.3)]
+    np.testing.assert_array_equal(index.polygon(triangle), np.flatnonzero(_spatial.polygon_mask(*centroids, triangle)))
+
+
+@pytest.mark.parametrize('k', [1, 10, 200])
+def test_nearest_matches_brute_force(centroids, index, k):
+    distances = _spatial.haversine_km(*centroids, -121.1, 38.45)
+    expected = np.lexsort((np.arange(len(distances)), np.where(np.isnan(distances), np.inf, distances)))[:k]
+    np.testing.assert_array_equal(index.nearest(-121.1, 38.45, k=k), expected)
+
+
+def test_load_or_build(centroids, tmp_path):
+    path = str(tmp_path / 'index' / 'frame_centroids.npz')
+    built = _spatial.load_or_build(path, *centroids)
+    loaded = _spatial.load_or_build(path, *centroids)
+    assert loaded is not built and loaded.fingerprint == built.fingerprint
+    np.testing.assert_array_equal(loaded.radius(-122.2, 37.4, 20), built.radius(-122.2, 37.4, 20))
+
+    # Other coordinates: the persisted index isn't reused
+    long, lat = centroids
+    rebuilt = _spatial.load_or_build(path, long[:100], lat[:100])
+    assert rebuilt.n_rows == 100 and _spatial.GridIndex.load(path).n_rows == 100
+
+
+def test_scale_denominators():
+    np.testing.assert_array_equal(_spatial.scale_denominators(pd.Series(['1:20,000', '1:10800', 'unknown', None,
+                                                                         '1:7920.5'])),
+                                  [20000, 10800, np.nan, np.nan, 7920.5])
+    np.testing.assert_array_equal(_spatial.scale_denominators(pd.Series([20000.0, np.nan])), [20000, np.nan])
+
+
+# EOF
+
+# EOF